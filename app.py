@@ -1,17 +1,16 @@
 import gradio as gr
-import json, glob, os
+import os
 from pathlib import Path
+from src.utils import run_catalog
 
-# Load latest run file
+# Load latest run from the run catalog
 def get_latest_run():
-    logs = sorted(glob.glob("runs/*.json"), key=os.path.getmtime, reverse=True)
-    if not logs:
+    run = run_catalog.latest_run()   # indexed query; log_run records new runs itself
+    if run is None:
         return [], "No run found"
-    latest = logs[0]
-    with open(latest, "r") as f:
-        run_data = json.load(f)
-    return run_data["clips"], f"Loaded {os.path.basename(latest)}"
+    return run["clips"], f"Loaded {os.path.basename(run['log_file'])}"
 
+run_catalog.sync()   # once per process: index run files logged elsewhere (e.g. pulled from git)
 clips, status = get_latest_run()
 
 # ---- Helper functions ----
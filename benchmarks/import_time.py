@@ -0,0 +1,66 @@
+"""
+Import-time budgets for the common entry points.
+
+Each module is imported in a fresh interpreter; the check fails if the
+import is slower than its budget or drags in a heavy backend that only a
+later stage should load.
+
+    python -m benchmarks.import_time
+"""
+
+import json, subprocess, sys
+
+# module -> max seconds for a cold import (best of REPEATS)
+BUDGETS = {
+    "src.pipeline": 1.0,
+    "src.batch": 1.0,
+    "src.highlight_detector": 0.8,
+    "src.clip_extractor": 0.5,
+    "src.ml.make_windows": 0.5,
+    "src.utils.subtitle_utils": 0.2,
+    "src.utils.text_utils": 0.5,
+}
+HEAVY_MODULES = ["torch", "transformers", "whisper", "librosa", "sentence_transformers"]
+REPEATS = 3
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import {module}
+dt = time.perf_counter() - t
+print(json.dumps({{"seconds": dt, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str) -> dict:
+    """Best-of-REPEATS cold import time plus heavy modules it pulled in."""
+    best = None
+    for _ in range(REPEATS):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            check=True, capture_output=True, text=True,
+        )
+        res = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or res["seconds"] < best["seconds"]:
+            best = res
+    return best
+
+
+def main():
+    failed = False
+    for module, budget in BUDGETS.items():
+        try:
+            res = measure(module)
+        except subprocess.CalledProcessError as e:
+            print(f"❌ {module}: import failed\n{e.stderr.strip()}")
+            failed = True
+            continue
+        ok = res["seconds"] <= budget and not res["heavy"]
+        failed |= not ok
+        heavy = f" | heavy: {', '.join(res['heavy'])}" if res["heavy"] else ""
+        print(f"{'✅' if ok else '❌'} {module}: {res['seconds']:.3f}s (budget {budget:.1f}s){heavy}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
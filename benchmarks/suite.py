@@ -0,0 +1,309 @@
+"""
+Offline benchmark suite: times the hot paths on synthetic inputs and fails
+when one regresses against the recorded baselines.
+
+Everything is generated locally (benchmarks/synthetic.py): SRTs, PCM audio
+with known silences, lavfi test videos and a tiny random regressor, so no
+network or trained model is needed. Cases whose dependencies are missing
+(torch, ffmpeg) are skipped; a case that runs but has no recorded baseline
+fails until one is recorded with --update.
+
+    python -m benchmarks.suite                  # compare with baselines.json
+    python -m benchmarks.suite --update         # record new baselines
+    python -m benchmarks.suite --only make_windows align_to_silence
+"""
+
+import os, sys, json, time, shutil, tempfile, argparse, platform, importlib.util
+import numpy as np
+from benchmarks import synthetic
+
+BASELINES_FILE = os.path.join(os.path.dirname(__file__), "baselines.json")
+REPEATS = 5
+TOLERANCE = 2.0       # fail when slower than baseline x TOLERANCE ...
+SLACK_S = 0.005       # ... plus this much (timer noise on very fast cases)
+
+N_SEGMENTS = 5000     # ~3.5 h transcript
+AUDIO_SECONDS = 600.0
+N_ALIGN = 500
+N_TRIM = 20
+VIDEO_SECONDS = 30
+
+
+class Skip(Exception):
+    pass
+
+
+def _best_of(fn, repeats=REPEATS):
+    best = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def _require(*modules):
+    missing = [m for m in modules if importlib.util.find_spec(m) is None]
+    if missing:
+        raise Skip(f"needs {', '.join(missing)}")
+
+
+def _require_ffmpeg():
+    if not synthetic.ffmpeg_available():
+        raise Skip("needs ffmpeg / ffprobe on PATH")
+
+
+# ---------------------------------------------------------------
+# Fixtures (built lazily, once per suite run)
+# ---------------------------------------------------------------
+class Fixtures:
+    def __init__(self, root: str):
+        self.root = root
+        self._cache = {}
+
+    def _get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def srt(self):
+        path = os.path.join(self.root, "transcript.srt")
+        return self._get("srt", lambda: (synthetic.make_srt(path, N_SEGMENTS), path)[1])
+
+    @property
+    def audio(self):
+        """(pcm path, known silences)"""
+        path = os.path.join(self.root, "audio.f32")
+        return self._get("audio", lambda: (path, synthetic.make_audio(path, AUDIO_SECONDS)))
+
+    @property
+    def video(self):
+        path = os.path.join(self.root, "video.mp4")
+        return self._get("video", lambda: synthetic.make_video(path, VIDEO_SECONDS))
+
+    @property
+    def model_dir(self):
+        path = os.path.join(self.root, "tiny-regressor")
+        return self._get("model", lambda: synthetic.make_tiny_regressor(path))
+
+
+# ---------------------------------------------------------------
+# Cases: each returns (seconds, details)
+# ---------------------------------------------------------------
+def case_read_srt(fx):
+    from src.ml.make_windows import read_srt
+    srt = fx.srt
+    return _best_of(lambda: read_srt(srt)), {"segments": N_SEGMENTS}
+
+
+def case_make_windows(fx):
+    from src.ml.make_windows import read_srt, build_windows
+    segs = read_srt(fx.srt)
+    n = len(build_windows(segs))
+    return _best_of(lambda: build_windows(segs)), {"windows": n}
+
+
+def case_select_windows(fx):
+    from src.ml.make_windows import read_srt, build_windows
+    from src.ml.selection import select_windows
+    windows = build_windows(read_srt(fx.srt))
+    scores = np.random.default_rng(0).random(len(windows))
+    keep = select_windows(scores, windows.starts, windows.ends, top_k=30, iou_thresh=0.4)
+    assert len(keep) == 30, f"expected 30 windows, got {len(keep)}"
+    return _best_of(lambda: select_windows(scores, windows.starts, windows.ends, top_k=30, iou_thresh=0.4)), \
+        {"windows": len(windows)}
+
+
+def case_silence_index(fx):
+    from src.utils.audio_utils import build_silence_index
+    pcm, _ = fx.audio
+    return _best_of(lambda: build_silence_index(pcm), repeats=3), {"audio_s": AUDIO_SECONDS}
+
+
+def case_align_to_silence(fx):
+    """N_ALIGN clip boundaries just after / before known silences (index already built)."""
+    from src.utils.audio_utils import align_to_silence, get_silence_index
+    pcm, silences = fx.audio
+    get_silence_index(pcm)
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, len(silences) - 3, size=N_ALIGN)
+    queries = [(silences[i][1] + rng.uniform(0.1, 0.8), silences[i + 2][0] - rng.uniform(0.1, 0.8), i)
+               for i in picks]
+
+    # Correctness: the snapped start is the end of the silence before it,
+    # the snapped end lies inside the silence after it.
+    for s, e, i in queries:
+        new_s, new_e = align_to_silence(pcm, s, e)
+        assert abs(new_s - silences[i][1]) < 0.15, f"start {s:.3f} -> {new_s} (silence ends {silences[i][1]:.3f})"
+        lo, hi = silences[i + 2]
+        assert lo <= new_e <= hi, f"end {e:.3f} -> {new_e} (silence {lo:.3f}-{hi:.3f})"
+
+    def run():
+        for s, e, _ in queries:
+            align_to_silence(pcm, s, e)
+    return _best_of(run), {"queries": N_ALIGN}
+
+
+def case_trim_srt_to_range(fx):
+    from src.utils.subtitle_utils import trim_srt_to_range
+    from src.utils.transcript import format_srt_time
+    srt = fx.srt
+    out = os.path.join(fx.root, "trimmed.srt")
+    ranges = [(format_srt_time(t), format_srt_time(t + 40.0)) for t in np.linspace(0, 10_000, N_TRIM)]
+
+    def run():
+        for start, end in ranges:
+            trim_srt_to_range(srt, start, end, out)
+    return _best_of(run), {"clips": N_TRIM}
+
+
+def case_keyword_fallback(fx):
+    import src.highlight_detector as hd
+    srt = fx.srt
+    prev, hd.SCORER = hd.SCORER, "keywords"
+    try:
+        found = hd.extract_highlights(srt, top_n=5)
+        assert len(found) == 5, f"expected 5 keyword highlights, got {len(found)}"
+        return _best_of(lambda: hd.extract_highlights(srt, top_n=5)), {"segments": N_SEGMENTS}
+    finally:
+        hd.SCORER = prev
+
+
+def case_score_windows(fx):
+    """Full transformer path (windowing, tokenization, batching, select) with a tiny random model."""
+    _require("torch", "transformers")
+    import src.ml.infer_text_regressor as infer
+    srt = os.path.join(fx.root, "transcript_short.srt")
+    synthetic.make_srt(srt, 500, seed=2)
+    prev, infer.MODEL_DIR = infer.MODEL_DIR, fx.model_dir
+    try:
+        out = infer.score_windows(srt, top_n=30)   # warm: loads the model once
+        assert out, "no windows scored"
+        return _best_of(lambda: infer.score_windows(srt, top_n=30), repeats=3), {"segments": 500}
+    finally:
+        infer.MODEL_DIR = prev
+
+
+def case_cut_clips(fx):
+    """Pool cut of 4 clips from a lavfi test video, with a compressed rendition each."""
+    _require_ffmpeg()
+    from src.clip_extractor import cut_clips
+    from src.utils.transcript import format_srt_time
+    video = fx.video
+    out_dir = os.path.join(fx.root, "clips")
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [{"start": format_srt_time(s).replace(",", "."), "end": format_srt_time(s + 5).replace(",", "."),
+             "start_s": s, "end_s": s + 5,
+             "output": os.path.join(out_dir, f"clip_{i}.mp4"),
+             "compressed": os.path.join(out_dir, f"clip_{i}_240p.mp4")}
+            for i, s in enumerate((1.0, 8.0, 15.0, 22.0), start=1)]
+
+    def run():
+        results = cut_clips(video, jobs)
+        bad = [r for r in results if not r["ok"]]
+        assert not bad, f"cut failed: {bad[0]['error']}"
+    return _best_of(run, repeats=3), {"clips": len(jobs), "video_s": VIDEO_SECONDS}
+
+
+CASES = {
+    "read_srt": case_read_srt,
+    "make_windows": case_make_windows,
+    "select_windows": case_select_windows,
+    "silence_index": case_silence_index,
+    "align_to_silence": case_align_to_silence,
+    "trim_srt_to_range": case_trim_srt_to_range,
+    "keyword_fallback": case_keyword_fallback,
+    "score_windows": case_score_windows,
+    "cut_clips": case_cut_clips,
+}
+
+
+# ---------------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------------
+def load_baselines(path: str = BASELINES_FILE) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("cases", {})
+
+
+def save_baselines(results: dict, path: str = BASELINES_FILE):
+    """Merge measured cases into the baseline file (skipped cases keep their old entry)."""
+    cases = load_baselines(path)
+    cases.update({name: {"seconds": round(r["seconds"], 5), **r["details"]}
+                  for name, r in results.items() if r["status"] == "ran"})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"machine": {"python": platform.python_version(), "platform": platform.platform(),
+                               "cpus": os.cpu_count()},
+                   "cases": dict(sorted(cases.items()))}, f, indent=2)
+        f.write("\n")
+
+
+def run_suite(names, workdir: str) -> dict:
+    fx = Fixtures(workdir)
+    results = {}
+    for name in names:
+        try:
+            seconds, details = CASES[name](fx)
+            results[name] = {"status": "ran", "seconds": seconds, "details": details}
+        except Skip as e:
+            results[name] = {"status": "skipped", "reason": str(e)}
+        except Exception as e:
+            results[name] = {"status": "error", "reason": f"{type(e).__name__}: {e}"}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="record the measured times as new baselines")
+    parser.add_argument("--only", nargs="+", choices=list(CASES), help="run only these cases")
+    parser.add_argument("--keep", action="store_true", help="keep the generated fixtures")
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines()
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    try:
+        results = run_suite(args.only or list(CASES), workdir)
+    finally:
+        if args.keep:
+            print(f"📁 Fixtures kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = False
+    for name, r in results.items():
+        if r["status"] == "skipped":
+            print(f"⏭️ {name}: skipped ({r['reason']})")
+            continue
+        if r["status"] == "error":
+            print(f"❌ {name}: {r['reason']}")
+            failed = True
+            continue
+        base = baselines.get(name, {}).get("seconds")
+        if args.update:
+            note = "no baseline yet" if base is None else f"was {base * 1000:.1f}ms"
+            print(f"📏 {name}: {r['seconds'] * 1000:.1f}ms ({note})")
+            continue
+        if base is None:
+            # A case that ran without a baseline can never regress: make the gap loud
+            print(f"❌ {name}: {r['seconds'] * 1000:.1f}ms, no baseline recorded "
+                  f"(run with --update on a machine that has its dependencies)")
+            failed = True
+            continue
+        limit = base * TOLERANCE + SLACK_S
+        ok = r["seconds"] <= limit
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {name}: {r['seconds'] * 1000:.1f}ms "
+              f"(baseline {base * 1000:.1f}ms, x{r['seconds'] / base:.2f})")
+
+    if args.update:
+        save_baselines(results)
+        print(f"💾 Baselines written to {BASELINES_FILE}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
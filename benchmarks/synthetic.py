@@ -0,0 +1,96 @@
+"""
+Synthetic fixtures for the offline benchmarks (no network, fixed seeds).
+
+- make_srt:   transcript of n segments with keyword-bearing text
+- make_audio: raw f32 PCM of tones separated by known silences
+- make_video: tiny H.264 + AAC clip from ffmpeg's lavfi test sources
+- make_tiny_regressor: randomly initialised 1-layer DistilBERT checkpoint
+  with a local WordPiece vocab, loadable by the model registry
+"""
+
+import os, shutil, subprocess
+import numpy as np
+from src.ml.heuristics import STRONG_KWS, FALLBACK_KWS
+from src.utils.audio_utils import SAMPLE_RATE
+from src.utils.transcript import format_srt_time
+
+FILLER = ("so", "and", "then", "we", "you", "the", "a", "it", "is", "was", "really", "think",
+          "people", "game", "time", "good", "right", "know", "what", "this", "that", "year")
+VOCAB = sorted(set(FILLER) | STRONG_KWS | set(FALLBACK_KWS))
+
+
+def make_srt(path: str, n_segments: int = 1000, seed: int = 0, seg_len=(1.5, 4.0), gap=(0.0, 0.6)):
+    """Write an SRT of n_segments; returns the list of (start, end, text)."""
+    rng = np.random.default_rng(seed)
+    words = np.array(VOCAB)
+    segs, t = [], 0.0
+    for _ in range(n_segments):
+        t += rng.uniform(*gap)
+        dur = rng.uniform(*seg_len)
+        text = " ".join(rng.choice(words, size=int(rng.integers(4, 16))))
+        if rng.random() < 0.1:
+            text += rng.choice(["?", "!"])
+        segs.append((t, t + dur, text))
+        t += dur
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(f"{i}\n{format_srt_time(s)} --> {format_srt_time(e)}\n{text}"
+                            for i, (s, e, text) in enumerate(segs, start=1)))
+    return segs
+
+
+def make_audio(path: str, seconds: float = 300.0, seed: int = 0, silence_len: float = 0.5,
+               spacing=(4.0, 9.0), sr: int = SAMPLE_RATE):
+    """
+    Write raw mono float32 PCM (the pipeline's .f32 format): tones at about
+    -12 dBFS with exact digital silence at known places.
+    Returns the silences as a list of (start, end) seconds.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    t = np.arange(n, dtype=np.float32) / sr
+    y = (0.25 * np.sin(2 * np.pi * 220.0 * t) * (1 + 0.2 * np.sin(2 * np.pi * 0.5 * t))).astype(np.float32)
+    silences, pos = [], rng.uniform(*spacing)
+    while pos + silence_len < seconds:
+        y[int(pos * sr):int((pos + silence_len) * sr)] = 0.0
+        silences.append((pos, pos + silence_len))
+        pos += silence_len + rng.uniform(*spacing)
+    y.tofile(path)
+    return silences
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+
+def make_video(path: str, seconds: int = 30, size: str = "320x240", rate: int = 25, gop: int = 50):
+    """Tiny test clip from lavfi (testsrc + sine), H.264 with a keyframe every gop frames."""
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc=size={size}:rate={rate}",
+        "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=16000",
+        "-t", str(seconds), "-c:v", "libx264", "-preset", "ultrafast", "-g", str(gop),
+        "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path,
+    ], check=True)
+    return path
+
+
+def make_tiny_regressor(model_dir: str, seed: int = 0):
+    """Random 1-layer DistilBERT regressor + local vocab tokenizer (no download)."""
+    import torch
+    from transformers import BertTokenizerFast, DistilBertConfig, DistilBertForSequenceClassification
+    from src.ml.model_registry import write_checkpoint_stamp
+
+    os.makedirs(model_dir, exist_ok=True)
+    vocab_file = os.path.join(model_dir, "vocab.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "?", "!", "'"] + VOCAB) + "\n")
+    tok = BertTokenizerFast(vocab_file=vocab_file, do_lower_case=True)
+
+    torch.manual_seed(seed)
+    config = DistilBertConfig(vocab_size=len(tok), dim=32, hidden_dim=64, n_layers=1, n_heads=2,
+                              max_position_embeddings=512, num_labels=1)
+    model = DistilBertForSequenceClassification(config)
+    model.save_pretrained(model_dir)
+    tok.save_pretrained(model_dir)
+    write_checkpoint_stamp(model_dir, base_model="tiny-random")
+    return model_dir
@@ -1,40 +1,56 @@
-import subprocess
+import sys
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from src.clip_extractor import (
+    COMPRESS_SETTINGS, compress_video, load_compress_manifest, save_compress_manifest, error_text,
+)
+from src.utils.file_utils import file_sha1
 
 INPUT_DIR = Path("data/clips")
 OUTPUT_DIR = Path("data/clips_compressed")
+MAX_WORKERS = 4   # concurrent ffmpeg processes
 
 # Create output folder
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-def compress_video(in_file: Path, out_file: Path):
-    """
-    Compress video using ffmpeg (240p, low bitrate, keep audio).
-    """
-    cmd = [
-        "ffmpeg",
-        "-y",                      # overwrite without asking
-        "-i", str(in_file),        # input file
-        "-vf", "scale=426:240",    # resize to 240p
-        "-b:v", "500k",            # set video bitrate
-        "-c:a", "aac",             # encode audio with AAC
-        "-b:a", "64k",             # compress audio to 64 kbps
-        str(out_file)
-    ]
+def compress_one(in_file: Path, out_file: Path):
     print(f"🎬 Compressing {in_file} -> {out_file}")
-    subprocess.run(cmd, check=True)
+    try:
+        compress_video(str(in_file), str(out_file), COMPRESS_SETTINGS, quiet=True)
+        return None
+    except Exception as e:
+        return error_text(e)
 
-def main():
-    mp4_files = list(INPUT_DIR.glob("*.mp4"))
+def main(max_workers=MAX_WORKERS):
+    """
+    Compress every clip that is new or changed since the last run. Clips
+    compressed by the pipeline's cut stage are already in the manifest.
+    """
+    mp4_files = sorted(INPUT_DIR.glob("*.mp4"))
     if not mp4_files:
         print("⚠️ No .mp4 files found in", INPUT_DIR)
         return
 
+    manifest = load_compress_manifest(str(OUTPUT_DIR))
+    todo = []
     for f in mp4_files:
-        out_f = OUTPUT_DIR / f.name
-        compress_video(f, out_f)
+        entry = {"sha1": file_sha1(str(f)), "settings": COMPRESS_SETTINGS}
+        if manifest.get(f.name) == entry and (OUTPUT_DIR / f.name).exists():
+            continue
+        todo.append((f, entry))
+    print(f"📦 {len(mp4_files)} clips, {len(todo)} to compress")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(todo) or 1))) as pool:
+        errors = list(pool.map(lambda t: compress_one(t[0], OUTPUT_DIR / t[0].name), todo))
+    for (f, entry), error in zip(todo, errors):
+        if error:
+            print(f"❌ Failed {f}: {error}")
+            manifest.pop(f.name, None)
+        else:
+            manifest[f.name] = entry
+    save_compress_manifest(str(OUTPUT_DIR), manifest)
 
     print(f"\n✅ Compression finished. Compressed files are in {OUTPUT_DIR}")
 
 if __name__ == "__main__":
-    main()
+    main(*(int(a) for a in sys.argv[1:2]))
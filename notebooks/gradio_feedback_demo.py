@@ -1,23 +1,29 @@
 import gradio as gr
-import json, glob, os, subprocess
+import os, sys, atexit
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # run as a script from anywhere
+from src.utils import feedback_store, run_catalog
+from src.utils.feedback_sync import GitFeedbackWriter
+
 # Paths
 RUNS_DIR = Path("runs")
-FEEDBACK_FILE = Path("data/feedback.jsonl")
+FEEDBACK_FILE = Path("data/feedback.jsonl")   # pushed to the Hugging Face dataset repo
 FEEDBACK_FILE.parent.mkdir(parents=True, exist_ok=True)
 
-# Load latest run file
+# Commits + pushes happen in batches on a background thread, not per click
+writer = GitFeedbackWriter(repo_dir=".", target_file=str(FEEDBACK_FILE), remote="hf-dataset", branch="main")
+atexit.register(writer.close)
+
+# Load latest run from the run catalog
 def get_latest_run():
-    logs = sorted(glob.glob("runs/*.json"), key=os.path.getmtime, reverse=True)
-    if not logs:
+    run = run_catalog.latest_run()   # indexed query; log_run records new runs itself
+    if run is None:
         return [], "⚠️ No run found"
-    latest = logs[0]
-    with open(latest, "r") as f:
-        run_data = json.load(f)
-    return run_data["clips"], f"Loaded {os.path.basename(latest)}"
+    return run["clips"], f"Loaded {os.path.basename(run['log_file'])}"
 
+run_catalog.sync()   # once per process: index run files logged elsewhere (e.g. pulled from git)
 clips, status = get_latest_run()
 
 # ---- Helper functions ----
@@ -39,27 +45,24 @@ def review_clip(i, label):
     clip = clips[i]
     clip["label"] = label
 
-    # ✅ Save locally
+    # ✅ Save locally (deduplicated)
     feedback_entry = {
         "timestamp": datetime.utcnow().isoformat(),
-        "clip_rank": clip["rank"],
         "clip_file": clip["file"],
         "score": clip["score"],
+        "times": clip.get("times"),
         "text": clip["text"],
         "label": label,
     }
-    with open(FEEDBACK_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(feedback_entry, ensure_ascii=False) + "\n")
-
-    # ✅ Push globally to Hugging Face dataset repo
-    try:
-        subprocess.run(["git", "add", str(FEEDBACK_FILE)], check=True)
-        subprocess.run(["git", "commit", "-m", f"Add feedback for clip {clip['rank']}"], check=True)
-        subprocess.run(["git", "push", "hf-dataset", "main"], check=True)
-    except Exception as e:
-        return f"⚠️ Saved locally, but failed to push: {e}"
-
-    return f"✅ Saved feedback for clip {i+1} (label={label})"
+    feedback_store.add_feedback([feedback_entry], source="gradio")
+
+    # ✅ Queue for the Hugging Face dataset repo (pushed in batches)
+    if not writer.submit(feedback_store.normalize(feedback_entry, source="gradio")):
+        return f"⚠️ Saved locally, push queue is full ({writer.pending()} pending), try again shortly"
+    if writer.last_error:
+        return f"⚠️ Saved feedback for clip {i+1}, but the last push failed: {writer.last_error}"
+
+    return f"✅ Saved feedback for clip {i+1} (label={label}, {writer.pending()} waiting to push)"
 
 # ---- UI ----
 with gr.Blocks() as demo:
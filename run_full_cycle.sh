@@ -5,7 +5,7 @@ CLEAN_ALL=${1:-false}
 
 if [ "$CLEAN_ALL" = true ]; then
   echo "🧹 Cleaning EVERYTHING (clips, audio, transcripts, runs, reviews, datasets, models)"
-  rm -rf data/audio/* data/clips/* data/transcripts/* runs/* notebooks/reviews/* data/datasets/* models/highlight-text-regressor/*
+  rm -rf data/audio/* data/clips/* data/transcripts/* runs/* notebooks/reviews/* data/datasets/* data/feedback.sqlite* models/highlight-text-regressor*
 else
   echo "🧹 Cleaning working dirs (clips, audio, transcripts)"
   rm -rf data/audio/* data/clips/* data/transcripts/*
@@ -20,7 +20,12 @@ python notebooks/gradio_feedback_demo.py
 echo "📦 Consolidating feedback..."
 python -m src.ml.build_feedback_dataset
 
-echo "🧠 Retraining transformer model..."
-python -m src.ml.train_text_regressor
+if [ "$CLEAN_ALL" = true ] || [ "${FULL_RETRAIN:-false}" = true ]; then
+  echo "🧠 Retraining transformer model from scratch..."
+  python -m src.ml.train_text_regressor
+else
+  echo "🧠 Warm-start fine-tuning on new feedback..."
+  python -m src.ml.train_text_regressor --incremental
+fi
 
 echo "✅ Full cycle completed!"
@@ -0,0 +1,140 @@
+"""
+Batch runner: many videos, one isolated workspace each, stages overlapped.
+
+- Every video gets its own workspace (data/batch/<name>-<hash>/audio,
+  transcripts, clips, clips_compressed), so runs never clean or overwrite
+  each other's files.
+- Each video is driven by its own thread through the usual stages; a
+  semaphore per stage caps how many videos are in that stage at once
+  (STAGE_LIMITS). While video N is being scored and cut, video N+1 is
+  already transcribing, without oversubscribing the CPU.
+
+    python -m src.batch data/videos/            # every video in a directory
+    python -m src.batch videos.txt --transcribe 2
+"""
+
+import os, sys, json, hashlib, threading, argparse, time
+from concurrent.futures import ThreadPoolExecutor
+import src.pipeline as pipeline
+from src.pipeline import Workspace
+from src.highlight_detector import extract_highlights
+from src.utils import metrics
+
+BATCH_ROOT = "data/batch"
+VIDEO_EXTS = (".mp4", ".mov", ".mkv", ".webm", ".avi")
+# Max videos inside each stage at once. Transcription already fans out to
+# a process pool per video, so one at a time keeps all cores busy.
+STAGE_LIMITS = {"audio": 4, "transcribe": 1, "score": 1, "cut": 2}
+
+
+def load_videos(source: str):
+    """Videos from a directory, a .txt manifest (one path per line) or a .json list."""
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, f) for f in os.listdir(source) if f.lower().endswith(VIDEO_EXTS))
+    with open(source, "r", encoding="utf-8") as f:
+        if source.endswith(".json"):
+            data = json.load(f)
+            return list(data["videos"] if isinstance(data, dict) else data)
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def workspace_for(video: str, root: str = BATCH_ROOT) -> Workspace:
+    """Stable per-video workspace (two videos with the same name don't collide)."""
+    stem = os.path.splitext(os.path.basename(video))[0]
+    h = hashlib.sha1(os.path.abspath(video).encode("utf-8")).hexdigest()[:8]
+    return Workspace(os.path.join(root, f"{stem}-{h}"))
+
+
+class _Stages:
+    """One semaphore per stage, plus how long videos waited for each."""
+
+    def __init__(self, limits: dict):
+        self.sems = {name: threading.Semaphore(n) for name, n in limits.items()}
+        self.waited = {name: 0.0 for name in limits}
+        self._lock = threading.Lock()
+
+    def run(self, name, fn, *args):
+        t0 = time.perf_counter()
+        with self.sems[name]:
+            with self._lock:
+                self.waited[name] += time.perf_counter() - t0
+            metrics.count(f"{name}_queue_s", round(time.perf_counter() - t0, 4))
+            with metrics.span(name):
+                return fn(*args)
+
+
+def _audio(video: str, ws: Workspace):
+    """Audio stage: content hash (for the stage cache) + extraction."""
+    with metrics.span("source_hash"):
+        source = pipeline.source_hash(video)
+    return pipeline.prepare_audio(video, ws, source), source
+
+
+def process_video(video: str, stages: _Stages, root: str = BATCH_ROOT, model_used: str = "transformer") -> dict:
+    """All stages for one video, each behind its stage semaphore."""
+    ws = workspace_for(video, root)
+    metrics.start_run()   # this thread's run; log_run stores it
+    try:
+        pipeline.auto_clean(ws)
+        audio, source = stages.run("audio", _audio, video, ws)
+        transcript = stages.run("transcribe", pipeline.transcribe, audio, ws, source)
+        highlights = stages.run("score", extract_highlights, transcript, pipeline.TOP_N_HIGHLIGHTS)
+        if not highlights:
+            print(f"⚠️ {video}: no highlights detected")
+            return {"video": video, "workspace": ws.root, "ok": True, "clips": [], "log": None}
+        clips = stages.run("cut", pipeline.cut_highlights, video, highlights, ws.audio_file, transcript, ws)
+        log_file = pipeline.log_run(video, clips, model_used=model_used, ws=ws) if clips else None
+        return {"video": video, "workspace": ws.root, "ok": True, "clips": clips, "log": log_file}
+    except Exception as e:
+        print(f"❌ {video}: {e}")
+        return {"video": video, "workspace": ws.root, "ok": False, "error": str(e)}
+
+
+def run_batch(videos, root: str = BATCH_ROOT, limits: dict = None, max_in_flight: int = None,
+              model_used: str = "transformer"):
+    """
+    Run the pipeline over many videos with overlapping stages.
+    max_in_flight caps videos admitted at once (default: the sum of stage
+    limits, enough to keep every stage fed). Returns one result dict per video.
+    """
+    limits = {**STAGE_LIMITS, **(limits or {})}
+    stages = _Stages(limits)
+    max_in_flight = max_in_flight or sum(limits.values())
+    print(f"📚 Batch of {len(videos)} videos, stage limits {limits}")
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_in_flight, len(videos)))) as pool:
+        results = list(pool.map(lambda v: process_video(v, stages, root, model_used), videos))
+    ok = sum(r["ok"] for r in results)
+    waits = ", ".join(f"{k}={v:.1f}s" for k, v in stages.waited.items())
+    print(f"✅ {ok}/{len(videos)} videos done in {time.perf_counter() - t0:.1f}s (queueing: {waits})")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.batch", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="directory of videos, .txt manifest or .json list")
+    parser.add_argument("--root", default=BATCH_ROOT, help="where the per-video workspaces go")
+    parser.add_argument("--top-n", type=int, default=pipeline.TOP_N_HIGHLIGHTS)
+    parser.add_argument("--scorer", choices=["transformer", "embedding", "keywords"])
+    parser.add_argument("--in-flight", type=int, help="max videos in progress at once")
+    for name, n in STAGE_LIMITS.items():
+        parser.add_argument(f"--{name}", type=int, default=n, help=f"max videos in the {name} stage (default {n})")
+    args = parser.parse_args(argv)
+
+    pipeline.TOP_N_HIGHLIGHTS = args.top_n
+    if args.scorer:
+        import src.highlight_detector as hd
+        hd.SCORER = args.scorer
+    videos = load_videos(args.source)
+    if not videos:
+        print(f"⚠️ No videos found in {args.source}")
+        return []
+    limits = {name: getattr(args, name) for name in STAGE_LIMITS}
+    results = run_batch(videos, args.root, limits, args.in_flight, model_used=args.scorer or "transformer")
+    if not all(r["ok"] for r in results):
+        sys.exit(1)
+    return results
+
+
+if __name__ == "__main__":
+    main()
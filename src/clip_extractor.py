@@ -2,9 +2,35 @@
 Phase 3 - Clip Extractor with optional subtitle overlay
 """
 
+import os, json, math, shutil, tempfile, threading, contextvars
+from bisect import bisect_left, bisect_right
 import ffmpeg
+from concurrent.futures import ThreadPoolExecutor
+from src.utils import metrics
 
-def cut_clip(input_video: str, start: str, end: str, output_file: str):
+MAX_CUT_WORKERS = min(4, os.cpu_count() or 1)   # concurrent ffmpeg processes
+KEYFRAME_SUFFIX = ".keyframes.json"
+SMART_CUT_ENCODERS = {"h264": "libx264", "hevc": "libx265"}
+# ffprobe profile name -> encoder -profile:v value; other profiles can't be matched
+SMART_CUT_PROFILES = {
+    "h264": {"Constrained Baseline": "baseline", "Baseline": "baseline", "Main": "main", "High": "high",
+             "High 10": "high10", "High 4:2:2": "high422", "High 4:4:4 Predictive": "high444"},
+    "hevc": {"Main": "main", "Main 10": "main10", "Main Still Picture": "mainstillpicture"},
+}
+SMART_CUT_AUDIO = {"aac": "aac", "mp3": "libmp3lame", "opus": "libopus", "ac3": "ac3", "flac": "flac"}
+KEYFRAME_INDEX_VERSION = 2   # bump when _probe_keyframes returns new fields
+MIN_PARTIAL_GOP = 0.001   # seconds; shorter head/tail pieces are skipped
+# Low-bitrate rendition for sharing (compress_clips.py / cut_clips "compressed" output)
+COMPRESS_SETTINGS = {"scale": "426:240", "video_bitrate": "500k", "acodec": "aac", "audio_bitrate": "64k"}
+COMPRESS_MANIFEST = "manifest.json"
+
+def _ffmpeg_run(stream, quiet: bool = False):
+    """ffmpeg.run, counted and timed into the current run's metrics."""
+    metrics.count("ffmpeg_invocations")
+    with metrics.span("ffmpeg"):
+        return ffmpeg.run(stream, quiet=quiet)
+
+def cut_clip(input_video: str, start: str, end: str, output_file: str, quiet: bool = False):
     """Cut a video segment using ffmpeg (no subtitles)."""
     stream = (
         ffmpeg
@@ -12,7 +38,7 @@ def cut_clip(input_video: str, start: str, end: str, output_file: str):
         .output(output_file, codec="copy")
         .overwrite_output()
     )
-    ffmpeg.run(stream)
+    _ffmpeg_run(stream, quiet=quiet)
 
 def burn_subtitles(input_video: str, subtitle_file: str, output_file: str):
     """Burn subtitles into video permanently."""
@@ -22,7 +48,7 @@ def burn_subtitles(input_video: str, subtitle_file: str, output_file: str):
         .output(output_file, vf=f"subtitles={subtitle_file}")
         .overwrite_output()
     )
-    ffmpeg.run(stream)
+    _ffmpeg_run(stream)
 
 def cut_with_subtitles(input_video: str, start: str, end: str, subtitle_file: str, output_file: str):
     """Cut video segment and burn subtitles in one step."""
@@ -32,7 +58,344 @@ def cut_with_subtitles(input_video: str, start: str, end: str, subtitle_file: st
         .output(output_file, vf=f"subtitles={subtitle_file}")
         .overwrite_output()
     )
-    ffmpeg.run(stream)
+    _ffmpeg_run(stream)
+
+_keyframes = {}   # video path -> (stamp, index)
+_keyframes_lock = threading.Lock()
+
+def _frame_rate(rate) -> float:
+    """'30000/1001' -> 29.97; None for missing or '0/0'."""
+    try:
+        num, _, den = (rate or "").partition("/")
+        fps = float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return fps if fps > 0 else None
+
+def _probe_keyframes(input_video: str) -> dict:
+    """Read keyframe times (packet flags, no decode), video stream info and audio stream info."""
+    metrics.count("ffprobe_invocations", 2)
+    with metrics.span("ffprobe", op="keyframes"):
+        info = ffmpeg.probe(input_video, select_streams="v:0",
+                            show_entries="packet=pts_time,flags:stream=codec_name,pix_fmt,width,height,"
+                                         "time_base,profile,level,avg_frame_rate,r_frame_rate")
+        audio_info = ffmpeg.probe(input_video, select_streams="a:0",
+                                  show_entries="stream=codec_name,profile,sample_rate,channels")
+    stream = info["streams"][0] if info.get("streams") else {}
+    audio = audio_info["streams"][0] if audio_info.get("streams") else None
+    times = sorted(
+        float(p["pts_time"]) for p in info.get("packets", [])
+        if "K" in p.get("flags", "") and p.get("pts_time") not in (None, "N/A")
+    )
+    return {
+        "keyframes": times,
+        "codec": stream.get("codec_name"),
+        "profile": stream.get("profile"),
+        "level": stream.get("level"),
+        "pix_fmt": stream.get("pix_fmt"),
+        "width": stream.get("width"),
+        "height": stream.get("height"),
+        "time_base": stream.get("time_base"),
+        "fps": _frame_rate(stream.get("avg_frame_rate")) or _frame_rate(stream.get("r_frame_rate")),
+        "audio": audio and {
+            "codec": audio.get("codec_name"),
+            "profile": audio.get("profile"),
+            "sample_rate": audio.get("sample_rate"),
+            "channels": audio.get("channels"),
+        },
+    }
+
+def keyframe_index(input_video: str) -> dict:
+    """
+    Keyframe index of the source, built once with ffprobe.
+    Cached in-process and on disk next to the video (<video>.keyframes.json)
+    as long as the video's size and mtime are unchanged.
+    """
+    st = os.stat(input_video)
+    stamp = [st.st_size, st.st_mtime_ns]
+    with _keyframes_lock:
+        cached = _keyframes.get(input_video)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        cache_file = input_video + KEYFRAME_SUFFIX
+        index = None
+        if os.path.exists(cache_file):
+            with open(cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("stamp") == stamp and data.get("version") == KEYFRAME_INDEX_VERSION:
+                index = data["index"]
+        if index is None:
+            index = _probe_keyframes(input_video)
+            try:
+                with open(cache_file, "w", encoding="utf-8") as f:
+                    json.dump({"version": KEYFRAME_INDEX_VERSION, "stamp": stamp, "index": index}, f)
+            except OSError:
+                pass  # read-only media dir: in-process cache only
+
+        _keyframes[input_video] = (stamp, index)
+        return index
+
+def _piece_settings(index: dict):
+    """
+    Encoder options whose output concats cleanly with stream-copied packets
+    of the source: same codec, profile, level, pixel format, size, timescale
+    and audio codec / sample rate / channels. None when any of them can't be
+    matched (unsupported codec or profile, unknown audio codec).
+    """
+    codec = index.get("codec")
+    profile = SMART_CUT_PROFILES.get(codec, {}).get(index.get("profile"))
+    if codec not in SMART_CUT_ENCODERS or profile is None or not index.get("pix_fmt"):
+        return None
+    kwargs = {"vcodec": SMART_CUT_ENCODERS[codec], "profile:v": profile, "pix_fmt": index["pix_fmt"]}
+    level = index.get("level")
+    if level and level > 0:
+        if codec == "h264":
+            kwargs["level"] = f"{level / 10:.1f}"
+        else:   # hevc: ffprobe reports general_level_idc = level * 30
+            kwargs["x265-params"] = f"level-idc={level / 30:.1f}"
+    if index.get("width") and index.get("height"):
+        kwargs["s"] = f"{index['width']}x{index['height']}"
+    if index.get("time_base"):
+        kwargs["video_track_timescale"] = index["time_base"].split("/")[-1]
+
+    audio = index.get("audio")
+    if audio:
+        if audio.get("codec") not in SMART_CUT_AUDIO or (audio["codec"] == "aac" and audio.get("profile") not in (None, "LC")):
+            return None
+        kwargs["acodec"] = SMART_CUT_AUDIO[audio["codec"]]
+        if audio.get("sample_rate"):
+            kwargs["ar"] = audio["sample_rate"]
+        if audio.get("channels"):
+            kwargs["ac"] = audio["channels"]
+    return kwargs
+
+def _encode_piece(input_video: str, start: float, end: float, output_file: str, settings: dict,
+                  quiet: bool, frames: int = None):
+    """Re-encode [start, end) with settings from _piece_settings; frames caps the video frame count."""
+    kwargs = dict(settings)
+    if frames:
+        kwargs["frames:v"] = frames
+    stream = (
+        ffmpeg
+        .input(input_video, ss=start, t=end - start)
+        .output(output_file, **kwargs)
+        .overwrite_output()
+    )
+    _ffmpeg_run(stream, quiet=quiet)
+
+def _concat_entry(path: str) -> str:
+    """One concat-demuxer line; a quote inside the quoted path is written as '\\''."""
+    return "file '" + path.replace("'", "'\\''") + "'\n"
+
+def smart_cut(input_video: str, start: float, end: float, output_file: str, quiet: bool = False):
+    """
+    Frame-accurate cut at near stream-copy speed.
+    Only the partial GOPs before the first and after the last keyframe inside
+    [start, end] are re-encoded; everything in between is stream-copied and
+    the pieces are joined with the concat demuxer. When no whole GOP fits in
+    the clip it is re-encoded with the same settings; when the source's
+    codec, profile or audio can't be matched it falls back to cut_clip's
+    keyframe-aligned stream copy.
+    """
+    index = keyframe_index(input_video)
+    settings = _piece_settings(index)
+    if settings is None:
+        cut_clip(input_video, start, end, output_file, quiet=quiet)
+        return
+
+    kfs = index["keyframes"]
+    i1 = bisect_left(kfs, start)
+    i2 = bisect_right(kfs, end) - 1
+    if i1 >= len(kfs) or i2 < 0 or kfs[i1] >= kfs[i2]:
+        _encode_piece(input_video, start, end, output_file, settings, quiet)
+        return
+
+    k1, k2 = kfs[i1], kfs[i2]
+    tmp_dir = tempfile.mkdtemp(prefix="smartcut_", dir=os.path.dirname(os.path.abspath(output_file)))
+    try:
+        pieces = []
+        if k1 - start > MIN_PARTIAL_GOP:
+            # The head ends on the frame before k1: a -t cut alone can round
+            # up and emit k1 too, which the copied middle starts with
+            fps = index.get("fps")
+            frames = max(1, math.ceil((k1 - start) * fps - 1e-3)) if fps else None
+            head = os.path.join(tmp_dir, "head.mp4")
+            _encode_piece(input_video, start, k1, head, settings, quiet, frames=frames)
+            pieces.append(head)
+
+        middle = os.path.join(tmp_dir, "middle.mp4")
+        _ffmpeg_run(
+            ffmpeg.input(input_video, ss=k1, t=k2 - k1)
+            .output(middle, codec="copy", avoid_negative_ts="make_zero")
+            .overwrite_output(),
+            quiet=quiet,
+        )
+        pieces.append(middle)
+
+        if end - k2 > MIN_PARTIAL_GOP:
+            tail = os.path.join(tmp_dir, "tail.mp4")
+            _encode_piece(input_video, k2, end, tail, settings, quiet)
+            pieces.append(tail)
+
+        list_file = os.path.join(tmp_dir, "pieces.txt")
+        with open(list_file, "w", encoding="utf-8") as f:
+            f.writelines(_concat_entry(p) for p in pieces)
+        _ffmpeg_run(
+            ffmpeg.input(list_file, format="concat", safe=0)
+            .output(output_file, codec="copy")
+            .overwrite_output(),
+            quiet=quiet,
+        )
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _scaled(video, settings=COMPRESS_SETTINGS):
+    w, h = settings["scale"].split(":")
+    return video.filter("scale", w, h)
+
+def _compress_kwargs(settings=COMPRESS_SETTINGS) -> dict:
+    return {k: settings[k] for k in ("video_bitrate", "acodec", "audio_bitrate")}
+
+def compress_video(in_file: str, out_file: str, settings: dict = COMPRESS_SETTINGS, quiet: bool = False):
+    """Compress a clip (240p, low bitrate, keep audio)."""
+    inp = ffmpeg.input(in_file)
+    stream = ffmpeg.output(_scaled(inp.video, settings), inp.audio, out_file, **_compress_kwargs(settings))
+    _ffmpeg_run(stream.overwrite_output(), quiet=quiet)
+
+def load_compress_manifest(out_dir: str) -> dict:
+    """{compressed file name: {"sha1": source clip hash, "settings": ...}}"""
+    path = os.path.join(out_dir, COMPRESS_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_compress_manifest(out_dir: str, manifest: dict):
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, COMPRESS_MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def error_text(e: Exception) -> str:
+    """Last lines of ffmpeg's stderr (or the exception text)."""
+    stderr = getattr(e, "stderr", None)
+    if stderr:
+        lines = stderr.decode("utf-8", errors="replace").strip().splitlines()
+        return " | ".join(lines[-3:])
+    return str(e)
+
+def _job_output(input_video: str, job: dict, quiet: bool, smart: bool = False):
+    """
+    Run one cut job (dict with start, end, output, optional subtitles and
+    optional compressed path). The compressed rendition comes from the same
+    ffmpeg process / decode as the clip.
+    """
+    compressed = job.get("compressed")
+    if smart and not job.get("subtitles"):
+        smart_cut(input_video, job["start_s"], job["end_s"], job["output"], quiet=quiet)
+        if compressed:
+            # The smart cut copies most packets without decoding; the small
+            # rendition is the only full decode of this range
+            inp = ffmpeg.input(input_video, ss=job["start_s"], t=job["end_s"] - job["start_s"])
+            _ffmpeg_run(ffmpeg.output(_scaled(inp.video), inp.audio, compressed, **_compress_kwargs())
+                       .overwrite_output(), quiet=quiet)
+        return
+    if not compressed:
+        kwargs = {"vf": f"subtitles={job['subtitles']}"} if job.get("subtitles") else {"codec": "copy"}
+        stream = (
+            ffmpeg
+            .input(input_video, ss=job["start"], to=job["end"])
+            .output(job["output"], **kwargs)
+            .overwrite_output()
+        )
+        _ffmpeg_run(stream, quiet=quiet)
+        return
+
+    inp = ffmpeg.input(input_video, ss=job["start"], to=job["end"])
+    if job.get("subtitles"):
+        split = inp.video.filter("subtitles", job["subtitles"]).split()
+        full = ffmpeg.output(split[0], inp.audio, job["output"])
+        small = split[1]
+    else:
+        full = ffmpeg.output(inp.video, inp.audio, job["output"], codec="copy")
+        small = inp.video
+    small = ffmpeg.output(_scaled(small), inp.audio, compressed, **_compress_kwargs())
+    _ffmpeg_run(ffmpeg.merge_outputs(full, small).overwrite_output(), quiet=quiet)
+
+def _single_pass_outputs(input_video: str, jobs: list):
+    """One ffmpeg invocation: demux the source once, one output per job."""
+    inp = ffmpeg.input(input_video)
+    outputs = []
+    for job in jobs:
+        compressed = job.get("compressed")
+        if job.get("subtitles") or compressed:
+            v = inp.video.trim(start=job["start_s"], end=job["end_s"]).setpts("PTS-STARTPTS")
+            a = inp.audio.filter("atrim", start=job["start_s"], end=job["end_s"]).filter("asetpts", "PTS-STARTPTS")
+        if job.get("subtitles"):
+            v = v.filter("subtitles", job["subtitles"])
+            if compressed:
+                v, a = v.split(), a.asplit()
+                outputs.append(ffmpeg.output(v[0], a[0], job["output"]))
+                v, a = v[1], a[1]
+            else:
+                outputs.append(ffmpeg.output(v, a, job["output"]))
+        else:
+            outputs.append(inp.output(job["output"], ss=job["start"], to=job["end"], codec="copy"))
+        if compressed:
+            outputs.append(ffmpeg.output(_scaled(v), a, compressed, **_compress_kwargs()))
+    return ffmpeg.merge_outputs(*outputs).overwrite_output()
+
+def cut_clips(input_video: str, jobs: list, max_workers: int = MAX_CUT_WORKERS,
+              single_pass: bool = False, smart: bool = False):
+    """
+    Cut many clips from one source.
+
+    jobs: dicts with "start"/"end" (ffmpeg time strings), "output", optional
+    "subtitles" (mini SRT to burn in), optional "compressed" (path for a
+    COMPRESS_SETTINGS rendition, written from the same decode) and, for
+    single_pass, "start_s"/"end_s" in seconds.
+    single_pass=True emits every clip from one ffmpeg process; otherwise jobs
+    run on a pool of at most max_workers ffmpeg processes.
+    smart=True (pool mode) cuts clips without subtitles frame-accurately with
+    smart_cut; needs "start_s"/"end_s".
+
+    Returns one {"output", "ok", "error"} dict per job, in job order.
+    """
+    if not jobs:
+        return []
+
+    if single_pass:
+        try:
+            with metrics.span("cut_clip", clips=len(jobs), mode="single_pass"):
+                _ffmpeg_run(_single_pass_outputs(input_video, jobs), quiet=True)
+            error = None
+        except ffmpeg.Error as e:
+            error = error_text(e)
+        results = []
+        for job in jobs:
+            ok = all(os.path.exists(p) and os.path.getsize(p) > 0
+                     for p in (job["output"], job.get("compressed")) if p)
+            results.append({"output": job["output"], "ok": ok and error is None,
+                            "error": None if ok and error is None else (error or "no output written")})
+        return results
+
+    def run(job):
+        try:
+            with metrics.span("cut_clip", output=job["output"], smart=bool(smart and not job.get("subtitles"))):
+                _job_output(input_video, job, quiet=True, smart=smart)
+            return {"output": job["output"], "ok": True, "error": None}
+        except Exception as e:
+            return {"output": job["output"], "ok": False, "error": error_text(e)}
+
+    if smart:
+        keyframe_index(input_video)  # probe once before the workers start
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as pool:
+        # each job carries the caller's context so its spans land in the caller's run
+        futures = [pool.submit(contextvars.copy_context().run, run, job) for job in jobs]
+        return [f.result() for f in futures]
 
 if __name__ == "__main__":
     # Example usage:
@@ -1,26 +1,158 @@
-import whisper
+import numpy as np
+import multiprocessing as mp
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from src.utils.audio_utils import SAMPLE_RATE, is_pcm_file, load_pcm
+from src.utils.transcript import Transcript
 
-def extract_subtitles(audio_path: str, output_srt: str, model_size="base"):
-    """Transcribe audio and save subtitles in SRT format."""
-    model = whisper.load_model(model_size)
-    result = model.transcribe(audio_path)
+# whisper (and torch) are imported on first use, not at module import
+CHUNK_SECONDS = 600.0      # target chunk length in chunked mode
+CHUNK_SEARCH = 30.0        # look this far around each target cut for the quietest point
+SILENCE_FRAME = 0.05       # RMS frame size (seconds) used to find cut points
 
-    def format_time(seconds: float) -> str:
-        hrs, secs = divmod(int(seconds), 3600)
-        mins, secs = divmod(secs, 60)
-        millis = int((seconds % 1) * 1000)
-        return f"{hrs:02}:{mins:02}:{secs:02},{millis:03}"
 
-    with open(output_srt, "w", encoding="utf-8") as f:
-        for i, seg in enumerate(result["segments"], start=1):
-            start = format_time(seg["start"])
-            end = format_time(seg["end"])
-            text = seg["text"].strip()
-            f.write(f"{i}\n{start} --> {end}\n{text}\n\n")
+@lru_cache(maxsize=None)
+def load_model(model_size: str = "base"):
+    """Load a Whisper model once per process."""
+    import whisper
+    return whisper.load_model(model_size)
+
+
+def write_srt(segments, output_srt: str) -> Transcript:
+    """
+    Write Whisper-style segments ({start, end, text}) as an SRT file.
+    The returned Transcript keeps Whisper's float times; later stages that
+    load output_srt in this process get it without parsing the file.
+    """
+    transcript = Transcript.from_segments(segments)
+    transcript.write_srt(output_srt)
+    return transcript
+
+
+def find_split_points(audio: np.ndarray, sr: int = SAMPLE_RATE,
+                      chunk_s: float = CHUNK_SECONDS, search_s: float = CHUNK_SEARCH):
+    """
+    Pick sample offsets to cut long audio into ~chunk_s pieces.
+    Each cut lands on the quietest frame within +/- search_s of the target.
+    """
+    frame = max(1, int(SILENCE_FRAME * sr))
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return []
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+
+    chunk_f = int(chunk_s * sr) // frame
+    search_f = int(search_s * sr) // frame
+    cuts, last = [], 0
+    while n_frames - last > chunk_f + search_f:
+        lo = last + chunk_f - search_f
+        hi = last + chunk_f + search_f
+        best = lo + int(np.argmin(rms[lo:hi]))
+        cuts.append(best * frame)
+        last = best
+    return cuts
+
+
+def _init_worker(num_threads: int):
+    import torch
+    torch.set_num_threads(num_threads)
+
+
+def _transcribe_chunk(model_size: str, audio: np.ndarray, offset: float):
+    """Transcribe one chunk in a pool worker; returns segments in global time."""
+    model = load_model(model_size)
+    result = model.transcribe(audio)
+    duration = len(audio) / SAMPLE_RATE
+    segs = []
+    for seg in result["segments"]:
+        # Whisper occasionally emits timestamps past the end of short inputs
+        if seg["start"] >= duration:
+            continue
+        segs.append({
+            "start": offset + seg["start"],
+            "end": offset + min(seg["end"], duration),
+            "text": seg["text"],
+        })
+    return segs
+
+
+def stitch_segments(chunks):
+    """
+    Merge per-chunk segment lists (already in global time, in chunk order).
+    Drops exact repeats across a seam and clamps overlaps so lines never go
+    backwards in time.
+    """
+    out = []
+    for segs in chunks:
+        for seg in segs:
+            if out:
+                prev = out[-1]
+                if seg["start"] < prev["end"]:
+                    if seg["text"].strip() == prev["text"].strip():
+                        continue
+                    seg = {**seg, "start": prev["end"], "end": max(seg["end"], prev["end"])}
+            out.append(seg)
+    return out
+
+
+def transcribe_chunked(audio: np.ndarray, model_size="base", workers=None,
+                       chunk_s: float = CHUNK_SECONDS):
+    """Split audio at quiet points and transcribe the chunks on a process pool."""
+    cuts = find_split_points(audio, chunk_s=chunk_s)
+    if not cuts:
+        return load_model(model_size).transcribe(audio)["segments"]
+
+    bounds = [0, *cuts, len(audio)]
+    pieces = [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+    workers = min(workers or mp.cpu_count(), len(pieces))
+    threads = max(1, mp.cpu_count() // workers)
+
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker, initargs=(threads,)) as pool:
+        futures = [
+            pool.submit(_transcribe_chunk, model_size, audio[s:e], s / SAMPLE_RATE)
+            for s, e in pieces
+        ]
+        chunks = [f.result() for f in futures]
+    return stitch_segments(chunks)
+
+
+def load_audio(audio) -> np.ndarray:
+    """
+    Accept a 16 kHz float32 PCM array, a raw .f32 PCM file (memory-mapped)
+    or any file ffmpeg can decode.
+    """
+    if isinstance(audio, np.ndarray):
+        return audio
+    if is_pcm_file(audio):
+        return load_pcm(audio)
+    import whisper
+    return whisper.load_audio(audio)
+
+
+def extract_subtitles(audio_path, output_srt: str, model_size="base",
+                      chunked=False, workers=None):
+    """
+    Transcribe audio and save subtitles in SRT format.
+    audio_path may also be a PCM array or .f32 file from extract_audio_pcm.
+    chunked=True splits long audio at silences and transcribes on a process pool.
+    Returns the list of segments written.
+    """
+    audio = load_audio(audio_path)
+
+    if chunked:
+        segments = transcribe_chunked(audio, model_size=model_size, workers=workers)
+    else:
+        segments = load_model(model_size).transcribe(audio)["segments"]
+
+    write_srt(segments, output_srt)
+    return segments
 
 if __name__ == "__main__":
     audio_file = "data/audio/sample.m4a"
     output_srt = "data/transcripts/sample.srt"
     Path("data/transcripts").mkdir(parents=True, exist_ok=True)
-    extract_subtitles(audio_file, output_srt)
\ No newline at end of file
+    extract_subtitles(audio_file, output_srt)
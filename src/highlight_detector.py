@@ -5,12 +5,50 @@ Phase 2 - Highlight Detector
 - Fallback: Simple keyword-based scoring if model not trained.
 """
 
-import os
-import re
 import random
+import numpy as np
+import src.ml.infer_text_regressor as infer_text_regressor
 from src.ml.infer_text_regressor import score_windows
-
-MODEL_DIR = "models/highlight-text-regressor"
+from src.ml.model_registry import MODEL_DIR, model_available, checkpoint_fingerprint, fingerprint_key
+from src.ml.embedding_scorer import score_windows_fast, head_available, HEAD_FILE
+from src.ml.heuristics import scan_segments
+from src.utils import stage_cache
+from src.utils.transcript import load_transcript
+
+# "transformer" = DistilBERT regressor, "embedding" = fast pooled-embedding tier,
+# "keywords" = keyword fallback only (never loads a model)
+SCORER = "transformer"
+
+# Candidate selection for the model path
+CANDIDATES_TOP_K = 30   # windows kept after suppression
+IOU_THRESH = 0.4        # max overlap (IoU) between kept windows
+MIN_GAP = 0.0           # min seconds between kept windows (0 = overlap check only)
+WINDOW_PARAMS = {"min_len": 15.0, "max_len": 45.0, "stride": 5.0}
+CACHE_SCORES = True     # reuse scored candidates for the same transcript + model (stage cache)
+
+
+def _model_identity(scorer) -> str:
+    """What the candidate scores depend on besides the transcript."""
+    if scorer is score_windows_fast:
+        return "embedding:" + stage_cache.content_hash(HEAD_FILE)
+    return f"transformer:{infer_text_regressor.BACKEND}:{fingerprint_key(checkpoint_fingerprint(MODEL_DIR))}"
+
+
+def score_candidates(scorer, srt_file: str):
+    """Windowed + scored + suppressed candidates, cached by transcript hash and model."""
+    params = {**WINDOW_PARAMS, "top_n": CANDIDATES_TOP_K, "iou_thresh": IOU_THRESH, "min_gap": MIN_GAP}
+    key = None
+    if CACHE_SCORES:
+        key = stage_cache.stage_key("scores", srt=stage_cache.content_hash(srt_file),
+                                    model=_model_identity(scorer), **params)
+        cached = stage_cache.load_json("scores", key)
+        if cached is not None:
+            print("♻️ Reusing cached window scores")
+            return cached
+    results = scorer(srt_file, **params)
+    if key and results:
+        stage_cache.store_json("scores", key, results)
+    return results
 
 
 def _format_tuple_list(model_results):
@@ -27,16 +65,17 @@ def extract_highlights(srt_file: str, top_n: int = 5):
     Preferred: Transformer model, with exploration sampling.
     Falls back to keyword-based scoring if model not available.
     """
-    if os.path.isdir(MODEL_DIR):
+    if SCORER == "embedding" and head_available():
+        scorer = score_windows_fast
+    elif SCORER != "keywords" and model_available(MODEL_DIR):
+        scorer = score_windows
+    else:
+        scorer = None
+
+    if scorer is not None:
         try:
             # Get more candidates (e.g. top 30)
-            results = score_windows(
-                srt_file,
-                min_len=15.0,
-                max_len=45.0,
-                stride=5.0,
-                top_n=30
-            )
+            results = score_candidates(scorer, srt_file)
 
             if not results:
                 raise RuntimeError("score_windows returned empty results")
@@ -61,28 +100,15 @@ def extract_highlights(srt_file: str, top_n: int = 5):
     # ----------------------------
     # Fallback: keyword-based scoring
     # ----------------------------
-    HIGHLIGHT_KEYWORDS = [
-        "amazing", "important", "secret",
-        "wow", "never", "always", "hack"
+    # (keywords: heuristics.FALLBACK_KWS, matched in one pass over the transcript)
+    transcript = load_transcript(srt_file)
+    texts = transcript.texts()
+    hits = scan_segments(texts).fallback_hits
+    highlights = [
+        (float(hits[i]), str(i + 1), transcript.srt_times(i), texts[i])
+        for i in np.flatnonzero(hits > 0).tolist()
     ]
 
-    def score_segment(text: str) -> int:
-        """Count keyword matches in the text."""
-        text_lower = text.lower()
-        return sum(1 for kw in HIGHLIGHT_KEYWORDS if re.search(rf"\b{kw}\b", text_lower))
-
-    highlights = []
-    with open(srt_file, "r", encoding="utf-8") as f:
-        content = f.read().strip().split("\n\n")
-
-    for block in content:
-        lines = block.split("\n")
-        if len(lines) >= 3:
-            idx, times, text = lines[0], lines[1], " ".join(lines[2:])
-            score = score_segment(text)
-            if score > 0:
-                highlights.append((float(score), idx, times, text))
-
     highlights.sort(key=lambda x: x[0], reverse=True)
     return highlights[:top_n]
 
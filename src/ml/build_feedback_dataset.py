@@ -1,38 +1,28 @@
 # src/ml/build_feedback_dataset.py
 
-import json, glob
 from pathlib import Path
+from src.utils import feedback_store
 
 REVIEWS_DIR = Path("notebooks/reviews")
-OUTPUT_FILE = Path("data/feedback.jsonl")
+OUTPUT_FILE = Path("data/feedback_dataset.jsonl")   # derived snapshot, not tracked (data/feedback.jsonl is)
 
 def main():
     REVIEWS_DIR.mkdir(parents=True, exist_ok=True)
     OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
 
-    files = sorted(glob.glob(str(REVIEWS_DIR / "reviewed_*.json")))
-    if not files:
-        print("⚠️ No review files found.")
-        return
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as out_f:
-        for fpath in files:
-            with open(fpath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                feedback = data.get("feedback", [])
-                for clip in feedback:
-                    # each line = one training sample
-                    record = {
-                        "text": clip["text"],
-                        "label": clip["label"],  # 1=good, 0=bad
-                        "score": clip["score"],
-                        "times": clip["times"],
-                        "file": clip["file"],
-                        "source_review": fpath,
-                    }
-                    out_f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    # Only new / changed review files (and the git-synced label file) are read;
+    # duplicate labels are dropped
+    conn = feedback_store.connect()
+    try:
+        added = feedback_store.ingest_all(str(REVIEWS_DIR), conn=conn)
+        total = feedback_store.export_jsonl(str(OUTPUT_FILE), conn=conn)
+    finally:
+        conn.close()
 
-    print(f"✅ Built feedback dataset: {OUTPUT_FILE}")
+    if not total:
+        print("⚠️ No feedback found.")
+        return
+    print(f"✅ Built feedback dataset: {OUTPUT_FILE} ({total} samples, {added} new)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,137 @@
+"""
+Corpus-scale pseudo-label dataset builder.
+
+Turns every SRT under a transcripts directory into heuristic-labelled windows:
+- one process-pool task per transcript;
+- labels from per-segment prefix sums (heuristics.window_scores), not a
+  score_text() call per window;
+- one JSONL shard per video in <out_dir>/train/ or <out_dir>/val/, split by
+  a hash of the video id so windows of one video never leak across splits;
+- a manifest of transcript hashes + build params so re-runs skip
+  transcripts that have not changed.
+
+    python -m src.ml.build_window_dataset [transcripts_dir]
+"""
+
+import os, sys, glob, json, hashlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from src.ml.make_windows import read_srt, build_windows
+from src.ml.heuristics import window_scores
+from src.utils.file_utils import file_sha1
+
+IN_DIR = "data/transcripts"
+OUT_DIR = "data/datasets"
+MANIFEST = "manifest.json"
+SPLITS = ("train", "val")
+
+
+def video_id(srt_path: Path, in_dir: Path) -> str:
+    """Stable id from the transcript's path relative to in_dir."""
+    return str(srt_path.relative_to(in_dir).with_suffix("")).replace(os.sep, "__")
+
+
+def video_split(vid: str, val_ratio: float, seed: int) -> str:
+    """Deterministic split: same video, same seed -> same split, on any machine."""
+    h = int(hashlib.sha1(f"{seed}:{vid}".encode("utf-8")).hexdigest()[:8], 16)
+    return "val" if h / 0xFFFFFFFF < val_ratio else "train"
+
+
+def dataset_files(data_dir: str = OUT_DIR) -> dict:
+    """
+    Training data for the "train" / "validation" splits: the per-video shards
+    of this builder if present, else the flat train.jsonl / val.jsonl.
+    """
+    files = {}
+    for split, name in (("train", "train"), ("validation", "val")):
+        shards = [p for p in sorted(glob.glob(os.path.join(data_dir, name, "*.jsonl"))) if os.path.getsize(p) > 0]
+        files[split] = shards or os.path.join(data_dir, f"{name}.jsonl")
+    return files
+
+
+def shard_path(out_dir: str, split: str, vid: str) -> str:
+    return os.path.join(out_dir, split, f"{vid}.jsonl")
+
+
+def _build_shard(srt_path: str, vid: str, out_file: str, params: dict) -> int:
+    """Pool task: window + label one transcript and write its shard."""
+    segs = read_srt(srt_path)
+    windows = build_windows(segs, min_len=params["min_len"], max_len=params["max_len"], stride=params["stride"])
+    labels = window_scores(segs.texts(), windows) if len(windows) else []
+
+    tmp = out_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for i, label in enumerate(labels):
+            row = {"video": vid, "start": float(windows.starts[i]), "end": float(windows.ends[i]),
+                   "text": windows.text(i), "label": float(label),
+                   "seg_starts": windows.segment_starts(i)}   # segment pieces for the embedding head
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(tmp, out_file)
+    return len(labels)
+
+
+def main(in_dir=IN_DIR, out_dir=OUT_DIR, min_len=15.0, max_len=45.0, stride=5.0,
+         val_ratio=0.1, seed=42, workers=None):
+    in_dir = Path(in_dir)
+    for split in SPLITS:
+        Path(out_dir, split).mkdir(parents=True, exist_ok=True)
+
+    manifest_file = os.path.join(out_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_file):
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    params = {"min_len": min_len, "max_len": max_len, "stride": stride, "val_ratio": val_ratio, "seed": seed}
+    srts = sorted(in_dir.rglob("*.srt"))
+    todo, current = [], {}
+    for srt in srts:
+        vid = video_id(srt, in_dir)
+        sha = file_sha1(str(srt))
+        split = video_split(vid, val_ratio, seed)
+        entry = manifest.get(vid)
+        current[vid] = entry
+        if (entry and entry["sha1"] == sha and entry["params"] == params
+                and os.path.exists(shard_path(out_dir, split, vid))):
+            continue
+        todo.append((str(srt), vid, sha, split))
+
+    # Drop shards of transcripts that disappeared or moved split
+    for vid, entry in manifest.items():
+        if vid not in current:
+            p = shard_path(out_dir, entry["split"], vid)
+            if os.path.exists(p):
+                os.remove(p)
+    for _, vid, _, split in todo:
+        old = manifest.get(vid)
+        if old and old["split"] != split and os.path.exists(shard_path(out_dir, old["split"], vid)):
+            os.remove(shard_path(out_dir, old["split"], vid))
+
+    print(f"📚 {len(srts)} transcripts, {len(todo)} new or changed")
+    new_manifest = {vid: e for vid, e in current.items() if e}
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_build_shard, srt, vid, shard_path(out_dir, split, vid), params): (vid, sha, split)
+                for srt, vid, sha, split in todo
+            }
+            for fut, (vid, sha, split) in futures.items():
+                try:
+                    rows = fut.result()
+                except Exception as e:
+                    print(f"❌ {vid}: {e}")
+                    new_manifest.pop(vid, None)
+                    continue
+                new_manifest[vid] = {"sha1": sha, "split": split, "rows": rows, "params": params}
+
+    tmp = manifest_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(new_manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, manifest_file)
+
+    totals = {s: sum(e["rows"] for e in new_manifest.values() if e["split"] == s) for s in SPLITS}
+    print(f"✅ {totals['train']} train / {totals['val']} val windows in {out_dir}/{{train,val}}/")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,176 @@
+"""
+Fast scoring tier: pooled sentence embeddings + a small ridge head.
+
+- Every SRT segment is embedded once (disk-cached by text hash, see
+  text_utils.encode_texts); windows are mean-pooled from segment vectors
+  with prefix sums, so overlapping windows never re-run the encoder.
+- The head is a linear ridge regressor trained on the pseudo-labelled
+  windows plus reviewer feedback (train_head), featurized the same way:
+  a window row is cut back into its segments (the row's seg_starts) and
+  the segment embeddings are pooled. Rows without segment offsets
+  (feedback, older datasets) are cut at sentence ends instead.
+"""
+
+import os, re, json
+import numpy as np
+from src.ml.make_windows import build_windows
+from src.ml.selection import select_windows, format_results
+from src.ml.build_window_dataset import dataset_files
+from src.utils.text_utils import EMBED_MODEL, encode_texts
+from src.utils import metrics, feedback_store
+from src.utils.transcript import load_transcript
+
+HEAD_FILE = "models/highlight-embedding-head.npz"
+DATA_DIR = "data/datasets"   # per-video shards or flat train/val files (build_window_dataset.dataset_files)
+FEEDBACK_WEIGHT = 3.0    # a reviewer label counts this many pseudo-labels
+RIDGE_ALPHA = 1.0
+
+
+def head_available(head_file: str = HEAD_FILE) -> bool:
+    return os.path.exists(head_file)
+
+
+def pool_windows(seg_emb: np.ndarray, windows) -> np.ndarray:
+    """Mean of segment embeddings per window (prefix sums), L2-normalized."""
+    prefix = np.zeros((len(seg_emb) + 1, seg_emb.shape[1]), dtype=np.float64)
+    np.cumsum(seg_emb, axis=0, out=prefix[1:])
+    if windows.contiguous:
+        lo, hi = windows.seg_lo, windows.seg_hi
+        pooled = (prefix[hi] - prefix[lo]) / np.maximum(1, hi - lo)[:, None]
+    else:
+        pooled = np.stack([seg_emb[list(windows.segment_ids(i))].mean(axis=0) for i in range(len(windows))])
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return (pooled / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def row_segments(row) -> list:
+    """The segment texts a window row was joined from (sentence split if unknown)."""
+    text = row["text"]
+    starts = row.get("seg_starts")
+    if not starts:
+        return [p for p in _SENTENCE_END.split(text.strip()) if p] or [text]
+    bounds = list(starts) + [len(text) + 1]
+    return [text[a:b - 1] for a, b in zip(bounds, bounds[1:])]
+
+
+def pool_rows(rows, model_name: str = EMBED_MODEL) -> np.ndarray:
+    """pool_windows() for dataset / feedback rows: mean of their segment embeddings, L2-normalized."""
+    pieces = [row_segments(r) for r in rows]
+    emb = encode_texts([p for ps in pieces for p in ps], model_name=model_name).astype(np.float64)
+    counts = np.array([len(ps) for ps in pieces])
+    prefix = np.zeros((len(emb) + 1, emb.shape[1]), dtype=np.float64)
+    np.cumsum(emb, axis=0, out=prefix[1:])
+    hi = np.cumsum(counts)
+    pooled = (prefix[hi] - prefix[hi - counts]) / counts[:, None]
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return (pooled / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def _read_jsonl(paths):
+    rows = []
+    if isinstance(paths, str):
+        paths = [paths]
+    for p in paths:
+        if not os.path.exists(p):
+            continue
+        with open(p, "r", encoding="utf-8") as f:
+            rows.extend(json.loads(line) for line in f if line.strip())
+    return rows
+
+
+def _spearman(a, b) -> float:
+    ra = np.argsort(np.argsort(a)).astype(np.float64)
+    rb = np.argsort(np.argsort(b)).astype(np.float64)
+    if ra.std() == 0 or rb.std() == 0:
+        return 0.0
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def _feedback_rows():
+    """Every reviewer label in the feedback store (new review files / synced labels ingested first)."""
+    conn = feedback_store.connect()
+    try:
+        feedback_store.ingest_all(conn=conn)
+        return feedback_store.read_feedback(conn=conn)
+    finally:
+        conn.close()
+
+
+def train_head(data_files=None, val_files=None, head_file=HEAD_FILE, alpha=RIDGE_ALPHA):
+    """
+    Fit the ridge head on pooled segment embeddings (as served) and save it
+    to head_file. Data defaults to the same shard-or-flat files the text
+    regressor trains on.
+    """
+    files = dataset_files(DATA_DIR)
+    data_files = files["train"] if data_files is None else data_files
+    val_files = files["validation"] if val_files is None else val_files
+    rows = _read_jsonl(data_files)
+    weights = [1.0] * len(rows)
+    feedback = _feedback_rows()
+    rows += feedback
+    weights += [FEEDBACK_WEIGHT] * len(feedback)
+    if not rows:
+        print("⚠️ No training rows found.")
+        return None
+
+    X = pool_rows(rows).astype(np.float64)
+    y = np.array([float(r["label"]) for r in rows])
+    w = np.array(weights)
+
+    # Weighted ridge with an unpenalized bias (solve on centered data)
+    x_mean = np.average(X, axis=0, weights=w)
+    y_mean = np.average(y, weights=w)
+    Xc, yc = X - x_mean, y - y_mean
+    A = (Xc * w[:, None]).T @ Xc + alpha * np.eye(X.shape[1])
+    coef = np.linalg.solve(A, (Xc * w[:, None]).T @ yc)
+    bias = y_mean - x_mean @ coef
+
+    out_dir = os.path.dirname(head_file)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    np.savez(head_file, coef=coef.astype(np.float32), bias=np.float32(bias),
+             model_name=np.array(EMBED_MODEL))
+    print(f"✅ Saved embedding head to {head_file} ({len(rows)} rows, {len(feedback)} feedback)")
+
+    val = _read_jsonl(val_files)
+    if val:
+        preds = pool_rows(val).astype(np.float64) @ coef + bias
+        print(f"📈 Val Spearman: {_spearman(preds, [r['label'] for r in val]):.3f}")
+    return head_file
+
+
+def load_head(head_file: str = HEAD_FILE):
+    data = np.load(head_file)
+    return data["coef"], float(data["bias"]), str(data["model_name"])
+
+
+def score_windows_fast(srt_path: str, min_len=15.0, max_len=45.0, stride=5.0, top_n=5,
+                       iou_thresh=0.4, min_gap=0.0, head_file=HEAD_FILE):
+    """Same contract as infer_text_regressor.score_windows, embedding tier."""
+    if not head_available(head_file):
+        raise RuntimeError(f"❌ Embedding head not found at {head_file}. Train it with python -m src.ml.embedding_scorer")
+
+    with metrics.span("windowing"):
+        segs = load_transcript(srt_path)
+        windows = build_windows(segs, min_len=min_len, max_len=max_len, stride=stride)
+    if not len(windows):
+        return []
+
+    with metrics.span("inference", backend="embedding"):
+        coef, bias, model_name = load_head(head_file)
+        seg_emb = encode_texts(segs.texts(), model_name=model_name)
+        scores = pool_windows(seg_emb, windows).astype(np.float64) @ coef + bias
+    metrics.count("windows_scored", len(windows))
+    metrics.count("segments_embedded", len(segs))
+
+    keep = select_windows(scores, windows.starts, windows.ends,
+                          top_k=top_n, iou_thresh=iou_thresh, min_gap=min_gap)
+    return format_results(scores, windows, keep)
+
+
+if __name__ == "__main__":
+    train_head()
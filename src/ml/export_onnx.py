@@ -0,0 +1,151 @@
+"""
+Export the highlight regressor to ONNX (+ int8) and check backend parity.
+
+    python -m src.ml.export_onnx            # export current checkpoint
+    python -m src.ml.export_onnx --check    # export, then bound drift vs fp32
+
+Runs automatically after train_text_regressor saves a model.
+"""
+
+import os, json, sys
+import numpy as np
+from src.ml.model_registry import (
+    MODEL_DIR, ONNX_DIR, ONNX_FILES, EXPORT_STAMP,
+    checkpoint_fingerprint, fingerprint_key, get_model, onnx_path,
+)
+from src.ml.build_window_dataset import dataset_files
+
+OPSET = 17
+PARITY_DATA_DIR = "data/datasets"   # validation shards (or flat val.jsonl) of build_window_dataset
+PARITY_SAMPLES = 256
+# Allowed drift vs the fp32 torch model, per backend: (max |score diff|, min Spearman)
+PARITY_BOUNDS = {
+    "int8": (0.05, 0.97),
+    "onnx": (1e-3, 0.999),
+    "onnx-int8": (0.05, 0.97),
+}
+
+
+def export_onnx(model_dir: str = MODEL_DIR, quantize: bool = True):
+    """Export model_dir to <model_dir>/onnx/model.onnx (and model_int8.onnx)."""
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    fp = checkpoint_fingerprint(model_dir)
+    if fp is None:
+        raise RuntimeError(f"❌ Model not found at {model_dir}")
+
+    out_dir = os.path.join(model_dir, ONNX_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    tok = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+    model.config.return_dict = False
+
+    sample = tok(["export sample"], return_tensors="pt")
+    names = [n for n in tok.model_input_names if n in sample]
+    fp32_path = onnx_path(model_dir, "onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model, tuple(sample[n] for n in names), fp32_path,
+            input_names=names, output_names=["logits"],
+            dynamic_axes={**{n: {0: "batch", 1: "seq"} for n in names}, "logits": {0: "batch"}},
+            opset_version=OPSET,
+        )
+    print(f"✅ Exported ONNX graph to {fp32_path}")
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        int8_path = onnx_path(model_dir, "onnx-int8")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"✅ Quantized ONNX graph to {int8_path}")
+
+    # Written last: marks the graphs as matching this checkpoint
+    tmp = os.path.join(out_dir, EXPORT_STAMP + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"checkpoint": fingerprint_key(fp), "opset": OPSET,
+                   "files": [ONNX_FILES["onnx"]] + ([ONNX_FILES["onnx-int8"]] if quantize else [])}, f, indent=2)
+    os.replace(tmp, os.path.join(out_dir, EXPORT_STAMP))
+
+
+def _ranks(x):
+    return np.argsort(np.argsort(x)).astype(np.float64)
+
+
+def parity_texts(data_files=None, n: int = PARITY_SAMPLES) -> list:
+    """Up to n window texts from the validation split (a file or a list of shards)."""
+    data_files = data_files or dataset_files(PARITY_DATA_DIR)["validation"]
+    texts = []
+    for path in [data_files] if isinstance(data_files, str) else data_files:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    texts.append(json.loads(line)["text"])
+                    if len(texts) >= n:
+                        return texts
+    return texts
+
+
+def backend_parity(model_dir: str, texts, backends=tuple(PARITY_BOUNDS)) -> dict:
+    """
+    Score texts with fp32 torch and each backend.
+    Returns {backend: {"served_by", "drift" (max |score diff|), "spearman"}}.
+    """
+    from src.ml.infer_text_regressor import predict_scores, MAX_LENGTH
+
+    ref_model = get_model(model_dir, backend="torch")
+    ids = ref_model.tokenizer(list(texts), truncation=True, max_length=MAX_LENGTH)["input_ids"]
+    ref = predict_scores(ref_model, ids)
+
+    report = {}
+    for backend in backends:
+        loaded = get_model(model_dir, backend=backend)
+        if loaded.backend != backend:
+            report[backend] = {"served_by": loaded.backend, "drift": None, "spearman": None}
+            continue
+        got = predict_scores(loaded, ids)
+        report[backend] = {
+            "served_by": backend,
+            "drift": float(np.max(np.abs(got - ref))),
+            "spearman": float(np.corrcoef(_ranks(got), _ranks(ref))[0, 1]) if len(ref) > 1 else 1.0,
+        }
+    return report
+
+
+def within_bounds(backend: str, stats: dict) -> bool:
+    max_drift, min_rho = PARITY_BOUNDS[backend]
+    return stats["served_by"] == backend and stats["drift"] <= max_drift and stats["spearman"] >= min_rho
+
+
+def check_parity(model_dir: str = MODEL_DIR, backends=tuple(PARITY_BOUNDS),
+                 data_files=None, n: int = PARITY_SAMPLES) -> bool:
+    """
+    Score the same validation windows with fp32 torch and each backend; fail
+    when the max absolute score drift or the rank correlation leaves
+    PARITY_BOUNDS.
+    """
+    texts = parity_texts(data_files, n)
+    if not texts:
+        print(f"⚠️ No validation samples under {PARITY_DATA_DIR}")
+        return False
+
+    ok = True
+    for backend, stats in backend_parity(model_dir, texts, backends).items():
+        if stats["served_by"] != backend:
+            print(f"❌ {backend}: not available (served by {stats['served_by']})")
+            ok = False
+            continue
+        passed = within_bounds(backend, stats)
+        ok &= passed
+        max_drift, min_rho = PARITY_BOUNDS[backend]
+        print(f"{'✅' if passed else '❌'} {backend}: max |Δscore|={stats['drift']:.5f} (≤{max_drift}) "
+              f"Spearman={stats['spearman']:.4f} (≥{min_rho}) on {len(texts)} windows")
+    return ok
+
+
+if __name__ == "__main__":
+    export_onnx()
+    if "--check" in sys.argv[1:]:
+        sys.exit(0 if check_parity() else 1)
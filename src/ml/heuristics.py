@@ -1,5 +1,7 @@
 import re
+import numpy as np
 from math import exp
+from typing import NamedTuple
 
 # Tweak these lists/weights as you like
 STRONG_KWS = {
@@ -9,8 +11,115 @@ STRONG_KWS = {
     "proof", "fact", "data", "example", "story"
 }
 
+# Keywords for the highlight_detector fallback (no model trained yet)
+FALLBACK_KWS = [
+    "amazing", "important", "secret",
+    "wow", "never", "always", "hack"
+]
+
+# One precompiled matcher for everything: a single token regex plus a lookup
+# table from token to (strong keyword?, fallback keyword id or -1).
+_TOKEN_RE = re.compile(r"[A-Za-z0-9']+")
+_WORD_CHAR = re.compile(r"\w")   # what the fallback's \b treats as part of a word
+_FALLBACK_IDS = {kw: i for i, kw in enumerate(FALLBACK_KWS)}
+_KW_TABLE = {kw: (kw in STRONG_KWS, _FALLBACK_IDS.get(kw, -1))
+             for kw in STRONG_KWS | set(FALLBACK_KWS)}
+
+
 def _tokenize(text: str):
-    return re.findall(r"[A-Za-z0-9']+", text.lower())
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _fallback_ids(tok: str, left_ok: bool = True, right_ok: bool = True):
+    """
+    Fallback keyword ids in a token. The fallback matches whole words
+    (regex \\b), so "wow's" counts as "wow": check each apostrophe part.
+    left_ok / right_ok say whether the token's outer edges are word
+    boundaries; they are not when a \\w character the token regex skips
+    touches it ("wowé", "never_ending").
+    """
+    if "'" not in tok:
+        hit = _KW_TABLE.get(tok) if left_ok and right_ok else None
+        return (hit[1],) if hit and hit[1] >= 0 else ()
+    parts = tok.split("'")
+    if not left_ok:
+        parts[0] = ""
+    if not right_ok:
+        parts[-1] = ""
+    return tuple(_FALLBACK_IDS[p] for p in parts if p in _FALLBACK_IDS)
+
+
+def _is_word_char(text: str, i: int) -> bool:
+    return 0 <= i < len(text) and _WORD_CHAR.match(text, i) is not None
+
+
+class SegmentStats(NamedTuple):
+    """Per-segment keyword / token counts from one pass over a transcript."""
+    n_tokens: np.ndarray       # tokens per segment
+    strong_hits: np.ndarray    # STRONG_KWS occurrences per segment
+    fallback_hits: np.ndarray  # distinct FALLBACK_KWS per segment
+    question: np.ndarray       # segment contains "?"
+    exclaim: np.ndarray        # segment contains "!"
+    tokens: list               # token list per segment (reused by window_scores)
+
+
+def scan_segments(texts) -> SegmentStats:
+    """
+    Run the shared matcher once over the whole transcript (segments joined)
+    and bucket every match back into its segment.
+    """
+    lowered = [t.lower() for t in texts]
+    n = len(lowered)
+    n_tokens = np.zeros(n, dtype=np.int64)
+    strong = np.zeros(n, dtype=np.int64)
+    fallback = np.zeros(n, dtype=np.int64)
+
+    # segment i occupies [ends[i-1] + 1, ends[i]) of the joined text
+    ends = np.cumsum([len(t) + 1 for t in lowered]) - 1
+    joined = "\n".join(lowered)
+    # Only non-ASCII letters and "_" are \w characters the token regex skips
+    check_edges = not joined.isascii() or "_" in joined
+    tokens = [[] for _ in range(n)]
+    seg, seen, seg_toks = 0, set(), tokens[0] if n else None
+    for m in _TOKEN_RE.finditer(joined):
+        while m.start() >= ends[seg]:
+            fallback[seg] = len(seen)
+            seg, seen = seg + 1, set()
+            seg_toks = tokens[seg]
+        tok = m.group()
+        seg_toks.append(tok)
+        hit = _KW_TABLE.get(tok)
+        if hit and hit[0]:
+            strong[seg] += 1
+        if check_edges:
+            seen.update(_fallback_ids(tok, not _is_word_char(joined, m.start() - 1),
+                                      not _is_word_char(joined, m.end())))
+        else:
+            seen.update(_fallback_ids(tok))
+    if n:
+        fallback[seg] = len(seen)
+    n_tokens[:] = [len(t) for t in tokens]
+
+    return SegmentStats(
+        n_tokens, strong, fallback,
+        np.array(["?" in t for t in texts], dtype=bool),
+        np.array(["!" in t for t in texts], dtype=bool),
+        tokens,
+    )
+
+
+def prefix_sums(values: np.ndarray) -> np.ndarray:
+    """Prefix sums with a leading zero: sum(values[lo:hi]) == p[hi] - p[lo]."""
+    out = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def window_sums(values: np.ndarray, seg_lo: np.ndarray, seg_hi: np.ndarray) -> np.ndarray:
+    """Per-window totals of a per-segment array, without rescanning any text."""
+    p = prefix_sums(values)
+    return p[seg_hi] - p[seg_lo]
+
 
 def score_text(text: str) -> float:
     """
@@ -26,7 +135,7 @@ def score_text(text: str) -> float:
     uniq = len(set(toks)) or 1
 
     # keyword hit rate
-    kw_hits = sum(1 for w in toks if w in STRONG_KWS)
+    kw_hits = sum(1 for w in toks if _KW_TABLE.get(w, (False,))[0])
     kw_score = min(1.0, kw_hits / 3.0)
 
     # punctuation hooks
@@ -47,3 +156,53 @@ def score_text(text: str) -> float:
     score = 0.45 * len_score + 0.30 * kw_score + 0.15 * punct + 0.10 * variety
     # clamp
     return max(0.0, min(1.0, score))
+
+
+def window_scores(texts, windows, stats: SegmentStats = None) -> np.ndarray:
+    """
+    score_text() for every window of a WindowIndex, from per-segment counts.
+    Token / keyword / punctuation totals come from prefix sums; distinct
+    tokens are tracked with a sliding multiset as the window's segment range
+    moves forward; the per-segment tokens come from scan_segments, so each
+    segment is tokenized once.
+    """
+    stats = stats or scan_segments(texts)
+    lo, hi = windows.seg_lo, windows.seg_hi
+    n = window_sums(stats.n_tokens, lo, hi).astype(np.float64)
+    kw = window_sums(stats.strong_hits, lo, hi).astype(np.float64)
+    q = window_sums(stats.question, lo, hi) > 0
+    ex = window_sums(stats.exclaim, lo, hi) > 0
+
+    seg_toks = stats.tokens
+    uniq = np.zeros(len(windows), dtype=np.float64)
+    if windows.contiguous:
+        counts, cur_lo, cur_hi = {}, 0, 0
+        for i in range(len(windows)):
+            while cur_hi < hi[i]:
+                for w in seg_toks[cur_hi]:
+                    counts[w] = counts.get(w, 0) + 1
+                cur_hi += 1
+            while cur_lo < lo[i]:
+                for w in seg_toks[cur_lo]:
+                    if counts[w] == 1:
+                        del counts[w]
+                    else:
+                        counts[w] -= 1
+                cur_lo += 1
+            uniq[i] = len(counts)
+    else:
+        for i in range(len(windows)):
+            ids = list(windows.segment_ids(i))
+            uniq[i] = len({w for j in ids for w in seg_toks[j]})
+            n[i] = sum(len(seg_toks[j]) for j in ids)
+            kw[i] = sum(int(stats.strong_hits[j]) for j in ids)
+            q[i] = any(stats.question[j] for j in ids)
+            ex[i] = any(stats.exclaim[j] for j in ids)
+
+    kw_score = np.minimum(1.0, kw / 3.0)
+    punct = np.minimum(1.0, 0.35 * q + 0.35 * ex)
+    center, width = 60.0, 35.0
+    len_score = np.exp(-((n - center) ** 2) / (2 * width ** 2))
+    variety = np.minimum(1.0, np.maximum(uniq, 1) / (n + 1e-6))
+    score = 0.45 * len_score + 0.30 * kw_score + 0.15 * punct + 0.10 * variety
+    return np.clip(score, 0.0, 1.0)
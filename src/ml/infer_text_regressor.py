@@ -3,79 +3,102 @@ Phase 2 - Inference helper for highlight text regressor
 Scores subtitle windows with trained Transformer model.
 """
 
-import os, json, torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from src.ml.make_windows import read_srt, make_windows
-
-MODEL_DIR = "models/highlight-text-regressor"
-
-
-@torch.no_grad()
-def score_windows(srt_path: str, min_len=15.0, max_len=45.0, stride=5.0, top_n=5):
-    """Score subtitle windows using trained model, return top-N highlights."""
-
-    if not os.path.isdir(MODEL_DIR):
+import json
+import numpy as np
+from src.ml.make_windows import build_windows
+from src.ml.model_registry import MODEL_DIR, get_model, model_available
+from src.ml.selection import select_windows, format_results
+from src.utils import metrics
+from src.utils.transcript import load_transcript
+
+BACKEND = "torch"     # "torch", "int8", "onnx" or "onnx-int8" (see model_registry)
+MAX_LENGTH = 256      # tokens per window, special tokens included
+TOKEN_BUDGET = 4096   # padded tokens per batch (batch size x longest window)
+
+
+def window_token_ids(tok, windows, max_length=MAX_LENGTH):
+    """
+    Token ids for every window, built from per-segment ids.
+    Each segment is tokenized once even though it falls into ~max_len/stride
+    overlapping windows. For whitespace-pretokenized vocabularies (the
+    DistilBERT regressor) this equals tokenizing the joined window text with
+    truncation to max_length.
+    """
+    seg_ids = tok(windows.segments.texts(), add_special_tokens=False)["input_ids"]
+    body = max_length - tok.num_special_tokens_to_add(pair=False)
+    out = []
+    for i in range(len(windows)):
+        ids = []
+        for j in windows.segment_ids(i):
+            ids.extend(seg_ids[j])
+            if len(ids) >= body:
+                break
+        out.append(tok.build_inputs_with_special_tokens(ids[:body]))
+    return out
+
+
+def length_batches(lengths, token_budget=TOKEN_BUDGET):
+    """
+    Group item indices into batches of similar length.
+    Items are taken shortest first and a batch closes once its padded size
+    (count x longest) would exceed token_budget.
+    """
+    order = np.argsort(np.asarray(lengths), kind="stable")
+    batch, longest = [], 0
+    for i in order:
+        n = lengths[i]
+        if batch and (len(batch) + 1) * max(longest, n) > token_budget:
+            yield batch
+            batch, longest = [], 0
+        batch.append(int(i))
+        longest = max(longest, n)
+    if batch:
+        yield batch
+
+
+def predict_scores(loaded, ids):
+    """Scores for pre-tokenized windows, in input order."""
+    tok = loaded.tokenizer
+    scores = np.zeros(len(ids), dtype=np.float64)
+    for batch in length_batches([len(x) for x in ids]):
+        enc = tok.pad({"input_ids": [ids[i] for i in batch]}, return_tensors="np")
+        scores[batch] = loaded.predict(dict(enc))
+    return scores
+
+
+def score_windows(srt_path: str, min_len=15.0, max_len=45.0, stride=5.0, top_n=5,
+                  iou_thresh=0.4, min_gap=0.0, backend=None):
+    """
+    Score subtitle windows using trained model, return top-N highlights.
+    Windows overlapping a better one by more than iou_thresh (or closer than
+    min_gap seconds, if > 0) are suppressed.
+    """
+
+    if not model_available(MODEL_DIR):
         raise RuntimeError(f"❌ Model not found at {MODEL_DIR}. Train it first with train_text_regressor.py")
 
     # Build windows from SRT
-    segs = read_srt(srt_path)
-    windows = make_windows(segs, min_len=min_len, max_len=max_len, stride=stride)
-    texts = [w[2] for w in windows]
-
-    # Load tokenizer + model
-    tok = AutoTokenizer.from_pretrained(MODEL_DIR)
-    model = AutoModelForSequenceClassification.from_pretrained(MODEL_DIR)
-    model.eval()
-
-    # Run batched inference
-    scores = []
-    batch_size = 16
-    for i in range(0, len(texts), batch_size):
-        enc = tok(
-            texts[i:i+batch_size],
-            truncation=True,
-            padding=True,
-            max_length=256,
-            return_tensors="pt"
-        )
-        logits = model(**enc).logits.squeeze(-1).cpu().numpy().tolist()
-        if isinstance(logits, float):  # single example case
-            logits = [logits]
-        scores.extend(logits)
-
-    # Pair scores with windows
-    scored = [(float(s), *w) for s, w in zip(scores, windows)]
-    scored.sort(key=lambda x: x[0], reverse=True)
-
-    # Simple greedy non-overlap filtering
-    selected = []
-    def overlap(a, b):
-        s1, e1 = a[1], a[2]
-        s2, e2 = b[1], b[2]
-        inter = max(0.0, min(e1, e2) - max(s1, s2))
-        union = (e1 - s1) + (e2 - s2) - inter
-        return inter / max(1e-6, union)
-
-    for cand in scored:
-        if len(selected) >= top_n:
-            break
-        if all(overlap(cand, sel) <= 0.4 for sel in selected):  # IoU threshold
-            selected.append(cand)
-
-    # Helper: seconds → SRT time
-    def format_srt_time(seconds: float) -> str:
-        hrs = int(seconds // 3600)
-        mins = int((seconds % 3600) // 60)
-        secs = seconds % 60
-        return f"{hrs:02}:{mins:02}:{int(secs):02},{int((secs - int(secs)) * 1000):03}"
-
-    # Format results for pipeline
-    results = []
-    for idx, (score, s, e, text) in enumerate(selected, start=1):
-        times = f"{format_srt_time(s)} --> {format_srt_time(e)}"
-        results.append({"rank": idx, "score": score, "times": times, "text": text})
-
-    return results
+    with metrics.span("windowing"):
+        segs = load_transcript(srt_path)
+        windows = build_windows(segs, min_len=min_len, max_len=max_len, stride=stride)
+    if not len(windows):
+        return []
+
+    # Warm tokenizer + model (loaded once per process, hot-reloaded on retrain)
+    with metrics.span("model_load"):
+        loaded = get_model(MODEL_DIR, backend=backend or BACKEND)
+
+    # Tokenize each segment once, assemble windows, batch by length
+    with metrics.span("inference", backend=loaded.backend):
+        ids = window_token_ids(loaded.tokenizer, windows)
+        scores = predict_scores(loaded, ids)
+    metrics.count("windows_scored", len(ids))
+    metrics.count("tokens_processed", sum(len(x) for x in ids))
+
+    # Top-k + IoU suppression over the window bound arrays
+    keep = select_windows(scores, windows.starts, windows.ends,
+                          top_k=top_n, iou_thresh=iou_thresh, min_gap=min_gap)
+    return format_results(scores, windows, keep)
 
 
 if __name__ == "__main__":
@@ -1,59 +1,124 @@
 import json, os, random
+import numpy as np
 from pathlib import Path
 
-# Reuse SRT helpers like in your subtitle_utils, re-implement quickly here:
-def parse_srt_time(s):
-    h, m, s_ms = s.split(":")
-    sec, ms = s_ms.split(",")
-    return int(h)*3600 + int(m)*60 + int(sec) + int(ms)/1000.0
-
-def format_srt_time(seconds: float) -> str:
-    hrs = int(seconds // 3600)
-    mins = int((seconds % 3600) // 60)
-    secs = seconds % 60
-    return f"{hrs:02}:{mins:02}:{secs:02},{int((secs - int(secs))*1000):03}"
-
-def read_srt(path):
-    with open(path, "r", encoding="utf-8") as f:
-        blocks = f.read().strip().split("\n\n")
-    segs = []
-    for b in blocks:
-        lines = b.split("\n")
-        if len(lines) >= 3:
-            times = lines[1]
-            s, e = times.split(" --> ")
-            text = " ".join(lines[2:]).strip()
-            segs.append((parse_srt_time(s), parse_srt_time(e), text))
-    return segs
+from src.utils.transcript import Transcript, as_transcript
 
-def make_windows(segments, min_len=15.0, max_len=45.0, stride=5.0):
+def read_srt(path) -> Transcript:
+    """Parse an SRT into a Transcript (also iterable as (start, end, text) tuples)."""
+    return Transcript.read(path)
+
+def iter_windows(segments, min_len=15.0, max_len=45.0, stride=5.0):
     """
-    Slide over timeline with fixed stride; window text = concat segments overlapping [t0, t1].
-    Returns list of (start_sec, end_sec, text)
+    Stream windows as (start_sec, end_sec, seg_lo, seg_hi) in one linear pass.
+    segments[seg_lo:seg_hi] are the segments overlapping the window (when
+    segment ends are non-monotone, some inside that range may end before the
+    window starts; WindowIndex.text() skips those).
+    Two pointers: hi advances past segments starting at or before the window
+    end, lo past segments whose running max end is before the window start.
     """
-    if not segments: return []
-    total_end = segments[-1][1]
+    if not len(segments): return
+    transcript = as_transcript(segments)
+    n = len(transcript)
+    starts = transcript.starts.tolist()
+    total_end = float(transcript.ends[-1])
+    # running max of segment ends: the first index where it reaches t0 is
+    # the first segment that can overlap a window starting at t0
+    run_max = np.maximum.accumulate(transcript.ends).tolist()
+
+    lo = hi = 0
     t = 0.0
-    out = []
     while t < total_end:
         t0, t1 = t, min(t + max_len, total_end)
-        # collect segs overlapping window and build text
-        texts = []
-        last_end = t0
-        for (s, e, txt) in segments:
-            if e < t0: continue
-            if s > t1: break
-            texts.append(txt)
-            last_end = max(last_end, e)
-        if texts:
+        while hi < n and starts[hi] <= t1:
+            hi += 1
+        while lo < n and run_max[lo] < t0:
+            lo += 1
+        if lo < hi:
+            last_end = max(t0, run_max[hi - 1])
             # window must be at least min_len long; if too short, extend to last_end if possible
             real_end = max(t0 + min_len, min(last_end, t1))
-            out.append((t0, real_end, " ".join(texts)))
+            yield t0, real_end, lo, hi
         t += stride
-    return out
 
-from src.ml.heuristics import score_text
 
+class WindowIndex:
+    """
+    Windows over a Transcript. Bounds are NumPy arrays; text is referenced
+    by segment index ranges and only sliced out of the transcript buffer
+    when asked for.
+    """
+
+    def __init__(self, segments: Transcript, starts, ends, seg_lo, seg_hi):
+        self.segments = segments
+        self.starts = starts
+        self.ends = ends
+        self.seg_lo = seg_lo
+        self.seg_hi = seg_hi
+        self.contiguous = segments.ends_monotone
+
+    def __len__(self):
+        return len(self.starts)
+
+    def segment_ids(self, i):
+        """Indices of the segments whose text makes up window i."""
+        lo, hi = int(self.seg_lo[i]), int(self.seg_hi[i])
+        if self.contiguous:
+            return range(lo, hi)
+        t0 = self.starts[i]
+        return [j for j in range(lo, hi) if self.segments.ends[j] >= t0]
+
+    def segment_starts(self, i):
+        """Character offsets in text(i) where each of its segments begins."""
+        out, pos = [], 0
+        for j in self.segment_ids(i):
+            out.append(pos)
+            pos += len(self.segments.text(j)) + 1
+        return out
+
+    def text(self, i) -> str:
+        if self.contiguous:
+            return self.segments.join(int(self.seg_lo[i]), int(self.seg_hi[i]))
+        return " ".join(self.segments.text(j) for j in self.segment_ids(i))
+
+    def texts(self):
+        for i in range(len(self)):
+            yield self.text(i)
+
+    def __iter__(self):
+        """Legacy view: (start_sec, end_sec, text) tuples."""
+        for i in range(len(self)):
+            yield float(self.starts[i]), float(self.ends[i]), self.text(i)
+
+
+def build_windows(segments, min_len=15.0, max_len=45.0, stride=5.0) -> WindowIndex:
+    """Collect iter_windows into a WindowIndex (arrays of bounds + segment ranges)."""
+    segments = as_transcript(segments)
+    rows = list(iter_windows(segments, min_len=min_len, max_len=max_len, stride=stride))
+    if rows:
+        starts, ends, lo, hi = zip(*rows)
+    else:
+        starts = ends = lo = hi = ()
+    return WindowIndex(
+        segments,
+        np.asarray(starts, dtype=np.float64),
+        np.asarray(ends, dtype=np.float64),
+        np.asarray(lo, dtype=np.int64),
+        np.asarray(hi, dtype=np.int64),
+    )
+
+
+def make_windows(segments, min_len=15.0, max_len=45.0, stride=5.0):
+    """
+    Slide over timeline with fixed stride; window text = concat segments overlapping [t0, t1].
+    Returns list of (start_sec, end_sec, text)
+    """
+    return list(build_windows(segments, min_len=min_len, max_len=max_len, stride=stride))
+
+from src.ml.heuristics import window_scores
+
+# Single-transcript builder; for a directory of transcripts with a per-video
+# train/val split use src.ml.build_window_dataset.
 def main(in_srt="data/transcripts/output.srt",
          out_dir="data/datasets",
          train_name="train.jsonl",
@@ -62,15 +127,16 @@ def main(in_srt="data/transcripts/output.srt",
          val_ratio=0.1, seed=42):
     Path(out_dir).mkdir(parents=True, exist_ok=True)
     segs = read_srt(in_srt)
-    windows = make_windows(segs, min_len=min_len, max_len=max_len, stride=stride)
+    windows = build_windows(segs, min_len=min_len, max_len=max_len, stride=stride)
 
-    # pseudo-label
+    # pseudo-label (same as score_text per window, from per-segment prefix sums)
+    labels = window_scores(segs.texts(), windows) if len(windows) else []
     samples = []
-    for (s, e, text) in windows:
-        label = score_text(text)
+    for i, ((s, e, text), label) in enumerate(zip(windows, labels)):
         samples.append({
             "start": s, "end": e,
-            "text": text, "label": float(label)
+            "text": text, "label": float(label),
+            "seg_starts": windows.segment_starts(i),   # lets the embedding head pool per segment
         })
 
     random.Random(seed).shuffle(samples)
@@ -0,0 +1,233 @@
+"""
+Process-wide model registry for the highlight text regressor.
+
+- Loads tokenizer + model once per process and hands the same objects to
+  every caller (score_windows, extract_highlights, ...).
+- Watches the checkpoint stamp written by train_text_regressor and swaps a
+  freshly trained model in atomically, so long-running workers pick it up
+  without restarting.
+- Serves the checkpoint through a selectable CPU backend:
+  "torch" (fp32 eager), "int8" (torch dynamic quantization),
+  "onnx" / "onnx-int8" (exported graph run by onnxruntime, see export_onnx).
+"""
+
+import os, json, time, shutil, threading, datetime
+from typing import NamedTuple, Optional
+
+MODEL_DIR = "models/highlight-text-regressor"
+STAMP_FILE = "checkpoint.json"   # written last, after weights + tokenizer
+WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin", "config.json")
+ONNX_DIR = "onnx"                    # export_onnx output, inside the model dir
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model_int8.onnx"}
+EXPORT_STAMP = "export.json"         # which checkpoint the ONNX graphs came from
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+VERSION_SEP = ".v"   # promoted checkpoints live in <model_dir>.v<n>; model_dir links to the current one
+
+
+class LoadedModel(NamedTuple):
+    tokenizer: object
+    model: object
+    fingerprint: tuple       # what this entry was loaded from (checkpoint [+ export])
+    predict: object = None   # predict(batch of numpy arrays) -> np.ndarray of scores
+    backend: str = "torch"
+
+
+_lock = threading.Lock()
+_loaded = {}   # (model_dir, backend) -> LoadedModel
+
+
+def checkpoint_fingerprint(model_dir: str = MODEL_DIR) -> Optional[tuple]:
+    """
+    Cheap identity of the checkpoint on disk (a few stat calls, no reads).
+    Prefers the stamp file so half-written checkpoints are never picked up.
+    """
+    stamp = os.path.join(model_dir, STAMP_FILE)
+    try:
+        st = os.stat(stamp)
+        return (STAMP_FILE, st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        pass
+
+    parts = []
+    for name in WEIGHT_FILES:
+        try:
+            st = os.stat(os.path.join(model_dir, name))
+        except FileNotFoundError:
+            continue
+        parts.append((name, st.st_mtime_ns, st.st_size))
+    return tuple(parts) or None
+
+
+def model_available(model_dir: str = MODEL_DIR) -> bool:
+    """True if a trained checkpoint exists in model_dir."""
+    return checkpoint_fingerprint(model_dir) is not None
+
+
+def fingerprint_key(fingerprint) -> str:
+    """JSON-stable form of a checkpoint fingerprint (for export stamps)."""
+    return json.dumps(fingerprint)
+
+
+def _torch_predict(model):
+    import torch
+
+    def predict(batch):
+        with torch.no_grad():
+            logits = model(**{k: torch.from_numpy(v) for k, v in batch.items()}).logits
+        return logits.squeeze(-1).cpu().numpy().reshape(-1)
+    return predict
+
+
+def _onnx_predict(session):
+    names = [i.name for i in session.get_inputs()]
+
+    def predict(batch):
+        return session.run(None, {n: batch[n].astype("int64") for n in names})[0].reshape(-1)
+    return predict
+
+
+def onnx_path(model_dir: str, backend: str) -> str:
+    return os.path.join(model_dir, ONNX_DIR, ONNX_FILES[backend])
+
+
+def onnx_export_current(model_dir: str, backend: str, fingerprint) -> bool:
+    """True if the ONNX graph for backend was exported from this checkpoint."""
+    stamp = os.path.join(model_dir, ONNX_DIR, EXPORT_STAMP)
+    if not os.path.exists(onnx_path(model_dir, backend)) or not os.path.exists(stamp):
+        return False
+    with open(stamp, "r", encoding="utf-8") as f:
+        return json.load(f).get("checkpoint") == fingerprint_key(fingerprint)
+
+
+def _cache_fingerprint(model_dir: str, backend: str, fingerprint):
+    """Checkpoint fingerprint, plus the export stamp for ONNX backends."""
+    if backend not in ONNX_FILES:
+        return fingerprint
+    try:
+        st = os.stat(os.path.join(model_dir, ONNX_DIR, EXPORT_STAMP))
+        return (fingerprint, (EXPORT_STAMP, st.st_mtime_ns, st.st_size))
+    except FileNotFoundError:
+        return (fingerprint, None)
+
+
+def _load(model_dir: str, fingerprint: tuple, backend: str = "torch", cache_fp=None) -> LoadedModel:
+    from transformers import AutoTokenizer
+
+    cache_fp = fingerprint if cache_fp is None else cache_fp
+
+    tok = AutoTokenizer.from_pretrained(model_dir)
+
+    if backend in ONNX_FILES:
+        if onnx_export_current(model_dir, backend, fingerprint):
+            import onnxruntime as ort
+            session = ort.InferenceSession(onnx_path(model_dir, backend), providers=["CPUExecutionProvider"])
+            return LoadedModel(tok, session, cache_fp, _onnx_predict(session), backend)
+        print(f"⚠️ No current {backend} export in {model_dir}, using torch fp32. Run python -m src.ml.export_onnx")
+        backend = "torch"
+
+    from transformers import AutoModelForSequenceClassification
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+    if backend == "int8":
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return LoadedModel(tok, model, cache_fp, _torch_predict(model), backend)
+
+
+def get_model(model_dir: str = MODEL_DIR, backend: str = "torch") -> LoadedModel:
+    """
+    Return the warm (tokenizer, model) pair for model_dir on the given backend.
+    Reloads only when the checkpoint fingerprint changed since the last load.
+    Callers should grab the result once per request so tokenizer and model
+    always come from the same checkpoint.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    key = (model_dir, backend)
+    fp = checkpoint_fingerprint(model_dir)
+    current = _loaded.get(key)
+    if fp is None:
+        if current is not None:
+            return current
+        raise RuntimeError(f"❌ Model not found at {model_dir}. Train it first with train_text_regressor.py")
+    cache_fp = _cache_fingerprint(model_dir, backend, fp)
+    if current is not None and current.fingerprint == cache_fp:
+        return current
+
+    with _lock:
+        current = _loaded.get(key)
+        if current is not None and current.fingerprint == cache_fp:
+            return current
+        try:
+            fresh = _load(model_dir, fp, backend, cache_fp)
+        except Exception as e:
+            if current is None:
+                raise
+            # Keep serving the previous model if the new one can't be read yet
+            print(f"⚠️ Could not reload model from {model_dir}, keeping previous one. Error: {e}")
+            return current
+        _loaded[key] = fresh   # single reference swap
+        if current is not None:
+            print(f"🔄 Reloaded model from {model_dir}")
+        return fresh
+
+
+def clear_cache():
+    """Drop all loaded models (mainly for tests / memory pressure)."""
+    with _lock:
+        _loaded.clear()
+
+
+def read_checkpoint_stamp(model_dir: str = MODEL_DIR) -> dict:
+    """Contents of the checkpoint stamp ({} if there is none)."""
+    try:
+        with open(os.path.join(model_dir, STAMP_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def write_checkpoint_stamp(model_dir: str = MODEL_DIR, **info):
+    """
+    Mark the checkpoint in model_dir as complete.
+    Call after weights and tokenizer are saved; the atomic replace is what
+    running workers watch for.
+    """
+    payload = {"saved_at": datetime.datetime.now().isoformat(timespec="seconds"), **info}
+    tmp = os.path.join(model_dir, STAMP_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, os.path.join(model_dir, STAMP_FILE))
+
+
+def promote_checkpoint(candidate_dir: str, model_dir: str = MODEL_DIR):
+    """
+    Swap a fully written candidate checkpoint into model_dir.
+    The candidate is renamed to a versioned sibling (<model_dir>.v<n>) and
+    model_dir, a symlink, is repointed with one atomic os.replace, so
+    readers always see either the old or the new checkpoint. The version it
+    replaced is kept for workers still loading from it; older ones are
+    removed. A plain model_dir from before this layout is moved aside once,
+    with a gap of two syscalls.
+    """
+    model_dir = os.path.normpath(model_dir)
+    parent, name = os.path.split(model_dir)
+    version = f"{model_dir}{VERSION_SEP}{time.time_ns()}"
+    os.replace(candidate_dir, version)
+
+    if os.path.isdir(model_dir) and not os.path.islink(model_dir):
+        legacy = f"{model_dir}{VERSION_SEP}0"
+        os.replace(model_dir, legacy)
+        os.symlink(os.path.basename(legacy), model_dir)
+    previous = os.readlink(model_dir) if os.path.islink(model_dir) else None
+
+    link = model_dir + ".swap"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version), link)
+    os.replace(link, model_dir)
+
+    keep = {os.path.basename(version), previous}
+    for entry in os.listdir(parent or "."):
+        if entry.startswith(name + VERSION_SEP) and entry not in keep:
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
@@ -0,0 +1,92 @@
+"""
+Window selection: top-k with partial selection + vectorized non-max suppression.
+"""
+
+import numpy as np
+from src.utils.transcript import format_srt_time
+
+POOL_FACTOR = 8   # rank this many candidates per requested window before expanding
+
+
+def _ranked(scores: np.ndarray, m: int) -> np.ndarray:
+    """
+    Indices of (at least) the m best windows, best first; ties keep window
+    order. Uses partial selection, so only the candidates get sorted.
+    """
+    n = len(scores)
+    if m >= n:
+        cand = np.arange(n)
+    else:
+        kth = np.partition(scores, n - m)[n - m]
+        cand = np.flatnonzero(scores >= kth)   # includes every tie at the cut
+    return cand[np.lexsort((cand, -scores[cand]))]
+
+
+def _suppressed(s, e, sel_s, sel_e, iou_thresh, min_gap):
+    """Boolean mask: candidates (s, e) clashing with any selected window."""
+    s, e = s[:, None], e[:, None]
+    inter = np.maximum(0.0, np.minimum(e, sel_e) - np.maximum(s, sel_s))
+    union = (e - s) + (sel_e - sel_s) - inter
+    clash = inter / np.maximum(1e-6, union) > iou_thresh
+    if min_gap > 0:
+        gap = np.maximum(s - sel_e, sel_s - e)
+        clash |= gap < min_gap
+    return clash.any(axis=1)
+
+
+def select_windows(scores, starts, ends, top_k=5, iou_thresh=0.4, min_gap=0.0):
+    """
+    Greedy NMS in score order: take the best remaining window, drop every
+    candidate whose IoU with it exceeds iou_thresh (or, with min_gap > 0,
+    that sits closer than min_gap seconds), repeat until top_k are picked.
+    Same picks as a full sort + pairwise check, but only a pool of the best
+    candidates is ranked and it grows only if suppression exhausts it.
+    Returns selected window indices, best first.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    n = len(scores)
+    if n == 0 or top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    selected = []
+    done = 0
+    pool = min(n, top_k * POOL_FACTOR)
+    while True:
+        ranked = _ranked(scores, pool)
+        cand = ranked[done:]
+        alive = np.ones(len(cand), dtype=bool)
+        if selected and len(cand):
+            sel = np.asarray(selected)
+            alive &= ~_suppressed(starts[cand], ends[cand], starts[sel], ends[sel], iou_thresh, min_gap)
+
+        pos = 0
+        while len(selected) < top_k:
+            live = np.flatnonzero(alive[pos:])
+            if not len(live):
+                break
+            pos += int(live[0])
+            best = cand[pos]
+            selected.append(best)
+            pos += 1
+            alive[pos:] &= ~_suppressed(starts[cand[pos:]], ends[cand[pos:]],
+                                        starts[best:best + 1], ends[best:best + 1],
+                                        iou_thresh, min_gap)
+
+        done = len(ranked)
+        if len(selected) >= top_k or done >= n:
+            break
+        pool = min(n, pool * 2)
+
+    return np.asarray(selected, dtype=np.int64)
+
+
+def format_results(scores, windows, keep):
+    """Selected windows as pipeline results: rank, score, SRT times, text."""
+    results = []
+    for rank, i in enumerate(keep, start=1):
+        s, e = float(windows.starts[i]), float(windows.ends[i])
+        times = f"{format_srt_time(s)} --> {format_srt_time(e)}"
+        results.append({"rank": rank, "score": float(scores[i]), "times": times, "text": windows.text(i)})
+    return results
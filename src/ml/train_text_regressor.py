@@ -1,69 +1,179 @@
-from datasets import load_dataset, Dataset
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, TrainingArguments, Trainer
-import numpy as np, evaluate, os, glob, json
-from pathlib import Path
+from datasets import load_dataset, load_from_disk, concatenate_datasets, Dataset
+from transformers import (
+    AutoTokenizer, AutoModelForSequenceClassification, TrainingArguments, Trainer,
+    DataCollatorWithPadding, TrainerCallback,
+)
+import numpy as np, evaluate, os, sys, json, time, hashlib, shutil, argparse, random
+from src.ml.model_registry import (
+    write_checkpoint_stamp, read_checkpoint_stamp, model_available, promote_checkpoint,
+)
+from src.utils import feedback_store
+from src.ml import build_window_dataset
 
 MODEL_NAME = "distilbert-base-uncased"
 DATA_DIR = "data/datasets"
 OUTPUT_DIR = "models/highlight-text-regressor"
-REVIEWS_DIR = "notebooks/reviews"   # where feedback is stored
+REVIEWS_DIR = "notebooks/reviews"   # review files, ingested into the feedback store
+FEEDBACK_CONSUMER = "text_regressor"  # watermark name in the feedback store
+TOKENIZED_CACHE_DIR = "data/cache/tokenized"
+MAX_LENGTH = 256
 
+# Incremental (warm-start) mode
+INCREMENTAL_LR = 1e-5
+REPLAY_RATIO = 4         # replayed old rows per new feedback row
+REPLAY_MIN = 256
+MAX_STEPS = 300
+MAX_MINUTES = 15.0
+SPEARMAN_TOLERANCE = 0.0   # promote only if val Spearman drops by at most this
 
-def load_feedback_dataset():
-    """Merge all feedback JSONs into a HuggingFace Dataset (if any)."""
-    review_files = glob.glob(f"{REVIEWS_DIR}/reviewed_*.json")
-    rows = []
 
-    for rf in review_files:
-        with open(rf, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        for clip in data.get("feedback", []):
-            rows.append({
-                "text": clip["text"],
-                "label": float(clip["label"])  # 👍=1, 👎=0
-            })
+def dataset_files():
+    """Per-video shards from build_window_dataset if present, else the flat train/val files."""
+    return build_window_dataset.dataset_files(DATA_DIR)
 
+
+def feedback_rows():
+    """Ingest new review files and synced labels into the feedback store and return all its rows."""
+    conn = feedback_store.connect()
+    try:
+        feedback_store.ingest_all(REVIEWS_DIR, conn=conn)
+        return feedback_store.read_feedback(conn=conn)
+    finally:
+        conn.close()
+
+
+def load_feedback_dataset(rows=None):
+    """Feedback rows as a HuggingFace Dataset of text / label (if any)."""
+    rows = feedback_rows() if rows is None else rows
     if rows:
-        return Dataset.from_list(rows)
+        return Dataset.from_list([{"text": r["text"], "label": float(r["label"])} for r in rows])  # 👍=1, 👎=0
     return None
 
 
-def main():
-    # ---------------------------
-    # 1. Load base dataset
-    # ---------------------------
-    ds = load_dataset("json", data_files={
-        "train": f"{DATA_DIR}/train.jsonl",
-        "validation": f"{DATA_DIR}/val.jsonl",
-    })
+def tokenize_fn(tok):
+    def tokenize(ex):
+        enc = tok(ex["text"], truncation=True, max_length=MAX_LENGTH)
+        enc["length"] = [len(ids) for ids in enc["input_ids"]]
+        return enc
+    return tokenize
 
-    # ---------------------------
-    # 2. Load feedback dataset (optional)
-    # ---------------------------
-    feedback_ds = load_feedback_dataset()
-    if feedback_ds:
-        print(f"📥 Loaded {len(feedback_ds)} feedback samples")
-        # Merge into training split
-        ds["train"] = Dataset.from_list(ds["train"][:])  # ensure mutable
-        ds["train"] = ds["train"].concatenate(feedback_ds)
 
-    # ---------------------------
-    # 3. Tokenization
-    # ---------------------------
-    tok = AutoTokenizer.from_pretrained(MODEL_NAME)
+def tokenizer_identity(tok) -> str:
+    """Hash of everything that changes token ids: class, name, vocab / pipeline."""
+    h = hashlib.sha1(f"{type(tok).__name__}|{tok.name_or_path}|{len(tok)}|{MAX_LENGTH}".encode("utf-8"))
+    backend = getattr(tok, "backend_tokenizer", None)
+    if backend is not None:
+        h.update(backend.to_str().encode("utf-8"))
+    return h.hexdigest()
 
-    def tokenize(ex):
-        return tok(ex["text"], truncation=True, padding="max_length", max_length=256)
 
-    ds = ds.map(tokenize, batched=True)
+def data_identity(files: dict, feedback_ds) -> str:
+    """Hash of the data file contents plus the feedback rows."""
+    h = hashlib.sha1()
+    for split in sorted(files):
+        paths = files[split] if isinstance(files[split], list) else [files[split]]
+        for p in paths:
+            h.update(f"{split}:{os.path.basename(p)}".encode("utf-8"))
+            with open(p, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+    if feedback_ds is not None:
+        h.update(json.dumps(feedback_ds.to_list(), sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def load_tokenized(tok, files=None, feedback_ds=None):
+    """
+    Tokenized train/validation splits (no padding, with a "length" column).
+    Cached on disk under TOKENIZED_CACHE_DIR, keyed by tokenizer identity and
+    a hash of the data, so unchanged data is never re-tokenized.
+    """
+    files = files or dataset_files()
+    key = hashlib.sha1(f"{tokenizer_identity(tok)}|{data_identity(files, feedback_ds)}".encode("utf-8")).hexdigest()
+    cache_path = os.path.join(TOKENIZED_CACHE_DIR, key[:16])
+    if os.path.isdir(cache_path):
+        print(f"♻️ Using cached tokenized dataset {cache_path}")
+        return load_from_disk(cache_path)
+
+    ds = load_dataset("json", data_files=files)
+    ds = ds.select_columns(["text", "label"])
+    if feedback_ds is not None:
+        # Merge into training split
+        ds["train"] = concatenate_datasets([ds["train"], feedback_ds.cast(ds["train"].features)])
+
+    ds = ds.map(tokenize_fn(tok), batched=True, remove_columns=["text"])
     ds = ds.rename_column("label", "labels")
-    ds.set_format(type="torch", columns=["input_ids", "attention_mask", "labels"])
 
-    # ---------------------------
-    # 4. Model + Training
-    # ---------------------------
-    model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME, num_labels=1)
+    tmp = cache_path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    ds.save_to_disk(tmp)
+    os.replace(tmp, cache_path)
+    return load_from_disk(cache_path)
+
+
+class ThroughputCallback(TrainerCallback):
+    """
+    Logs measured samples/s and (non-pad) tokens/s for every training epoch.
+    A forward pre-hook counts the rows and attention-mask tokens of every
+    training batch the model actually sees, so length-grouped batches and
+    epochs cut short by max_steps or the time budget are measured, not
+    estimated. Evaluation passes (model.eval()) are not counted.
+    """
+
+    def __init__(self):
+        self.history = []
+        self._t0 = None
+        self._samples = self._tokens = 0
+        self._hook = None
+
+    def _count(self, module, args, kwargs):
+        if not module.training:
+            return
+        mask, ids = kwargs.get("attention_mask"), kwargs.get("input_ids")
+        if mask is not None:
+            self._samples += int(mask.shape[0])
+            self._tokens += int(mask.sum())
+        elif ids is not None:   # no padding mask: every token is real
+            self._samples += int(ids.shape[0])
+            self._tokens += int(ids.numel())
+
+    def on_train_begin(self, args, state, control, model=None, **kwargs):
+        if model is not None and self._hook is None:
+            self._hook = model.register_forward_pre_hook(self._count, with_kwargs=True)
 
+    def on_train_end(self, args, state, control, **kwargs):
+        if self._hook is not None:
+            self._hook.remove()
+            self._hook = None
+
+    def on_epoch_begin(self, args, state, control, **kwargs):
+        self._t0 = time.perf_counter()
+        self._samples = self._tokens = 0
+
+    def on_epoch_end(self, args, state, control, **kwargs):
+        dt = time.perf_counter() - self._t0
+        row = {"epoch": round(state.epoch or 0, 2), "seconds": round(dt, 2), "samples": self._samples,
+               "tokens": self._tokens, "samples_per_s": round(self._samples / dt, 1),
+               "tokens_per_s": round(self._tokens / dt, 1)}
+        self.history.append(row)
+        state.log_history.append({"throughput": row})
+        print(f"📊 Epoch {row['epoch']}: {row['samples_per_s']} samples/s, "
+              f"{row['tokens_per_s']} tokens/s ({row['seconds']}s)")
+
+
+class TimeBudgetCallback(TrainerCallback):
+    """Stops training once the wall-clock budget is spent."""
+
+    def __init__(self, max_minutes: float):
+        self.deadline = time.monotonic() + max_minutes * 60
+
+    def on_step_end(self, args, state, control, **kwargs):
+        if time.monotonic() >= self.deadline:
+            print(f"⏱️ Time budget reached after {state.global_step} steps")
+            control.should_training_stop = True
+
+
+def spearman_metric():
     metric = evaluate.load("spearmanr")
 
     def compute_metrics(eval_pred):
@@ -71,9 +181,39 @@ def main():
         preds = preds.squeeze()
         labels = labels.squeeze()
         return {"spearman": metric.compute(predictions=preds, references=labels)["spearmanr"]}
+    return compute_metrics
+
+
+def main():
+    # ---------------------------
+    # 1. Load feedback dataset (optional)
+    # ---------------------------
+    rows = feedback_rows()
+    feedback_ds = load_feedback_dataset(rows)
+    if feedback_ds:
+        print(f"📥 Loaded {len(feedback_ds)} feedback samples")
+
+    # ---------------------------
+    # 2. Load + tokenize base dataset (cached, no padding)
+    # ---------------------------
+    tok = AutoTokenizer.from_pretrained(MODEL_NAME)
+    ds = load_tokenized(tok, dataset_files(), feedback_ds)
+
+    # ---------------------------
+    # 3. Model + Training
+    # ---------------------------
+    model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME, num_labels=1)
+    compute_metrics = spearman_metric()
+    throughput = ThroughputCallback()
+
+    # Never train inside the served checkpoint: epoch checkpoints go to a
+    # scratch dir, the final model to a candidate that is promoted at the end
+    checkpoints_dir, candidate_dir = OUTPUT_DIR + ".checkpoints", OUTPUT_DIR + ".candidate"
+    for d in (checkpoints_dir, candidate_dir):
+        shutil.rmtree(d, ignore_errors=True)
 
     args = TrainingArguments(
-        output_dir=OUTPUT_DIR,
+        output_dir=checkpoints_dir,
         learning_rate=2e-5,
         per_device_train_batch_size=16,
         per_device_eval_batch_size=16,
@@ -85,7 +225,9 @@ def main():
         greater_is_better=True,
         fp16=False,
         logging_steps=50,
-        report_to="none"
+        report_to="none",
+        group_by_length=True,          # batches of similar length -> little padding
+        length_column_name="length",
     )
 
     trainer = Trainer(
@@ -94,17 +236,137 @@ def main():
         train_dataset=ds["train"],
         eval_dataset=ds["validation"],
         tokenizer=tok,
-        compute_metrics=compute_metrics
+        data_collator=DataCollatorWithPadding(tok),   # pad per batch, not to 256
+        compute_metrics=compute_metrics,
+        callbacks=[throughput],
     )
 
     # ---------------------------
-    # 5. Train + Save
+    # 4. Train + Save
     # ---------------------------
     trainer.train()
-    trainer.save_model(OUTPUT_DIR)
-    tok.save_pretrained(OUTPUT_DIR)
+    val_spearman = trainer.evaluate()["eval_spearman"]
+    trainer.save_model(candidate_dir)
+    tok.save_pretrained(candidate_dir)
+    watermark = rows[-1]["id"] if rows else 0
+    write_checkpoint_stamp(candidate_dir, base_model=MODEL_NAME, mode="full",
+                           val_spearman=val_spearman, feedback_watermark=watermark)
+    promote_checkpoint(candidate_dir, OUTPUT_DIR)   # signals running workers to reload
+    shutil.rmtree(checkpoints_dir, ignore_errors=True)
+    feedback_store.set_watermark(FEEDBACK_CONSUMER, watermark)
     print(f"✅ Saved model to {OUTPUT_DIR}")
+    export_graphs(OUTPUT_DIR)
+
+
+def export_graphs(model_dir):
+    """ONNX / int8 graphs for the CPU inference backends."""
+    try:
+        from src.ml.export_onnx import export_onnx
+        export_onnx(model_dir)
+    except Exception as e:
+        print(f"⚠️ ONNX export skipped: {e}")
+
+
+def incremental(max_steps=MAX_STEPS, max_minutes=MAX_MINUTES, replay_ratio=REPLAY_RATIO,
+                seed=42, tolerance=SPEARMAN_TOLERANCE):
+    """
+    Warm-start from the current checkpoint: fine-tune on feedback not seen by
+    that checkpoint plus a replay sample of older data, within a step / time
+    budget. The result replaces the checkpoint only if validation Spearman
+    does not regress.
+    """
+    if not model_available(OUTPUT_DIR):
+        print("⚠️ No checkpoint to warm-start from, running full training.")
+        return main()
+
+    stamp = read_checkpoint_stamp(OUTPUT_DIR)
+    watermark = feedback_store.get_watermark(FEEDBACK_CONSUMER)
+    rows = feedback_rows()
+    new_rows = [{"text": r["text"], "label": r["label"]} for r in rows if r["id"] > watermark]
+    old_rows = [{"text": r["text"], "label": r["label"]} for r in rows if r["id"] <= watermark]
+    if not new_rows:
+        print("✅ No new feedback since the last checkpoint, nothing to do.")
+        return False
+    print(f"📥 {len(new_rows)} new feedback samples ({len(old_rows)} already trained on)")
+
+    # Tokenizer comes from the checkpoint so ids match the model being tuned
+    tok = AutoTokenizer.from_pretrained(OUTPUT_DIR)
+    base = load_tokenized(tok, dataset_files())
+    tokenize = tokenize_fn(tok)
+
+    def as_tokenized(rs):
+        return Dataset.from_list(rs).map(tokenize, batched=True, remove_columns=["text"]) \
+            .rename_column("label", "labels").cast(base["train"].features)
+
+    # Replay: older feedback + a random sample of the base windows
+    rng = random.Random(seed)
+    n_replay = max(REPLAY_MIN, replay_ratio * len(new_rows))
+    replay_ids = rng.sample(range(len(base["train"])), min(n_replay, len(base["train"])))
+    parts = [as_tokenized(new_rows), base["train"].select(replay_ids)]
+    if old_rows:
+        parts.append(as_tokenized(old_rows))
+    train_ds = concatenate_datasets(parts).shuffle(seed=seed)
+    print(f"🔁 Training on {len(new_rows)} new + {len(train_ds) - len(new_rows)} replayed rows")
+
+    candidate_dir = OUTPUT_DIR + ".candidate"
+    shutil.rmtree(candidate_dir, ignore_errors=True)
+    model = AutoModelForSequenceClassification.from_pretrained(OUTPUT_DIR, num_labels=1)
+    args = TrainingArguments(
+        output_dir=candidate_dir,
+        learning_rate=INCREMENTAL_LR,
+        per_device_train_batch_size=16,
+        per_device_eval_batch_size=16,
+        num_train_epochs=1,
+        max_steps=max_steps,
+        save_strategy="no",
+        logging_steps=50,
+        report_to="none",
+        group_by_length=True,
+        length_column_name="length",
+        seed=seed,
+    )
+    trainer = Trainer(
+        model=model,
+        args=args,
+        train_dataset=train_ds,
+        eval_dataset=base["validation"],
+        tokenizer=tok,
+        data_collator=DataCollatorWithPadding(tok),
+        compute_metrics=spearman_metric(),
+        callbacks=[ThroughputCallback(), TimeBudgetCallback(max_minutes)],
+    )
+
+    # Baseline on the same validation split, so the comparison is fair
+    before = trainer.evaluate()["eval_spearman"]
+    trainer.train()
+    after = trainer.evaluate()["eval_spearman"]
+    print(f"📈 Val Spearman: {before:.4f} -> {after:.4f}")
+
+    if after < before - tolerance:
+        print("❌ Validation Spearman regressed, keeping the current checkpoint.")
+        shutil.rmtree(candidate_dir, ignore_errors=True)
+        return False
+
+    trainer.save_model(candidate_dir)
+    tok.save_pretrained(candidate_dir)
+    write_checkpoint_stamp(candidate_dir, base_model=stamp.get("base_model", MODEL_NAME), mode="incremental",
+                           parent=stamp.get("saved_at"), steps=trainer.state.global_step,
+                           val_spearman=after, feedback_watermark=rows[-1]["id"])
+    promote_checkpoint(candidate_dir, OUTPUT_DIR)
+    feedback_store.set_watermark(FEEDBACK_CONSUMER, rows[-1]["id"])
+    print(f"✅ Promoted warm-started model to {OUTPUT_DIR}")
+    export_graphs(OUTPUT_DIR)
+    return True
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train the highlight text regressor.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="warm-start from the current checkpoint on new feedback + replay")
+    parser.add_argument("--max-steps", type=int, default=MAX_STEPS)
+    parser.add_argument("--max-minutes", type=float, default=MAX_MINUTES)
+    cli = parser.parse_args(sys.argv[1:])
+    if cli.incremental:
+        incremental(max_steps=cli.max_steps, max_minutes=cli.max_minutes)
+    else:
+        main()
@@ -4,34 +4,66 @@ Pipeline runner: video -> audio -> transcript -> highlights -> clips
 
 import json, datetime, os, shutil
 from pathlib import Path
-from src.extract_subtitles import extract_subtitles
+from typing import NamedTuple
+from src.extract_subtitles import extract_subtitles, CHUNK_SECONDS
 from src.highlight_detector import extract_highlights
-from src.clip_extractor import cut_clip, cut_with_subtitles
-from src.utils.file_utils import ensure_dir
+from src.clip_extractor import cut_clips, COMPRESS_SETTINGS, load_compress_manifest, save_compress_manifest
+from src.utils.file_utils import ensure_dir, file_sha1
+from src.utils import run_catalog, stage_cache, metrics
 from src.utils.subtitle_utils import trim_srt_to_range
-from src.utils.audio_utils import extract_audio_from_video, align_to_silence
+from src.utils.transcript import load_transcript, parse_srt_time, format_srt_time
+from src.utils.audio_utils import (
+    SAMPLE_RATE, INDEX_SUFFIX, extract_audio_from_video, extract_audio_pcm, load_pcm,
+    align_to_silence, get_silence_index,
+)
 
 
 # Toggle features
 USE_SUBTITLES = False        # Burn subtitles into final clips
 ALIGN_TO_SILENCE = True      # Snap clip boundaries to nearest silence
 TOP_N_HIGHLIGHTS = 5         # Number of clips to generate
+CHUNKED_TRANSCRIPTION = True # Split long audio at silences and transcribe chunks in parallel
+USE_RAW_PCM = True           # Stream 16 kHz float32 PCM from ffmpeg instead of encoding an mp3
+CUT_WORKERS = 4              # Max concurrent ffmpeg processes when cutting clips
+CUT_SINGLE_PASS = False      # Emit all clips from one ffmpeg invocation instead of a pool
+SMART_CUT = True             # Frame-accurate cuts: re-encode only partial GOPs, copy the rest
+COMPRESS_CLIPS = True        # Also write the 240p rendition (<workspace>/clips_compressed) from the cut's decode
+STAGE_CACHE = True           # Reuse audio / silence index / transcript of unchanged videos (data/cache/stages)
+WHISPER_MODEL = "base"
 
 
-def auto_clean():
-    """Remove old files from data/audio, data/clips, data/transcripts."""
-    for folder in ["data/audio", "data/clips", "data/transcripts"]:
+class Workspace(NamedTuple):
+    """Where one run keeps its intermediate files and clips."""
+    root: str
+
+    @property
+    def audio_dir(self): return os.path.join(self.root, "audio")
+    @property
+    def transcripts_dir(self): return os.path.join(self.root, "transcripts")
+    @property
+    def clips_dir(self): return os.path.join(self.root, "clips")
+    @property
+    def compressed_dir(self): return os.path.join(self.root, "clips_compressed")
+    @property
+    def audio_file(self):
+        return os.path.join(self.audio_dir, "audio.f32" if USE_RAW_PCM else "temp_audio.mp3")
+    @property
+    def transcript_file(self): return os.path.join(self.transcripts_dir, "output.srt")
+
+
+DEFAULT_WORKSPACE = Workspace("data")   # single-video layout: data/audio, data/clips, ...
+
+
+def auto_clean(ws: Workspace = DEFAULT_WORKSPACE):
+    """Remove old files from the workspace's audio, clips and transcripts dirs."""
+    for folder in [ws.audio_dir, ws.clips_dir, ws.transcripts_dir]:
         if os.path.exists(folder):
             shutil.rmtree(folder)
         os.makedirs(folder, exist_ok=True)
     print("🧹 Cleaned previous run files.")
 
 
-def srt_time_to_seconds(srt_time: str) -> float:
-    """Convert 'HH:MM:SS,ms' to float seconds."""
-    h, m, s_ms = srt_time.split(":")
-    s, ms = s_ms.split(",")
-    return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000.0
+srt_time_to_seconds = parse_srt_time   # 'HH:MM:SS,ms' -> float seconds
 
 
 def seconds_to_ffmpeg_time(seconds: float) -> str:
@@ -42,34 +74,107 @@ def seconds_to_ffmpeg_time(seconds: float) -> str:
     return f"{hrs:02}:{mins:02}:{secs:06.3f}"
 
 
-def run_pipeline(video_file: str):
-    auto_clean()  # 🧹 Clear old data before each run
+def source_hash(video_file: str):
+    """Content hash of the video for the stage cache (None when caching is off)."""
+    return stage_cache.content_hash(video_file) if STAGE_CACHE else None
+
+
+def prepare_audio(video_file: str, ws: Workspace = DEFAULT_WORKSPACE, source: str = None):
+    """
+    Step 1: extract audio. Returns a memory-mapped array (raw PCM) or the file path.
+    With a source hash the audio and its silence index come from the stage
+    cache when this video was processed before.
+    """
+    ensure_dir(ws.audio_dir)
+    index_file = ws.audio_file + INDEX_SUFFIX
+    index_files = {"silence.npy": index_file, "silence.json": index_file + ".json"}
+    key = source and stage_cache.stage_key("audio", video=source, raw=USE_RAW_PCM, sr=SAMPLE_RATE)
+    if key and (stage_cache.restore("audio", key, {"audio": ws.audio_file, **index_files})
+                or stage_cache.restore("audio", key, {"audio": ws.audio_file})):
+        print("♻️ Reusing cached audio")
+        metrics.count("cache_hits")
+        return load_pcm(ws.audio_file) if USE_RAW_PCM else ws.audio_file
+
+    if os.path.exists(ws.audio_file):
+        os.remove(ws.audio_file)   # may be a hard link into the cache: never write through it
+    if USE_RAW_PCM:
+        audio = extract_audio_pcm(video_file, ws.audio_file)  # memory-mapped, shared below
+    else:
+        extract_audio_from_video(video_file, ws.audio_file)
+        audio = ws.audio_file
+    if key:
+        files = {"audio": ws.audio_file}
+        if ALIGN_TO_SILENCE:
+            with metrics.span("silence_index"):
+                get_silence_index(ws.audio_file)   # built now so it is cached with the audio
+            files.update(index_files)
+        stage_cache.store("audio", key, files)
+    return audio
+
+
+def transcribe(audio, ws: Workspace = DEFAULT_WORKSPACE, source: str = None) -> str:
+    """Step 2: Whisper transcript into the workspace (stage-cached by source hash). Returns the SRT path."""
+    ensure_dir(ws.transcripts_dir)
+    key = source and stage_cache.stage_key("transcript", video=source, raw=USE_RAW_PCM, model_size=WHISPER_MODEL,
+                                           chunked=CHUNKED_TRANSCRIPTION, chunk_seconds=CHUNK_SECONDS)
+    if key and stage_cache.restore("transcript", key, {"output.srt": ws.transcript_file}):
+        print("♻️ Reusing cached transcript")
+        metrics.count("cache_hits")
+        return ws.transcript_file
+    extract_subtitles(audio, ws.transcript_file, model_size=WHISPER_MODEL, chunked=CHUNKED_TRANSCRIPTION)
+    if key:
+        stage_cache.store("transcript", key, {"output.srt": ws.transcript_file})
+    return ws.transcript_file
+
 
-    audio_file = "data/audio/temp_audio.mp3"
-    transcript_file = "data/transcripts/output.srt"
-    ensure_dir("data/audio")
-    ensure_dir("data/transcripts")
-    ensure_dir("data/clips")
+def run_pipeline(video_file: str, ws: Workspace = DEFAULT_WORKSPACE):
+    metrics.start_run()  # spans / counters end up in the run log (log_run)
+    auto_clean(ws)  # 🧹 Clear old data before each run
+    ensure_dir(ws.clips_dir)
+
+    with metrics.span("source_hash"):
+        source = source_hash(video_file)
 
     # Step 1: Extract audio
     print("🎙️ Extracting audio...")
-    extract_audio_from_video(video_file, audio_file)
+    with metrics.span("audio"):
+        audio = prepare_audio(video_file, ws, source)
 
     # Step 2: Extract subtitles
     print("▶️ Extracting subtitles...")
-    extract_subtitles(audio_file, transcript_file)
+    with metrics.span("transcribe"):
+        transcript_file = transcribe(audio, ws, source)
 
     # Step 3: Detect highlight segments (ML or keywords)
     print("⭐ Detecting highlights...")
-    highlights = extract_highlights(transcript_file, top_n=TOP_N_HIGHLIGHTS)
+    with metrics.span("score"):
+        highlights = extract_highlights(transcript_file, top_n=TOP_N_HIGHLIGHTS)
 
     if not highlights:
         print("⚠️ No highlights detected. Try adjusting keywords or re-training model.")
         return []
 
     # Step 4: Cut clips
+    with metrics.span("cut"):
+        return cut_highlights(video_file, highlights, ws.audio_file, transcript_file, ws)
+
+
+def cut_highlights(video_file: str, highlights, audio_file=None, transcript_file=None,
+                   ws: Workspace = DEFAULT_WORKSPACE):
+    """
+    Step 4: snap each highlight to silence, trim subtitles, cut the clips
+    into ws.clips_dir. Alignment / subtitles are skipped when audio_file /
+    transcript_file is missing.
+    """
     print("✂️ Cutting clips...")
-    clips_info = []
+    align = ALIGN_TO_SILENCE and audio_file and os.path.exists(audio_file)
+    subtitles = USE_SUBTITLES and transcript_file and os.path.exists(transcript_file)
+    if align:
+        with metrics.span("silence_index"):
+            get_silence_index(audio_file)  # decode once; per-clip lookups reuse it
+    if subtitles:
+        transcript = load_transcript(transcript_file)  # shared with scoring; trimmed per clip in memory
+    jobs, pending = [], []
     for i, (score, _, times, text) in enumerate(highlights, start=1):
         start_srt, end_srt = times.split(" --> ")
 
@@ -78,8 +183,9 @@ def run_pipeline(video_file: str):
         end_sec = srt_time_to_seconds(end_srt)
 
         # Optional: snap to silence
-        if ALIGN_TO_SILENCE:
-            adj_start, adj_end = align_to_silence(audio_file, start_sec, end_sec)
+        if align:
+            with metrics.span("align", clip=i):
+                adj_start, adj_end = align_to_silence(audio_file, start_sec, end_sec)
         else:
             adj_start, adj_end = start_sec, end_sec
 
@@ -91,17 +197,46 @@ def run_pipeline(video_file: str):
         snippet = text[:60] + ("..." if len(text) > 60 else "")
         print(f"🎬 Clip {i}: {start_ff} → {end_ff} | Score={score:.3f} | {snippet}")
 
+        job = {"start": start_ff, "end": end_ff, "start_s": adj_start, "end_s": adj_end}
+
         # Handle subtitles
-        if USE_SUBTITLES:
-            mini_srt = f"data/transcripts/clip_{i}.srt"
-            trim_srt_to_range(transcript_file, start_srt, end_srt, mini_srt)
-            out = f"data/clips/clip_{i}_subs.mp4"
-            cut_with_subtitles(video_file, start_ff, end_ff, mini_srt, out)
+        if subtitles:
+            mini_srt = os.path.join(ws.transcripts_dir, f"clip_{i}.srt")
+            # captions follow the aligned cut, not the raw highlight window
+            trim_srt_to_range(transcript, format_srt_time(adj_start), format_srt_time(adj_end), mini_srt)
+            job.update(output=os.path.join(ws.clips_dir, f"clip_{i}_subs.mp4"), subtitles=mini_srt)
         else:
-            out = f"data/clips/clip_{i}.mp4"
-            cut_clip(video_file, start_ff, end_ff, out)
+            job["output"] = os.path.join(ws.clips_dir, f"clip_{i}.mp4")
+        if COMPRESS_CLIPS:
+            job["compressed"] = os.path.join(ws.compressed_dir, os.path.basename(job["output"]))
+
+        jobs.append(job)
+        pending.append((i, score, times, text))
+
+    # All clips in one go: single ffmpeg process or a bounded worker pool
+    ensure_dir(ws.clips_dir)
+    if COMPRESS_CLIPS:
+        ensure_dir(ws.compressed_dir)
+    results = cut_clips(video_file, jobs, max_workers=CUT_WORKERS,
+                        single_pass=CUT_SINGLE_PASS, smart=SMART_CUT)
 
+    if COMPRESS_CLIPS:
+        # compress_clips.py skips clips whose hash + settings are recorded here
+        manifest = load_compress_manifest(ws.compressed_dir)
+        for job, res in zip(jobs, results):
+            if res["ok"]:
+                manifest[os.path.basename(job["output"])] = {"sha1": file_sha1(job["output"]),
+                                                             "settings": COMPRESS_SETTINGS}
+        save_compress_manifest(ws.compressed_dir, manifest)
+
+    clips_info = []
+    for (i, score, times, text), res in zip(pending, results):
+        out = res["output"]
+        if not res["ok"]:
+            print(f"❌ Failed {out}: {res['error']}")
+            continue
         print(f"✅ Created {out}")
+        metrics.count("clips_cut")
 
         # Save clip info for logging
         clips_info.append({
@@ -115,10 +250,9 @@ def run_pipeline(video_file: str):
     return clips_info
 
 
-def log_run(video_file, highlights, model_used="transformer"):
+def log_run(video_file, highlights, model_used="transformer", ws: Workspace = DEFAULT_WORKSPACE):
     ts = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     Path("runs").mkdir(exist_ok=True)
-    log_file = f"runs/{ts}.json"
     log_data = {
         "timestamp": ts,
         "video": video_file,
@@ -126,13 +260,80 @@ def log_run(video_file, highlights, model_used="transformer"):
         "num_highlights": len(highlights),
         "clips": highlights
     }
-    with open(log_file, "w", encoding="utf-8") as f:
+    if ws != DEFAULT_WORKSPACE:
+        log_data["workspace"] = ws.root
+    if metrics.current() is not None:
+        log_data["metrics"] = metrics.current().to_dict()
+    # Batch runs can finish within the same second: never overwrite a log
+    log_file, n = f"runs/{ts}.json", 1
+    while True:
+        try:
+            f = open(log_file, "x", encoding="utf-8")
+            break
+        except FileExistsError:
+            n += 1
+            log_file = f"runs/{ts}_{n}.json"
+    with f:
         json.dump(log_data, f, indent=2, ensure_ascii=False)
+    run_catalog.record_run(log_file, log_data)
     print(f"📝 Logged run to {log_file}")
+    return log_file
 
 
-if __name__ == "__main__":
-    video_file = "data/videos/output.mp4"
-    highlights = run_pipeline(video_file)
+def recut_run(log_file: str):
+    """Re-cut the clips of a logged run without transcribing or scoring again."""
+    with open(log_file, "r", encoding="utf-8") as f:
+        run = json.load(f)
+    highlights = [(c["score"], c["rank"], c["times"], c["text"]) for c in run.get("clips", [])]
+    ws = Workspace(run.get("workspace", DEFAULT_WORKSPACE.root))
+    return cut_highlights(run["video"], highlights, ws.audio_file, ws.transcript_file, ws)
+
+
+def main(argv=None):
+    """
+    Command line entry point. Heavy backends (whisper, torch, transformers,
+    librosa) are only imported by the stages that actually run.
+    """
+    import argparse
+    global USE_SUBTITLES, ALIGN_TO_SILENCE, TOP_N_HIGHLIGHTS, STAGE_CACHE
+
+    parser = argparse.ArgumentParser(prog="python -m src.pipeline", description=__doc__.strip())
+    parser.add_argument("video", nargs="?", default="data/videos/output.mp4")
+    parser.add_argument("--top-n", type=int, default=TOP_N_HIGHLIGHTS)
+    parser.add_argument("--subtitles", action="store_true", default=USE_SUBTITLES, help="burn subtitles into clips")
+    parser.add_argument("--no-align", action="store_true", help="don't snap clip boundaries to silence")
+    parser.add_argument("--scorer", choices=["transformer", "embedding", "keywords"], help="highlight scorer to use")
+    parser.add_argument("--backend", choices=["torch", "int8", "onnx", "onnx-int8"], help="inference backend for the transformer scorer")
+    parser.add_argument("--report", action="store_true", help="print stage timing percentiles across runs/ and exit")
+    parser.add_argument("--no-cache", action="store_true", help="recompute every stage instead of reusing cached artifacts")
+    parser.add_argument("--recut", metavar="RUN_JSON", help="re-cut clips from a logged run, skipping transcription and scoring")
+    args = parser.parse_args(argv)
+
+    USE_SUBTITLES = args.subtitles
+    ALIGN_TO_SILENCE = ALIGN_TO_SILENCE and not args.no_align
+    TOP_N_HIGHLIGHTS = args.top_n
+    if args.no_cache:
+        import src.highlight_detector as hd
+        STAGE_CACHE = hd.CACHE_SCORES = False
+    if args.scorer:
+        import src.highlight_detector as hd
+        hd.SCORER = args.scorer
+    if args.backend:
+        import src.ml.infer_text_regressor as itr
+        itr.BACKEND = args.backend
+
+    if args.report:
+        metrics.print_report(metrics.aggregate())
+        return
+    if args.recut:
+        metrics.start_run()
+        recut_run(args.recut)
+        return
+
+    highlights = run_pipeline(args.video)
     if highlights:
-        log_run(video_file, highlights, model_used="transformer")
+        log_run(args.video, highlights, model_used=args.scorer or "transformer")
+
+
+if __name__ == "__main__":
+    main()
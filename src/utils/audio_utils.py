@@ -1,15 +1,252 @@
+import os, json, threading
 import ffmpeg
-import librosa
 import numpy as np
+from src.utils import metrics
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+BLOCK_FRAMES = 2048          # RMS frames decoded per block (~65 s at 16 kHz)
+INDEX_SUFFIX = ".silence.npy"
+PCM_SUFFIX = ".f32"          # raw mono float32 little-endian PCM at SAMPLE_RATE
+PIPE_CHUNK = 1 << 20         # bytes read from ffmpeg stdout at a time
+
 
 def extract_audio_from_video(video_file: str, audio_file: str):
-    (
-        ffmpeg
-        .input(video_file)
-        .output(audio_file, format="mp3", acodec="mp3", ac=1, ar="16000")
-        .overwrite_output()
-        .run()
-    )
+    metrics.count("ffmpeg_invocations")
+    with metrics.span("ffmpeg", op="extract_mp3"):
+        (
+            ffmpeg
+            .input(video_file)
+            .output(audio_file, format="mp3", acodec="mp3", ac=1, ar="16000")
+            .overwrite_output()
+            .run()
+        )
+
+
+def extract_audio_pcm(video_file: str, pcm_file: str = None, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Stream the soundtrack as raw mono float32 PCM from ffmpeg's stdout.
+    With pcm_file the samples are spooled to disk and returned memory-mapped,
+    otherwise they are collected in memory. No compressed intermediate file.
+    On failure ffmpeg is killed and reaped, a partial pcm_file is removed and
+    ffmpeg.Error carries ffmpeg's stderr.
+    """
+    metrics.count("ffmpeg_invocations")
+    with metrics.span("ffmpeg", op="extract_pcm"):
+        proc = (
+            ffmpeg
+            .input(video_file)
+            .output("pipe:", format="f32le", acodec="pcm_f32le", ac=1, ar=sr)
+            .global_args("-nostats", "-loglevel", "error")
+            .run_async(pipe_stdout=True, pipe_stderr=True)
+        )
+        # Drained on the side so a chatty ffmpeg never blocks on a full stderr pipe
+        stderr = []
+        drain = threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True)
+        drain.start()
+        buf = None
+        try:
+            if pcm_file:
+                with open(pcm_file, "wb") as out:
+                    while chunk := proc.stdout.read(PIPE_CHUNK):
+                        out.write(chunk)
+            else:
+                buf = bytearray()
+                while chunk := proc.stdout.read(PIPE_CHUNK):
+                    buf += chunk
+            proc.wait()
+        finally:
+            if proc.returncode is None:   # the read / write loop raised (disk full, interrupt)
+                proc.kill()
+            proc.wait()
+            drain.join()
+            proc.stdout.close()
+            proc.stderr.close()
+            if proc.returncode != 0 and pcm_file and os.path.isfile(pcm_file):
+                os.remove(pcm_file)
+        if proc.returncode != 0:
+            raise ffmpeg.Error("ffmpeg", None, b"".join(stderr))
+
+    if pcm_file:
+        return load_pcm(pcm_file)
+    return np.frombuffer(buf, dtype=np.float32)
+
+
+def load_pcm(pcm_file: str) -> np.ndarray:
+    """Memory-map a raw PCM file written by extract_audio_pcm (copy-on-write)."""
+    if os.path.getsize(pcm_file) == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(pcm_file, dtype=np.float32, mode="c")
+
+
+def is_pcm_file(path) -> bool:
+    return isinstance(path, str) and path.endswith(PCM_SUFFIX)
+
+
+class SilenceIndex:
+    """
+    Per-video RMS loudness track (dBFS, one value per hop) plus cached silent
+    runs per threshold. Queries are binary searches over the run arrays.
+    """
+
+    def __init__(self, rms_db: np.ndarray, sr: int,
+                 hop_length: int = HOP_LENGTH, frame_length: int = FRAME_LENGTH):
+        self.rms_db = rms_db
+        self.sr = sr
+        self.frame_time = hop_length / sr
+        self.offset = (frame_length / 2) / sr   # frames are not centered (center=False)
+        self._runs = {}
+
+    def __len__(self):
+        return len(self.rms_db)
+
+    @property
+    def duration(self) -> float:
+        return self.frame_to_time(len(self.rms_db) - 1) if len(self.rms_db) else 0.0
+
+    def frame_to_time(self, i):
+        return self.offset + np.asarray(i) * self.frame_time
+
+    def silent_runs(self, thresh_db: float):
+        """Return (starts, ends) frame indices (inclusive) of runs below thresh_db."""
+        runs = self._runs.get(thresh_db)
+        if runs is None:
+            mask = np.asarray(self.rms_db) < thresh_db
+            edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+            starts = np.flatnonzero(edges == 1)
+            ends = np.flatnonzero(edges == -1) - 1
+            runs = self._runs[thresh_db] = (starts, ends)
+        return runs
+
+    def nearest_silence(self, t_target: float, direction: int, window: float,
+                        thresh_db: float, min_silence_len: float) -> float:
+        """
+        direction -1: latest silence of at least min_silence_len in
+        [t - window, t]; returns where that silence ends (closest to t).
+        direction +1: earliest such silence in [t, t + window]; returns the
+        point min_silence_len into it.
+        Falls back to t_target when nothing qualifies.
+        """
+        if not len(self.rms_db):
+            return t_target
+        last = len(self.rms_db) - 1
+        if direction == -1:
+            t0, t1 = max(0.0, t_target - window), t_target
+        else:
+            t0, t1 = t_target, min(float(self.frame_to_time(last)), t_target + window)
+
+        # Frame range whose times fall inside [t0, t1]
+        f0 = max(0, int(np.ceil((t0 - self.offset) / self.frame_time - 1e-9)))
+        f1 = min(last, int(np.floor((t1 - self.offset) / self.frame_time + 1e-9)))
+        if f1 < f0:
+            return t_target
+
+        starts, ends = self.silent_runs(thresh_db)
+        lo = np.searchsorted(ends, f0, side="left")
+        hi = np.searchsorted(starts, f1, side="right")
+        if hi <= lo:
+            return t_target
+
+        a = np.maximum(starts[lo:hi], f0)
+        b = np.minimum(ends[lo:hi], f1)
+        need = int(np.ceil(min_silence_len / self.frame_time - 1e-9))
+        ok = np.flatnonzero(b - a >= need)
+        if not len(ok):
+            return t_target
+
+        if direction == -1:
+            return float(self.frame_to_time(b[ok[-1]]))
+        return float(self.frame_to_time(a[ok[0]] + need))
+
+    def save(self, index_path: str, **meta):
+        np.save(index_path, np.asarray(self.rms_db, dtype=np.float32))
+        with open(index_path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"sr": self.sr, "hop_length": int(round(self.frame_time * self.sr)),
+                       "frame_length": int(round(self.offset * 2 * self.sr)), **meta}, f)
+
+    @classmethod
+    def load(cls, index_path: str):
+        """Memory-map a persisted index (no audio decode)."""
+        with open(index_path + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        rms_db = np.load(index_path, mmap_mode="r")
+        return cls(rms_db, meta["sr"], meta["hop_length"], meta["frame_length"]), meta
+
+
+def _source_stamp(audio_path: str) -> dict:
+    st = os.stat(audio_path)
+    return {"source_size": st.st_size, "source_mtime_ns": st.st_mtime_ns}
+
+
+def _array_blocks(y: np.ndarray, block_frames: int):
+    """Same block layout as librosa.stream, over an in-memory / mmapped buffer."""
+    step = block_frames * HOP_LENGTH
+    span = (block_frames - 1) * HOP_LENGTH + FRAME_LENGTH
+    for i in range(0, max(1, len(y) - FRAME_LENGTH + HOP_LENGTH), step):
+        yield np.asarray(y[i:i + span], dtype=np.float32)
+
+
+def _block_rms_db(y: np.ndarray) -> np.ndarray:
+    if len(y) < FRAME_LENGTH:
+        return np.zeros(0, np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(y, FRAME_LENGTH)[::HOP_LENGTH]
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    return 20.0 * np.log10(np.maximum(1e-5, rms + 1e-9))
+
+
+def build_silence_index(audio, block_frames: int = BLOCK_FRAMES, sr: int = SAMPLE_RATE) -> SilenceIndex:
+    """
+    Compute the RMS dB track block by block, so memory stays bounded by
+    block_frames regardless of recording length.
+    audio: path to an audio file, a raw .f32 PCM file, or a PCM array at sr.
+    """
+    if is_pcm_file(audio):
+        audio = load_pcm(audio)
+    if isinstance(audio, np.ndarray):
+        blocks = _array_blocks(audio, block_frames)
+    else:
+        import librosa   # only needed for compressed audio files
+        sr = librosa.get_samplerate(audio)
+        blocks = librosa.stream(
+            audio, block_length=block_frames,
+            frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH,
+            mono=True,
+        )
+    parts = [_block_rms_db(y) for y in blocks]
+    rms_db = np.concatenate(parts).astype(np.float32) if parts else np.zeros(0, np.float32)
+    return SilenceIndex(rms_db, sr)
+
+
+_indexes = {}   # index_path -> (source stamp, SilenceIndex)
+
+
+def get_silence_index(audio_path: str, index_path: str = None) -> SilenceIndex:
+    """
+    Return the silence index for audio_path, building it at most once.
+    The index is persisted next to the audio (<audio>.silence.npy) and
+    memory-mapped on later calls / runs while the audio is unchanged.
+    """
+    index_path = index_path or audio_path + INDEX_SUFFIX
+    stamp = _source_stamp(audio_path)
+
+    cached = _indexes.get(index_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    index = None
+    if os.path.exists(index_path) and os.path.exists(index_path + ".json"):
+        loaded, meta = SilenceIndex.load(index_path)
+        if all(meta.get(k) == v for k, v in stamp.items()):
+            index = loaded
+    if index is None:
+        index = build_silence_index(audio_path)
+        index.save(index_path, **stamp)
+        index, _ = SilenceIndex.load(index_path)
+
+    _indexes[index_path] = (stamp, index)
+    return index
+
 
 def align_to_silence(audio_path: str, start_s: float, end_s: float,
                      pre_window=1.2, post_window=1.2,
@@ -17,41 +254,12 @@ def align_to_silence(audio_path: str, start_s: float, end_s: float,
     """
     Move start left to nearest silence, and end right to nearest silence.
     rms_thresh_db: dBFS threshold considered "silence".
+    Uses the per-video silence index, so only the first call decodes audio.
     """
-    y, sr = librosa.load(audio_path, sr=None)
-    rms = librosa.feature.rms(y=y, frame_length=2048, hop_length=512)[0]
-    times = librosa.frames_to_time(np.arange(len(rms)), sr=sr, hop_length=512)
-
-    # Convert dB threshold
-    rms_db = librosa.amplitude_to_db(rms + 1e-9, ref=1.0)
-
-    def nearest_silence(t_target, direction):
-        # direction: -1 for backward search, +1 for forward
-        if direction == -1:
-            t0, t1 = max(0.0, t_target - pre_window), t_target
-        else:
-            t0, t1 = t_target, min(times[-1], t_target + post_window)
-
-        mask = (times >= t0) & (times <= t1)
-        cand_idx = np.where(mask)[0]
-        if len(cand_idx) == 0: return t_target
-
-        idxs = cand_idx if direction == +1 else cand_idx[::-1]
-        recent_start = None
-        for i in idxs:
-            if rms_db[i] < rms_thresh_db:
-                # accumulate consecutive silence frames
-                if recent_start is None:
-                    recent_start = times[i]
-                # check if silence long enough
-                if times[i] - recent_start >= min_silence_len:
-                    return recent_start if direction == -1 else times[i]
-            else:
-                recent_start = None
-        return t_target
+    index = get_silence_index(audio_path)
 
-    new_start = nearest_silence(start_s, -1)
-    new_end   = nearest_silence(end_s, +1)
+    new_start = index.nearest_silence(start_s, -1, pre_window, rms_thresh_db, min_silence_len)
+    new_end   = index.nearest_silence(end_s, +1, post_window, rms_thresh_db, min_silence_len)
     if new_end <= new_start:  # safety
         new_start, new_end = start_s, end_s
     return round(new_start, 3), round(new_end, 3)
@@ -0,0 +1,205 @@
+"""
+Local feedback store: one append-only SQLite table of reviewer labels.
+
+- One schema for every source (reviewed_*.json files, the Gradio demo, the
+  git-synced data/feedback.jsonl that other reviewers push to, ...).
+- Rows are deduplicated by a content hash, so re-ingesting is a no-op.
+- Ingested review files are recorded (path + sha1), so ingestion only reads
+  files that are new or changed.
+- Consumers keep a watermark (last row id they trained on) and read only
+  rows added after it.
+"""
+
+import os, json, glob, sqlite3, hashlib, datetime
+from src.utils.file_utils import file_sha1
+
+DB_PATH = "data/feedback.sqlite"
+REVIEWS_DIR = "notebooks/reviews"
+SHARED_FILE = "data/feedback.jsonl"   # appended + pushed by feedback_sync, pulled from other reviewers
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    key         TEXT NOT NULL UNIQUE,      -- content hash, see feedback_key()
+    text        TEXT NOT NULL,
+    label       REAL NOT NULL,             -- 1=good, 0=bad
+    score       REAL,                      -- model score shown to the reviewer
+    times       TEXT,
+    clip_file   TEXT,
+    source      TEXT,                      -- review file / "gradio" / ...
+    reviewed_at TEXT
+);
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path        TEXT PRIMARY KEY,
+    sha1        TEXT NOT NULL,
+    rows        INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    consumer    TEXT PRIMARY KEY,
+    last_id     INTEGER NOT NULL
+);
+"""
+COLUMNS = ("id", "text", "label", "score", "times", "clip_file", "source", "reviewed_at")
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """Open (and create if needed) the store. WAL lets readers run during writes."""
+    parent = os.path.dirname(db_path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def feedback_key(record: dict) -> str:
+    """Same clip, same text, same label -> same row."""
+    raw = f"{record.get('clip_file') or ''}\0{float(record['label'])}\0{record['text']}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def normalize(record: dict, source: str = None) -> dict:
+    """Map the review-file and demo schemas onto the store schema."""
+    times = record.get("times")
+    return {
+        "text": record["text"],
+        "label": float(record["label"]),
+        "score": None if record.get("score") is None else float(record["score"]),
+        "times": times if times is None or isinstance(times, str) else json.dumps(times),
+        "clip_file": record.get("clip_file") or record.get("file"),
+        "source": record.get("source") or source,
+        "reviewed_at": record.get("reviewed_at") or record.get("timestamp") or _now(),
+    }
+
+
+def add_feedback(records, source: str = None, conn: sqlite3.Connection = None) -> int:
+    """Insert records (any supported schema); duplicates are skipped. Returns rows added."""
+    own = conn is None
+    conn = conn or connect()
+    rows = []
+    for r in records:
+        n = normalize(r, source)
+        rows.append((feedback_key(n), n["text"], n["label"], n["score"], n["times"],
+                     n["clip_file"], n["source"], n["reviewed_at"]))
+    try:
+        with conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO feedback (key, text, label, score, times, clip_file, source, reviewed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            return conn.total_changes - before
+    finally:
+        if own:
+            conn.close()
+
+
+def _ingest_files(paths, load, conn: sqlite3.Connection = None) -> int:
+    """Add the records of every file that is new or changed since it was last ingested."""
+    own = conn is None
+    conn = conn or connect()
+    added = 0
+    try:
+        known = dict(conn.execute("SELECT path, sha1 FROM ingested_files"))
+        for path in paths:
+            sha = file_sha1(path)
+            if known.get(path) == sha:
+                continue
+            n = add_feedback(load(path), source=path, conn=conn)
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO ingested_files (path, sha1, rows, ingested_at) VALUES (?, ?, ?, ?)",
+                             (path, sha, n, _now()))
+            added += n
+    finally:
+        if own:
+            conn.close()
+    return added
+
+
+def _load_review(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("feedback", [])
+
+
+def _load_jsonl(path: str):
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                continue   # torn / conflicted line
+    return [r for r in out if isinstance(r, dict) and "text" in r and "label" in r]
+
+
+def ingest_reviews(reviews_dir: str = REVIEWS_DIR, conn: sqlite3.Connection = None) -> int:
+    """Ingest reviewed_*.json files that are new or changed since the last run."""
+    return _ingest_files(sorted(glob.glob(os.path.join(reviews_dir, "reviewed_*.json"))), _load_review, conn)
+
+
+def ingest_jsonl(path: str = SHARED_FILE, conn: sqlite3.Connection = None) -> int:
+    """Ingest a JSONL label file (by default the git-synced one) if new or changed."""
+    return _ingest_files([path] if os.path.exists(path) else [], _load_jsonl, conn)
+
+
+def ingest_all(reviews_dir: str = REVIEWS_DIR, shared_file: str = SHARED_FILE,
+               conn: sqlite3.Connection = None) -> int:
+    """Every label source: local review files plus labels pulled from other reviewers."""
+    return ingest_reviews(reviews_dir, conn) + ingest_jsonl(shared_file, conn)
+
+
+def read_feedback(since_id: int = 0, conn: sqlite3.Connection = None):
+    """All rows with id > since_id, oldest first, as dicts."""
+    own = conn is None
+    conn = conn or connect()
+    try:
+        cur = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM feedback WHERE id > ? ORDER BY id", (since_id,))
+        return [dict(zip(COLUMNS, row)) for row in cur]
+    finally:
+        if own:
+            conn.close()
+
+
+def get_watermark(consumer: str, conn: sqlite3.Connection = None) -> int:
+    own = conn is None
+    conn = conn or connect()
+    try:
+        row = conn.execute("SELECT last_id FROM watermarks WHERE consumer = ?", (consumer,)).fetchone()
+        return row[0] if row else 0
+    finally:
+        if own:
+            conn.close()
+
+
+def set_watermark(consumer: str, last_id: int, conn: sqlite3.Connection = None):
+    """Record that consumer has processed every row up to last_id."""
+    own = conn is None
+    conn = conn or connect()
+    try:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO watermarks (consumer, last_id) VALUES (?, ?)", (consumer, int(last_id)))
+    finally:
+        if own:
+            conn.close()
+
+
+def export_jsonl(path: str, conn: sqlite3.Connection = None) -> int:
+    """
+    Snapshot the whole table as JSONL (one training sample per line).
+    Never point this at SHARED_FILE: that one is append-only and git-synced.
+    """
+    rows = read_feedback(conn=conn)
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for r in rows:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+    return len(rows)
@@ -0,0 +1,242 @@
+"""
+Background git writer for reviewer feedback.
+
+The Gradio reviewer used to run git add / commit / push on every click.
+GitFeedbackWriter.submit() instead:
+- appends the label to a durable spool file (fsync'd) and queues it,
+  returning immediately;
+- applies backpressure: when max_pending labels are waiting, submit() blocks
+  for up to put_timeout and then refuses the label;
+- a single worker thread groups queued labels and flushes them when
+  batch_size is reached or flush_interval has passed: append to the target
+  file, one commit, one push (rebasing on the remote if it moved), retried
+  with exponential backoff. The "data/feedback.jsonl merge=union" line in
+  .gitattributes lets concurrent appends from several machines rebase
+  cleanly; without it (or on any other rebase conflict) the writer resets its
+  feedback commits onto the remote and re-appends every label not there yet;
+- labels still in the spool after a crash are flushed on the next start.
+
+Works against any git remote, e.g. a local bare repo:
+
+    git init --bare /tmp/fb.git && git clone /tmp/fb.git /tmp/fb
+    w = GitFeedbackWriter("/tmp/fb", remote="origin", branch="main")
+"""
+
+import os, json, time, uuid, queue, threading, subprocess
+
+TARGET_FILE = "data/feedback.jsonl"
+SPOOL_FILE = "data/feedback_spool.jsonl"
+BATCH_SIZE = 20
+FLUSH_INTERVAL = 15.0    # seconds
+MAX_PENDING = 1000
+PUT_TIMEOUT = 2.0
+MAX_RETRIES = 5
+RETRY_BACKOFF = 2.0      # seconds, doubled per attempt
+
+
+class GitFeedbackWriter:
+    def __init__(self, repo_dir=".", target_file=TARGET_FILE, remote="hf-dataset", branch="main",
+                 spool_file=SPOOL_FILE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_pending=MAX_PENDING, put_timeout=PUT_TIMEOUT, max_retries=MAX_RETRIES,
+                 retry_backoff=RETRY_BACKOFF, push=True):
+        self.repo_dir = repo_dir
+        self.target_file = target_file
+        self.remote, self.branch, self.push = remote, branch, push
+        self.spool_file = spool_file
+        self.batch_size, self.flush_interval = batch_size, flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries, self.retry_backoff = max_retries, retry_backoff
+        self.last_error = None
+        self.flushed = 0
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._spool_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pushed = set()
+
+        spool_dir = os.path.dirname(spool_file)
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+        # Recover labels that were spooled but never pushed (maybe committed locally)
+        for entry in self._read_spool():
+            self._queue.put(entry)
+
+        self._worker = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+        self._worker.start()
+
+    # ---- public API ----
+    def submit(self, entry: dict) -> bool:
+        """
+        Spool (fsync'd) then queue one label, so a crash in between cannot
+        lose it. False if the writer is saturated (backpressure); the label
+        is taken back out of the spool then.
+        """
+        entry = {"id": entry.get("id") or uuid.uuid4().hex, **entry}
+        with self._spool_lock:
+            with open(self.spool_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        try:
+            self._queue.put(entry, timeout=self.put_timeout)
+        except queue.Full:
+            self._rewrite_spool(lambda e: e["id"] != entry["id"])
+            return False
+        return True
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, timeout: float = 60.0):
+        """Flush what is queued and stop the worker."""
+        self._stop.set()
+        self._worker.join(timeout)
+
+    # ---- worker ----
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._flush_with_retry(batch)
+            elif self._stop.is_set():
+                return
+
+    def _next_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            wait = deadline - time.monotonic()
+            if self._stop.is_set():
+                wait = 0   # closing: drain without waiting
+            try:
+                batch.append(self._queue.get(timeout=max(wait, 0.05)) if wait > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush_with_retry(self, batch):
+        batch = [e for e in batch if e["id"] not in self._pushed]
+        if not batch:
+            return
+        delay = self.retry_backoff
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                pushed = self._flush(batch)
+                self.last_error = None
+                break
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"⚠️ Feedback push failed (attempt {attempt}/{self.max_retries}): {e}")
+                if attempt < self.max_retries and not self._stop.wait(delay):
+                    delay *= 2
+                elif attempt < self.max_retries:
+                    time.sleep(min(delay, 1.0))   # closing: retry quickly
+        else:
+            # Still spooled on disk; picked up again on the next start
+            print(f"❌ Gave up on {len(batch)} feedback labels, kept in {self.spool_file}")
+            return
+        self.flushed += len(pushed - self._pushed)
+        self._pushed.update(pushed)
+        self._prune_spool()
+
+    def _git(self, *args):
+        proc = subprocess.run(["git", *args], cwd=self.repo_dir, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"git {' '.join(args)}: {proc.stderr.strip() or proc.stdout.strip()}")
+        return proc.stdout
+
+    def _commit(self, entries):
+        """Append the labels not in the target file yet and commit them. Returns the ids now committed."""
+        committed = self._committed_ids()   # a failed push may have committed some already
+        new = [e for e in entries if e["id"] not in committed]
+        if new:
+            path = os.path.join(self.repo_dir, self.target_file)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                for e in new:
+                    f.write(json.dumps(e, ensure_ascii=False) + "\n")
+            self._git("add", self.target_file)
+            self._git("commit", "-m", f"Add {len(new)} feedback label(s)", "--", self.target_file)
+        return {e["id"] for e in entries}
+
+    def _flush(self, batch):
+        """Commit + push one batch. Returns the ids that reached the remote (or were committed, push=False)."""
+        ids = self._commit(batch)
+        if not self.push:
+            return ids
+        try:
+            self._git("push", self.remote, f"HEAD:{self.branch}")
+            return ids
+        except RuntimeError:
+            pass
+        # Remote moved (another reviewer machine): replay our commits on top
+        try:
+            self._git("pull", "--rebase", "--autostash", self.remote, self.branch)
+        except RuntimeError:
+            subprocess.run(["git", "rebase", "--abort"], cwd=self.repo_dir, capture_output=True)
+            return self._reset_onto_remote(batch)
+        self._git("push", self.remote, f"HEAD:{self.branch}")
+        return ids
+
+    def _reset_onto_remote(self, batch):
+        """
+        Rebase conflict on the target file: drop our unpushed feedback commits
+        (their labels are all in the spool), take the remote's file and
+        re-append every spooled label it does not have. Only done when those
+        commits touch nothing but the target file; the working tree is kept.
+        """
+        self._git("fetch", self.remote, self.branch)
+        touched = set(self._git("log", "--format=", "--name-only", "FETCH_HEAD..HEAD").split())
+        if touched - {self.target_file}:
+            raise RuntimeError(f"rebase conflict and unpushed commits touch {sorted(touched - {self.target_file})}")
+        self._git("reset", "--mixed", "FETCH_HEAD")
+        path = os.path.join(self.repo_dir, self.target_file)
+        if subprocess.run(["git", "cat-file", "-e", f"FETCH_HEAD:{self.target_file}"],
+                          cwd=self.repo_dir, capture_output=True).returncode == 0:
+            self._git("checkout", "FETCH_HEAD", "--", self.target_file)
+        elif os.path.exists(path):
+            os.remove(path)
+        with self._spool_lock:
+            spooled = self._read_spool()
+        seen = {e["id"] for e in spooled}
+        ids = self._commit(spooled + [e for e in batch if e["id"] not in seen])
+        self._git("push", self.remote, f"HEAD:{self.branch}")
+        return ids
+
+    # ---- spool ----
+    def _committed_ids(self):
+        path = os.path.join(self.repo_dir, self.target_file)
+        ids = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        ids.add(json.loads(line).get("id"))
+                    except ValueError:
+                        continue
+        ids.discard(None)
+        return ids
+
+    def _read_spool(self):
+        if not os.path.exists(self.spool_file):
+            return []
+        out = []
+        with open(self.spool_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    out.append(json.loads(line))
+                except ValueError:
+                    continue   # torn last line after a crash
+        return out
+
+    def _prune_spool(self):
+        self._rewrite_spool(lambda e: e["id"] not in self._pushed)
+
+    def _rewrite_spool(self, keep_entry):
+        with self._spool_lock:
+            keep = [e for e in self._read_spool() if keep_entry(e)]
+            tmp = self.spool_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for e in keep:
+                    f.write(json.dumps(e, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.spool_file)
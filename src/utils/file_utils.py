@@ -1,4 +1,4 @@
-import shutil
+import shutil, hashlib
 from pathlib import Path
 
 def ensure_dir(path: str):
@@ -16,3 +16,11 @@ def clear_dir(path: str):
                 shutil.rmtree(item)
     else:
         p.mkdir(parents=True, exist_ok=True)
+
+def file_sha1(path: str) -> str:
+    """SHA-1 of a file's contents, read in 1 MiB chunks."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,169 @@
+"""
+Per-run instrumentation: timed spans and counters, stored in the run log.
+
+    m = metrics.start_run()
+    with metrics.span("transcribe"):
+        ...
+    metrics.count("windows_scored", len(windows))
+    log_data["metrics"] = m.to_dict()
+
+Each span records wall time, CPU time of the calling thread, CPU time of
+child processes reaped during the span (ffmpeg, transcription workers) and
+peak RSS so far of this process and of its largest child. Child CPU and
+peak RSS are process-wide, so with overlapping spans (batch mode, cut pool)
+they are upper bounds.
+
+The current run lives in a ContextVar: batch threads each get their own,
+and pools that should report into it submit work with contextvars.copy_context().
+
+    python -m src.utils.metrics [runs_dir]    # percentiles across logged runs
+"""
+
+import os, sys, json, glob, time, threading, contextvars
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:   # Windows: wall / CPU time only
+    resource = None
+
+RUNS_DIR = "runs"
+PERCENTILES = (50, 90, 99)
+
+_current = contextvars.ContextVar("run_metrics", default=None)
+
+
+def _rusage():
+    if resource is None:
+        return 0.0, 0.0, 0.0
+    me = resource.getrusage(resource.RUSAGE_SELF)
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is KiB on Linux
+    return kids.ru_utime + kids.ru_stime, me.ru_maxrss / 1024.0, kids.ru_maxrss / 1024.0
+
+
+class RunMetrics:
+    """Spans + counters of one pipeline run (thread-safe)."""
+
+    def __init__(self):
+        self.spans = []
+        self.counters = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def add_span(self, record: dict):
+        with self._lock:
+            self.spans.append(record)
+
+    def count(self, name: str, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            totals = {}
+            for s in self.spans:
+                totals[s["name"]] = round(totals.get(s["name"], 0.0) + s["wall_s"], 4)
+            return {"spans": list(self.spans), "counters": dict(self.counters), "stage_wall_s": totals,
+                    "total_wall_s": round(time.time() - self.started, 4)}
+
+
+def start_run() -> RunMetrics:
+    """Start collecting for the current thread / context and return the collector."""
+    m = RunMetrics()
+    _current.set(m)
+    return m
+
+
+def current():
+    return _current.get()
+
+
+def count(name: str, n=1):
+    """Add n to a counter of the current run (no-op outside a run)."""
+    m = _current.get()
+    if m is not None:
+        m.count(name, n)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block into the current run (no-op outside a run)."""
+    m = _current.get()
+    if m is None:
+        yield
+        return
+    t0, wall0, cpu0 = time.time(), time.perf_counter(), time.thread_time()
+    child0, _, _ = _rusage()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        child1, rss, child_rss = _rusage()
+        m.add_span({
+            "name": name, **attrs, "ok": ok,
+            "start": round(t0, 3),
+            "wall_s": round(time.perf_counter() - wall0, 4),
+            "cpu_s": round(time.thread_time() - cpu0, 4),
+            "child_cpu_s": round(child1 - child0, 4),
+            "peak_rss_mb": round(rss, 1),
+            "child_peak_rss_mb": round(child_rss, 1),
+        })
+
+
+# ---------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------
+def _percentiles(values):
+    import numpy as np
+    arr = np.asarray(values, dtype=np.float64)
+    return {f"p{p}": round(float(np.percentile(arr, p)), 3) for p in PERCENTILES}
+
+
+def aggregate(runs_dir: str = RUNS_DIR) -> dict:
+    """Per-span-name and per-counter percentiles over every run log with metrics."""
+    spans, counters, totals, n_runs = {}, {}, [], 0
+    for log_file in glob.glob(os.path.join(runs_dir, "*.json")):
+        with open(log_file, "r", encoding="utf-8") as f:
+            m = json.load(f).get("metrics")
+        if not m:
+            continue
+        n_runs += 1
+        totals.append(m.get("total_wall_s", 0.0))
+        for s in m.get("spans", []):
+            d = spans.setdefault(s["name"], {"wall_s": [], "cpu_s": [], "child_cpu_s": [], "peak_rss_mb": []})
+            for k in d:
+                d[k].append(s.get(k, 0.0))
+        for k, v in m.get("counters", {}).items():
+            counters.setdefault(k, []).append(v)
+
+    report = {"runs": n_runs, "counters": {}, "spans": {}}
+    if not n_runs:
+        return report
+    report["total_wall_s"] = _percentiles(totals)
+    for name, d in sorted(spans.items()):
+        report["spans"][name] = {"n": len(d["wall_s"]), **{k: _percentiles(v) for k, v in d.items()}}
+    for name, v in sorted(counters.items()):
+        report["counters"][name] = {"sum": sum(v), **_percentiles(v)}
+    return report
+
+
+def print_report(report: dict):
+    print(f"📊 {report['runs']} runs with metrics")
+    if not report["runs"]:
+        return
+    print(f"{'span':<22}{'n':>6}" + "".join(f"{'wall p' + str(p):>11}" for p in PERCENTILES)
+          + f"{'cpu p50':>10}{'child p50':>11}{'rss p99':>10}")
+    for name, d in report["spans"].items():
+        print(f"{name:<22}{d['n']:>6}" + "".join(f"{d['wall_s'][f'p{p}']:>11.3f}" for p in PERCENTILES)
+              + f"{d['cpu_s']['p50']:>10.3f}{d['child_cpu_s']['p50']:>11.3f}{d['peak_rss_mb']['p99']:>10.1f}")
+    print(f"{'counter':<22}{'sum':>10}" + "".join(f"{'p' + str(p):>10}" for p in PERCENTILES))
+    for name, d in report["counters"].items():
+        print(f"{name:<22}{d['sum']:>10}" + "".join(f"{d[f'p{p}']:>10.1f}" for p in PERCENTILES))
+
+
+if __name__ == "__main__":
+    print_report(aggregate(*sys.argv[1:2]))
@@ -0,0 +1,228 @@
+"""
+Indexed catalog of pipeline runs (runs/catalog.sqlite).
+
+log_run still writes runs/<timestamp>.json (recut_run and the dataset repo
+read those); the catalog indexes them so readers never glob + sort + parse
+every run file:
+- latest_run()          newest run, via the created_at index
+- runs_for_video(video) runs of one video, newest first
+- top_clips(n)          best-scoring clips across all runs
+- unprocessed_runs(...) runs a post-processing step has not handled yet
+
+    python -m src.utils.run_catalog      # index run files that are new or changed
+"""
+
+import os, json, glob, sqlite3, datetime
+
+RUNS_DIR = "runs"
+DB_PATH = os.path.join(RUNS_DIR, "catalog.sqlite")
+TS_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    log_file       TEXT NOT NULL UNIQUE,
+    timestamp      TEXT,
+    created_at     REAL NOT NULL,          -- epoch seconds of the run, not file mtime
+    video          TEXT,
+    model_used     TEXT,
+    num_highlights INTEGER,
+    urls_rewritten INTEGER NOT NULL DEFAULT 0,
+    file_size      INTEGER,                -- run file stamp when indexed: sync re-reads it when
+    file_mtime_ns  INTEGER                 -- the file is rewritten (git pull, manual edit)
+);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created_at);
+CREATE INDEX IF NOT EXISTS runs_video ON runs (video, created_at);
+CREATE INDEX IF NOT EXISTS runs_unrewritten ON runs (urls_rewritten, created_at);
+CREATE TABLE IF NOT EXISTS clips (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    rank   INTEGER NOT NULL,
+    score  REAL,
+    times  TEXT,
+    text   TEXT,
+    file   TEXT,
+    PRIMARY KEY (run_id, rank)
+);
+CREATE INDEX IF NOT EXISTS clips_score ON clips (score);
+"""
+RUN_COLUMNS = ("id", "log_file", "timestamp", "created_at", "video", "model_used", "num_highlights", "urls_rewritten")
+CLIP_COLUMNS = ("rank", "score", "times", "text", "file")
+STAMP_COLUMNS = {"file_size": "INTEGER", "file_mtime_ns": "INTEGER"}   # added after the first release
+
+
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    parent = os.path.dirname(db_path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_SCHEMA)
+    have = {row[1] for row in conn.execute("PRAGMA table_info(runs)")}
+    for col, kind in STAMP_COLUMNS.items():
+        if col not in have:
+            conn.execute(f"ALTER TABLE runs ADD COLUMN {col} {kind}")
+    return conn
+
+
+def _file_stamp(log_file: str):
+    """(size, mtime_ns) of a run file, (None, None) if it is gone."""
+    try:
+        st = os.stat(log_file)
+    except FileNotFoundError:
+        return None, None
+    return st.st_size, st.st_mtime_ns
+
+
+def _created_at(log_file: str, run: dict) -> float:
+    try:
+        return datetime.datetime.strptime(run.get("timestamp", ""), TS_FORMAT).timestamp()
+    except ValueError:
+        return os.path.getmtime(log_file)
+
+
+def _clip_rows(run_id: int, clips):
+    return [(run_id, c.get("rank", i + 1), c.get("score"), c.get("times"), c.get("text"), c.get("file"))
+            for i, c in enumerate(clips)]
+
+
+def record_run(log_file: str, run: dict, conn: sqlite3.Connection = None) -> int:
+    """Add (or refresh) one run and its clips. Returns the run id."""
+    own = conn is None
+    conn = conn or connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM runs WHERE log_file = ?", (log_file,))
+            cur = conn.execute(
+                "INSERT INTO runs (log_file, timestamp, created_at, video, model_used, num_highlights, "
+                "file_size, file_mtime_ns) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (log_file, run.get("timestamp"), _created_at(log_file, run), run.get("video"),
+                 run.get("model_used"), run.get("num_highlights", len(run.get("clips", []))),
+                 *_file_stamp(log_file)))
+            run_id = cur.lastrowid
+            conn.executemany("INSERT OR REPLACE INTO clips (run_id, rank, score, times, text, file) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", _clip_rows(run_id, run.get("clips", [])))
+        return run_id
+    finally:
+        if own:
+            conn.close()
+
+
+def sync(runs_dir: str = RUNS_DIR, conn: sqlite3.Connection = None) -> int:
+    """
+    Index run files that are not in the catalog yet or whose size / mtime
+    changed since they were indexed (e.g. pulled or rewritten by git).
+    Returns the number of files (re-)indexed.
+    """
+    own = conn is None
+    conn = conn or connect()
+    try:
+        known = {row[0]: tuple(row[1:]) for row in conn.execute("SELECT log_file, file_size, file_mtime_ns FROM runs")}
+        indexed = 0
+        for log_file in sorted(glob.glob(os.path.join(runs_dir, "*.json"))):
+            if known.get(log_file) == _file_stamp(log_file):
+                continue
+            with open(log_file, "r", encoding="utf-8") as f:
+                record_run(log_file, json.load(f), conn=conn)
+            indexed += 1
+        return indexed
+    finally:
+        if own:
+            conn.close()
+
+
+def _clips(conn, run_id):
+    cur = conn.execute(f"SELECT {', '.join(CLIP_COLUMNS)} FROM clips WHERE run_id = ? ORDER BY rank", (run_id,))
+    return [dict(zip(CLIP_COLUMNS, row)) for row in cur]
+
+
+def _runs(conn, where="", params=(), limit=None, with_clips=False):
+    sql = f"SELECT {', '.join(RUN_COLUMNS)} FROM runs {where} ORDER BY created_at DESC, id DESC"
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    runs = [dict(zip(RUN_COLUMNS, row)) for row in conn.execute(sql, params)]
+    if with_clips:
+        for r in runs:
+            r["clips"] = _clips(conn, r["id"])
+    return runs
+
+
+def latest_run(conn: sqlite3.Connection = None):
+    """Newest run with its clips, or None."""
+    own = conn is None
+    conn = conn or connect()
+    try:
+        runs = _runs(conn, limit=1, with_clips=True)
+        return runs[0] if runs else None
+    finally:
+        if own:
+            conn.close()
+
+
+def runs_for_video(video: str, limit: int = None, conn: sqlite3.Connection = None):
+    """Runs of one source video, newest first (without clips)."""
+    own = conn is None
+    conn = conn or connect()
+    try:
+        return _runs(conn, "WHERE video = ?", (video,), limit=limit)
+    finally:
+        if own:
+            conn.close()
+
+
+def top_clips(n: int = 10, video: str = None, conn: sqlite3.Connection = None):
+    """Highest-scoring clips across runs, each with its run's log_file / video."""
+    own = conn is None
+    conn = conn or connect()
+    try:
+        where, params = ("WHERE r.video = ?", (video,)) if video else ("", ())
+        cols = ", ".join(f"c.{c}" for c in CLIP_COLUMNS)
+        cur = conn.execute(
+            f"SELECT {cols}, r.log_file, r.video FROM clips c JOIN runs r ON r.id = c.run_id "
+            f"{where} ORDER BY c.score DESC LIMIT ?", (*params, int(n)))
+        return [dict(zip(CLIP_COLUMNS + ("log_file", "video"), row)) for row in cur]
+    finally:
+        if own:
+            conn.close()
+
+
+def unprocessed_runs(flag: str = "urls_rewritten", conn: sqlite3.Connection = None):
+    """Runs whose flag column is still 0, oldest first."""
+    if flag not in RUN_COLUMNS:
+        raise ValueError(f"Unknown run flag {flag!r}")
+    own = conn is None
+    conn = conn or connect()
+    try:
+        return list(reversed(_runs(conn, f"WHERE {flag} = 0", with_clips=True)))
+    finally:
+        if own:
+            conn.close()
+
+
+def mark_processed(run_id: int, clips=None, flag: str = "urls_rewritten", conn: sqlite3.Connection = None):
+    """
+    Set a run's flag (and optionally replace its clips, e.g. with rewritten
+    URLs). The stored file stamp is refreshed too, so a run file the caller
+    just rewrote is not re-indexed (and unflagged) by the next sync.
+    """
+    if flag not in RUN_COLUMNS:
+        raise ValueError(f"Unknown run flag {flag!r}")
+    own = conn is None
+    conn = conn or connect()
+    try:
+        with conn:
+            row = conn.execute("SELECT log_file FROM runs WHERE id = ?", (run_id,)).fetchone()
+            stamp = _file_stamp(row[0]) if row else (None, None)
+            conn.execute(f"UPDATE runs SET {flag} = 1, file_size = ?, file_mtime_ns = ? WHERE id = ?",
+                         (*stamp, run_id))
+            if clips is not None:
+                conn.execute("DELETE FROM clips WHERE run_id = ?", (run_id,))
+                conn.executemany("INSERT INTO clips (run_id, rank, score, times, text, file) VALUES (?, ?, ?, ?, ?, ?)",
+                                 _clip_rows(run_id, clips))
+    finally:
+        if own:
+            conn.close()
+
+
+if __name__ == "__main__":
+    print(f"✅ Indexed {sync()} new or changed run file(s) into {DB_PATH}")
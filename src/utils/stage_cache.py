@@ -0,0 +1,134 @@
+"""
+Content-addressed cache for pipeline stage artifacts.
+
+An entry is keyed by a stage name plus a hash of everything the artifact
+depends on: input content hashes and stage parameters (model size, window
+lengths, checkpoint identity, ...). Change any of them and the key changes;
+nothing is ever invalidated in place.
+
+    data/cache/stages/<stage>/<key[:2]>/<key>/<files>
+
+Files are hard-linked in and out of the cache when possible (same
+filesystem), so a hit costs a few syscalls instead of a copy.
+"""
+
+import os, json, shutil, hashlib, threading, tempfile
+from src.utils.file_utils import file_sha1
+
+CACHE_DIR = "data/cache/stages"
+HASH_MEMO = "hashes.json"   # path + size + mtime -> content hash
+
+_memo_lock = threading.Lock()
+
+
+def _memo_path(cache_dir: str) -> str:
+    return os.path.join(cache_dir, HASH_MEMO)
+
+
+def _read_memo(cache_dir: str) -> dict:
+    if not os.path.exists(_memo_path(cache_dir)):
+        return {}
+    with open(_memo_path(cache_dir), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def content_hash(path: str, cache_dir: str = CACHE_DIR) -> str:
+    """
+    SHA-1 of a file's contents, memoized by (path, size, mtime) so a large
+    unchanged video is only read once.
+    """
+    st = os.stat(path)
+    memo_key = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    with _memo_lock:
+        h = _read_memo(cache_dir).get(memo_key)
+    if h:
+        return h
+    h = file_sha1(path)
+    with _memo_lock:
+        os.makedirs(cache_dir, exist_ok=True)
+        memo = _read_memo(cache_dir)
+        memo[memo_key] = h
+        tmp = _memo_path(cache_dir) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(memo, f)
+        os.replace(tmp, _memo_path(cache_dir))
+    return h
+
+
+def stage_key(stage: str, **inputs) -> str:
+    """Key for a stage from its inputs (hashes, params); order-independent."""
+    raw = json.dumps({"stage": stage, **inputs}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def entry_dir(stage: str, key: str, cache_dir: str = CACHE_DIR) -> str:
+    return os.path.join(cache_dir, stage, key[:2], key)
+
+
+def _link_or_copy(src: str, dst: str):
+    """Hard link (keeps size + mtime, so stamps stay valid), else copy2."""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def lookup(stage: str, key: str, cache_dir: str = CACHE_DIR):
+    """Entry directory if the artifact is cached, else None."""
+    d = entry_dir(stage, key, cache_dir)
+    return d if os.path.isdir(d) else None
+
+
+def store(stage: str, key: str, files: dict, cache_dir: str = CACHE_DIR) -> str:
+    """
+    Cache files ({name in entry: source path}) under stage/key.
+    Written to a temp dir and renamed, so readers never see partial entries.
+    """
+    final = entry_dir(stage, key, cache_dir)
+    if os.path.isdir(final):
+        return final
+    os.makedirs(os.path.dirname(final), exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp_", dir=os.path.dirname(final))
+    try:
+        for name, src in files.items():
+            _link_or_copy(src, os.path.join(tmp, name))
+        os.replace(tmp, final)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(final):   # lost a race to an identical entry: fine
+            raise
+    return final
+
+
+def restore(stage: str, key: str, files: dict, cache_dir: str = CACHE_DIR) -> bool:
+    """Materialize a cached entry ({name in entry: destination path}). False on a miss."""
+    d = lookup(stage, key, cache_dir)
+    if d is None or not all(os.path.exists(os.path.join(d, name)) for name in files):
+        return False
+    for name, dst in files.items():
+        parent = os.path.dirname(dst)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        _link_or_copy(os.path.join(d, name), dst)
+    return True
+
+
+def load_json(stage: str, key: str, cache_dir: str = CACHE_DIR):
+    """Cached JSON value for stage/key, or None."""
+    d = lookup(stage, key, cache_dir)
+    if d is None:
+        return None
+    with open(os.path.join(d, "value.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def store_json(stage: str, key: str, value, cache_dir: str = CACHE_DIR):
+    fd, tmp = tempfile.mkstemp(suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        store(stage, key, {"value.json": tmp}, cache_dir)
+    finally:
+        os.remove(tmp)
@@ -2,9 +2,69 @@
 Text utilities (NLP scoring, embeddings)
 """
 
-from sentence_transformers import SentenceTransformer
+import os, hashlib
+import numpy as np
+from functools import lru_cache
+
+EMBED_MODEL = "all-MiniLM-L6-v2"
+EMBED_CACHE_DIR = "data/cache/embeddings"
+EMBED_BATCH = 64
+
+
+@lru_cache(maxsize=None)
+def get_embedding_model(name: str = EMBED_MODEL):
+    """Load the SentenceTransformer on first use, once per process."""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
 
 def get_text_embedding(text: str):
-    return model.encode(text, convert_to_tensor=True)
+    return get_embedding_model().encode(text, convert_to_tensor=True)
+
+
+def text_hash(text: str, model_name: str = EMBED_MODEL) -> str:
+    return hashlib.sha1(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _cache_path(h: str, model_name: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, model_name.replace("/", "__"), h[:2], h + ".npy")
+
+
+def encode_texts(texts, model_name: str = EMBED_MODEL, cache_dir: str = EMBED_CACHE_DIR,
+                 batch_size: int = EMBED_BATCH) -> np.ndarray:
+    """
+    Embed texts as an (n, dim) float32 array, L2-normalized.
+    Each distinct text is encoded at most once ever: vectors are cached on
+    disk keyed by a hash of model name + text, and only misses hit the
+    encoder (batched).
+    """
+    texts = list(texts)
+    hashes = [text_hash(t, model_name) for t in texts]
+    vecs = {}
+    missing = {}
+    for h, t in zip(hashes, texts):
+        if h in vecs or h in missing:
+            continue
+        path = _cache_path(h, model_name, cache_dir)
+        if os.path.exists(path):
+            vecs[h] = np.load(path)
+        else:
+            missing[h] = t
+
+    if missing:
+        todo = list(missing.items())
+        emb = get_embedding_model(model_name).encode(
+            [t for _, t in todo], batch_size=batch_size,
+            convert_to_numpy=True, normalize_embeddings=True,
+        ).astype(np.float32)
+        for (h, _), v in zip(todo, emb):
+            path = _cache_path(h, model_name, cache_dir)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp.npy"
+            np.save(tmp, v)
+            os.replace(tmp, path)
+            vecs[h] = v
+
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.stack([vecs[h] for h in hashes])
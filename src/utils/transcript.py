@@ -0,0 +1,233 @@
+"""
+Columnar in-memory transcript shared by every stage of a run.
+
+Start / end times are float64 arrays, the text of all segments lives in
+one string buffer (segments joined by a space) addressed by offset arrays,
+so window text over consecutive segments is a single slice and time range
+queries are binary searches.
+
+Built straight from Whisper segments (exact float times, no millisecond
+round trip) or with a streaming SRT parser; load_transcript() keeps the
+transcripts of recent runs in memory so scoring, the keyword fallback and
+per-clip subtitle trimming all reuse one parse.
+"""
+
+import os, re, threading
+from collections import OrderedDict
+import numpy as np
+
+MAX_CACHED = 8   # transcripts kept by load_transcript (batch mode: one per video in flight)
+
+_TIMES_RE = re.compile(r"(\d+):(\d+):(\d+)[,.](\d+)\s*-->\s*(\d+):(\d+):(\d+)[,.](\d+)")
+# "HH:MM:SS,mmm --> HH:MM:SS,mmm": the layout every SRT writer here produces
+_FIXED_LEN = 29
+_DIGIT_COLS = np.array([0, 1, 3, 4, 6, 7, 9, 10, 11, 17, 18, 20, 21, 23, 24, 26, 27, 28])
+_SEP_COLS = np.array([2, 5, 8, 12, 13, 14, 15, 16, 19, 22, 25])
+_SEPS = np.frombuffer(b"::, --> ::,", dtype=np.uint8)
+
+
+def parse_srt_time(srt_time: str) -> float:
+    """Convert SRT time 'HH:MM:SS,ms' to seconds."""
+    h, m, s_ms = srt_time.split(":")
+    s, ms = s_ms.split(",")
+    return int(h)*3600 + int(m)*60 + int(s) + int(ms)/1000
+
+
+def _time_fields(lines) -> np.ndarray:
+    """
+    (n, 8) ints per SRT time line: h, m, s, ms of start, then of end.
+    Fixed-layout lines are decoded in one NumPy pass over their bytes; the
+    rest (short ms, '.' separators, odd spacing) go through the regex.
+    """
+    out = np.zeros((len(lines), 8), dtype=np.int64)
+    done = np.zeros(len(lines), dtype=bool)
+    fixed = np.flatnonzero(np.fromiter((len(l) == _FIXED_LEN for l in lines), dtype=bool, count=len(lines)))
+    if len(fixed):
+        raw = np.frombuffer("".join(lines[i] for i in fixed).encode("ascii", "replace"), dtype=np.uint8)
+        raw = raw.reshape(len(fixed), _FIXED_LEN)
+        d = raw[:, _DIGIT_COLS].astype(np.int64) - ord("0")
+        ok = ((d >= 0) & (d <= 9)).all(axis=1) & (raw[:, _SEP_COLS] == _SEPS).all(axis=1)
+        d, rows = d[ok], fixed[ok]
+        for k, base in enumerate((0, 9)):
+            h, m, s = (d[:, base + j]*10 + d[:, base + j + 1] for j in (0, 2, 4))
+            ms = d[:, base + 6]*100 + d[:, base + 7]*10 + d[:, base + 8]
+            out[rows, 4*k:4*k + 4] = np.stack([h, m, s, ms], axis=1)
+        done[rows] = True
+    for i in np.flatnonzero(~done).tolist():
+        m = _TIMES_RE.search(lines[i])
+        if m is None:
+            raise ValueError(f"Bad SRT time line: {lines[i]!r}")
+        out[i] = [int(x) for x in m.groups()]
+    return out
+
+
+def format_srt_time(seconds: float) -> str:
+    """Convert seconds to SRT format 'HH:MM:SS,mmm' (rounded to the millisecond)."""
+    ms = int(round(max(0.0, seconds) * 1000))
+    hrs, ms = divmod(ms, 3_600_000)
+    mins, ms = divmod(ms, 60_000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hrs:02}:{mins:02}:{secs:02},{ms:03}"
+
+
+class Transcript:
+    """
+    Segments as columns: starts, ends (float64 seconds) and text offsets
+    into one buffer. Also a read-only sequence of (start, end, text) tuples,
+    so code written against the old read_srt() lists keeps working.
+    """
+
+    def __init__(self, starts, ends, texts):
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self.buffer = " ".join(texts)
+        lens = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+        self.text_hi = np.cumsum(lens + 1) - 1      # buffer[text_lo[i]:text_hi[i]] == texts[i]
+        self.text_lo = self.text_hi - lens
+        self.sorted = bool(np.all(self.starts[1:] >= self.starts[:-1]))
+        self.ends_monotone = bool(np.all(self.ends[1:] >= self.ends[:-1]))
+
+    # -------- construction --------
+    @classmethod
+    def from_segments(cls, segments):
+        """From Whisper segment dicts ({start, end, text}) or (start, end, text) tuples; empty lines dropped."""
+        rows = []
+        for seg in segments:
+            s, e, text = (seg["start"], seg["end"], seg["text"]) if isinstance(seg, dict) else seg
+            text = " ".join(line.strip() for line in text.strip().splitlines())
+            if text:
+                rows.append((s, e, text))
+        starts, ends, texts = zip(*rows) if rows else ((), (), ())
+        return cls(starts, ends, list(texts))
+
+    @classmethod
+    def parse(cls, lines):
+        """
+        Streaming SRT parser over an iterable of lines (an open file works).
+        Blocks are separated by blank lines; the index line is optional and a
+        block without text is skipped. Times are decoded in bulk at the end.
+        """
+        time_lines, texts = [], []
+        times, body = None, []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                if times and body:
+                    time_lines.append(times)
+                    texts.append(" ".join(body))
+                times, body = None, []
+            elif times is None:
+                if "-->" in line:
+                    times = line
+            else:
+                body.append(line)
+        if times and body:
+            time_lines.append(times)
+            texts.append(" ".join(body))
+
+        t = _time_fields(time_lines)
+        starts = (t[:, 0]*3600 + t[:, 1]*60 + t[:, 2]) + t[:, 3]/1000
+        ends = (t[:, 4]*3600 + t[:, 5]*60 + t[:, 6]) + t[:, 7]/1000
+        return cls(starts, ends, texts)
+
+    @classmethod
+    def read(cls, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.parse(f)
+
+    # -------- access --------
+    def __len__(self):
+        return len(self.starts)
+
+    def text(self, i) -> str:
+        return self.buffer[self.text_lo[i]:self.text_hi[i]]
+
+    def texts(self):
+        lo, hi, buf = self.text_lo.tolist(), self.text_hi.tolist(), self.buffer
+        return [buf[a:b] for a, b in zip(lo, hi)]
+
+    def join(self, lo: int, hi: int) -> str:
+        """Texts of segments lo..hi-1 joined by spaces, as one buffer slice."""
+        return self.buffer[self.text_lo[lo]:self.text_hi[hi - 1]] if hi > lo else ""
+
+    def srt_times(self, i) -> str:
+        return f"{format_srt_time(self.starts[i])} --> {format_srt_time(self.ends[i])}"
+
+    def __getitem__(self, i):
+        return float(self.starts[i]), float(self.ends[i]), self.text(i)
+
+    def __iter__(self):
+        for s, e, text in zip(self.starts.tolist(), self.ends.tolist(), self.texts()):
+            yield s, e, text
+
+    # -------- slicing --------
+    def inside(self, t0: float, t1: float) -> np.ndarray:
+        """Indices of segments entirely within [t0, t1] (binary search on start times)."""
+        if self.sorted:
+            lo = np.searchsorted(self.starts, t0, side="left")
+            hi = np.searchsorted(self.starts, t1, side="right")
+            return lo + np.flatnonzero(self.ends[lo:hi] <= t1)
+        return np.flatnonzero((self.starts >= t0) & (self.ends <= t1))
+
+    def take(self, ids, shift: float = 0.0):
+        """Sub-transcript of the given segments, times moved by -shift."""
+        ids = np.asarray(ids, dtype=np.int64)
+        return Transcript(self.starts[ids] - shift, self.ends[ids] - shift, [self.text(i) for i in ids])
+
+    def clip(self, t0: float, t1: float):
+        """Segments entirely within [t0, t1], re-timed relative to t0 (per-clip subtitles)."""
+        return self.take(self.inside(t0, t1), shift=t0)
+
+    # -------- output --------
+    def to_srt(self) -> str:
+        return "\n\n".join(f"{i}\n{self.srt_times(i - 1)}\n{text}"
+                           for i, text in enumerate(self.texts(), start=1))
+
+    def write_srt(self, path: str):
+        """Write as SRT; load_transcript(path) then returns this object without re-parsing."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_srt())
+            if len(self):
+                f.write("\n")
+        _remember(path, self)
+
+
+# ---------------------------------------------------------------
+# Per-run sharing
+# ---------------------------------------------------------------
+_loaded = OrderedDict()   # abspath -> (size, mtime_ns, Transcript)
+_lock = threading.Lock()
+
+
+def _stamp(path: str):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _remember(path: str, transcript: Transcript):
+    key, entry = os.path.abspath(path), (*_stamp(path), transcript)
+    with _lock:
+        _loaded[key] = entry
+        _loaded.move_to_end(key)
+        while len(_loaded) > MAX_CACHED:
+            _loaded.popitem(last=False)
+
+
+def load_transcript(path: str) -> Transcript:
+    """
+    Transcript of an SRT file, parsed at most once while the file is
+    unchanged (or not at all when this process wrote it with write_srt).
+    """
+    with _lock:
+        cached = _loaded.get(os.path.abspath(path))
+    if cached and cached[:2] == _stamp(path):
+        return cached[2]
+    transcript = Transcript.read(path)
+    _remember(path, transcript)
+    return transcript
+
+
+def as_transcript(segments) -> Transcript:
+    """Pass a Transcript through; build one from (start, end, text) tuples or Whisper dicts."""
+    return segments if isinstance(segments, Transcript) else Transcript.from_segments(segments)
+
@@ -0,0 +1,49 @@
+"""extract_audio_pcm against a fake ffmpeg on PATH: output, stderr on failure, no orphaned child."""
+
+import os, stat
+import numpy as np
+import ffmpeg
+import pytest
+from src.utils.audio_utils import extract_audio_pcm
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """Install a shell script as `ffmpeg` on PATH; returns a setter for its body."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    def install(body):
+        script = bin_dir / "ffmpeg"
+        script.write_text("#!/bin/sh\n" + body + "\n")
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return install
+
+
+def test_streams_samples(fake_ffmpeg, tmp_path):
+    samples = np.arange(1000, dtype=np.float32)
+    raw = tmp_path / "raw.f32"
+    samples.tofile(raw)
+    fake_ffmpeg(f"cat {raw}")
+    assert np.array_equal(extract_audio_pcm("in.mp4"), samples)
+    assert np.array_equal(extract_audio_pcm("in.mp4", str(tmp_path / "out.f32")), samples)
+
+
+def test_failure_carries_stderr_and_drops_partial_file(fake_ffmpeg, tmp_path):
+    fake_ffmpeg("printf 'abcd'; echo 'in.mp4: Invalid data found' >&2; exit 1")
+    out = tmp_path / "out.f32"
+    with pytest.raises(ffmpeg.Error) as err:
+        extract_audio_pcm("in.mp4", str(out))
+    assert b"Invalid data found" in err.value.stderr
+    assert not out.exists()
+
+
+@pytest.mark.skipif(not os.path.exists("/dev/full"), reason="needs /dev/full")
+def test_child_is_killed_when_writing_fails(fake_ffmpeg, tmp_path):
+    pid_file = tmp_path / "pid"
+    fake_ffmpeg(f"echo $$ > {pid_file}; exec yes")
+    with pytest.raises(OSError):
+        extract_audio_pcm("in.mp4", "/dev/full")   # every write fails with ENOSPC, like a full disk
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)        # killed and reaped, not a zombie
@@ -0,0 +1,31 @@
+"""Backend parity: every exported CPU backend stays within PARITY_BOUNDS of fp32 torch."""
+
+import pytest
+
+for module in ("torch", "transformers", "onnx", "onnxruntime"):
+    pytest.importorskip(module)
+
+from benchmarks import synthetic
+from src.ml import model_registry
+from src.ml.export_onnx import PARITY_BOUNDS, backend_parity, export_onnx, within_bounds
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    model_dir = synthetic.make_tiny_regressor(str(tmp_path_factory.mktemp("tiny-regressor")))
+    export_onnx(model_dir)
+    yield model_dir
+    model_registry.clear_cache()
+
+
+def test_backends_within_parity_bounds(tiny_model, tmp_path):
+    srt = str(tmp_path / "sample.srt")
+    texts = [text for _, _, text in synthetic.make_srt(srt, 200, seed=3)]
+    report = backend_parity(tiny_model, texts)
+    assert set(report) == set(PARITY_BOUNDS)
+    for backend, stats in report.items():
+        max_drift, min_rho = PARITY_BOUNDS[backend]
+        assert stats["served_by"] == backend, f"{backend} fell back to {stats['served_by']}"
+        assert stats["drift"] <= max_drift, f"{backend}: drift {stats['drift']:.5f}"
+        assert stats["spearman"] >= min_rho, f"{backend}: Spearman {stats['spearman']:.4f}"
+        assert within_bounds(backend, stats)
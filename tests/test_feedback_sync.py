@@ -0,0 +1,115 @@
+"""GitFeedbackWriter against a local bare repository with two reviewer clones."""
+
+import json, subprocess, threading
+import pytest
+from src.utils.feedback_sync import GitFeedbackWriter
+
+TARGET = "data/feedback.jsonl"
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """Bare repo on branch main with one commit, plus a clone factory."""
+    bare = tmp_path / "feedback.git"
+    git(tmp_path, "init", "--bare", "-b", "main", str(bare))
+
+    def clone(name):
+        path = tmp_path / name
+        git(tmp_path, "clone", str(bare), str(path))
+        git(path, "config", "user.email", f"{name}@example.com")
+        git(path, "config", "user.name", name)
+        git(path, "checkout", "-B", "main")
+        return path
+
+    seed = clone("seed")
+    (seed / "README.md").write_text("feedback\n")
+    git(seed, "add", "README.md")
+    git(seed, "commit", "-m", "init")
+    git(seed, "push", "origin", "main")
+    for name in ("a", "b"):
+        clone(name)
+    return bare, tmp_path
+
+
+def writer(repo, spool, **kw):
+    opts = dict(target_file=TARGET, remote="origin", branch="main", spool_file=str(spool),
+                batch_size=5, flush_interval=0.2, max_retries=4, retry_backoff=0.05)
+    return GitFeedbackWriter(str(repo), **{**opts, **kw})
+
+
+def remote_ids(bare, tmp_path):
+    check = tmp_path / "check"
+    if not check.exists():
+        git(tmp_path, "clone", str(bare), str(check))
+    git(check, "pull", "origin", "main")
+    lines = (check / TARGET).read_text().splitlines()
+    return [json.loads(line)["id"] for line in lines if line.strip()]
+
+
+def test_concurrent_submits_from_two_clones(remote):
+    bare, tmp = remote
+    wa, wb = writer(tmp / "a", tmp / "spool_a.jsonl"), writer(tmp / "b", tmp / "spool_b.jsonl")
+
+    def reviewer(w, prefix):
+        for i in range(12):
+            assert w.submit({"id": f"{prefix}{i}", "label": i % 2})
+
+    threads = [threading.Thread(target=reviewer, args=(w, p)) for w, p in ((wa, "a"), (wa, "x"), (wb, "b"))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wa.close()
+    wb.close()
+
+    ids = remote_ids(bare, tmp)
+    expected = {f"{p}{i}" for p in "axb" for i in range(12)}
+    assert sorted(ids) == sorted(expected)   # every label exactly once
+    assert wa.last_error is None and wb.last_error is None
+    assert (tmp / "spool_a.jsonl").read_text() == "" and (tmp / "spool_b.jsonl").read_text() == ""
+
+
+def test_conflicting_append_is_recovered(remote):
+    bare, tmp = remote
+    wa = writer(tmp / "a", tmp / "spool_a.jsonl")
+    wa.submit({"id": "a1", "label": 1})
+    wa.close()
+
+    # b's clone is behind and appends to the same file: the rebase conflicts
+    # (no merge=union attribute in this repo) and b resets onto the remote
+    wb = writer(tmp / "b", tmp / "spool_b.jsonl")
+    wb.submit({"id": "b1", "label": 0})
+    wb.close()
+    assert wb.last_error is None
+    assert sorted(remote_ids(bare, tmp)) == ["a1", "b1"]
+
+    # b keeps working afterwards
+    wb = writer(tmp / "b", tmp / "spool_b.jsonl")
+    wb.submit({"id": "b2", "label": 1})
+    wb.close()
+    assert sorted(remote_ids(bare, tmp)) == ["a1", "b1", "b2"]
+
+
+def test_restart_flushes_spooled_labels(remote):
+    bare, tmp = remote
+    spool = tmp / "spool_a.jsonl"
+
+    # Remote unreachable: the writer gives up and the labels stay spooled
+    w = writer(tmp / "a", spool, remote=str(tmp / "missing.git"), max_retries=1)
+    w.submit({"id": "s1", "label": 1})
+    w.submit({"id": "s2", "label": 0})
+    w.close()
+    assert {json.loads(line)["id"] for line in spool.read_text().splitlines()} == {"s1", "s2"}
+
+    # A label spooled right before a crash (never queued)
+    with open(spool, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": "s3", "label": 1}) + "\n")
+
+    w = writer(tmp / "a", spool)
+    w.close()
+    assert sorted(remote_ids(bare, tmp)) == ["s1", "s2", "s3"]
+    assert spool.read_text() == ""
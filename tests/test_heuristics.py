@@ -0,0 +1,43 @@
+"""The shared keyword matcher agrees with the baseline per-keyword regexes and tokenizer."""
+
+import random, re
+import numpy as np
+from benchmarks import synthetic
+from src.ml.heuristics import FALLBACK_KWS, STRONG_KWS, scan_segments, score_text, window_scores
+from src.ml.make_windows import build_windows, read_srt
+
+PIECES = sorted(STRONG_KWS | set(FALLBACK_KWS)) + ["so", "x", "2", "é", "_", "'", "-", " ", " ", "İ", "ß", "!", "?"]
+
+
+def baseline_fallback(text):
+    lower = text.lower()
+    return sum(1 for kw in FALLBACK_KWS if re.search(rf"\b{kw}\b", lower))
+
+
+def baseline_tokens(text):
+    return re.findall(r"[A-Za-z0-9']+", text.lower())
+
+
+def test_fallback_word_boundaries():
+    texts = ["wowé", "never_ending", "wow's", "never-ending", "éwow", "_hack_", "it's amazing", "o'wow'x"]
+    assert scan_segments(texts).fallback_hits.tolist() == [baseline_fallback(t) for t in texts]
+
+
+def test_matches_baseline_on_random_text():
+    rng = random.Random(0)
+    texts = ["".join(rng.choice(PIECES) for _ in range(rng.randint(0, 30))) for _ in range(2000)]
+    stats = scan_segments(texts)
+    assert stats.fallback_hits.tolist() == [baseline_fallback(t) for t in texts]
+    assert stats.tokens == [baseline_tokens(t) for t in texts]
+    assert stats.n_tokens.tolist() == [len(baseline_tokens(t)) for t in texts]
+    assert stats.strong_hits.tolist() == [sum(w in STRONG_KWS for w in baseline_tokens(t)) for t in texts]
+    assert np.array_equal(stats.question, ["?" in t for t in texts])
+
+
+def test_window_scores_match_score_text(tmp_path):
+    srt = str(tmp_path / "t.srt")
+    synthetic.make_srt(srt, 300, seed=4)
+    segs = read_srt(srt)
+    windows = build_windows(segs)
+    expected = [score_text(windows.text(i)) for i in range(len(windows))]
+    assert np.allclose(window_scores(segs.texts(), windows), expected)
@@ -0,0 +1,40 @@
+"""Atomic checkpoint promotion: model_dir never disappears while a new one is swapped in."""
+
+import os, threading
+from src.ml.model_registry import STAMP_FILE, model_available, promote_checkpoint, read_checkpoint_stamp
+
+
+def make_checkpoint(path, n):
+    os.makedirs(path)
+    with open(os.path.join(path, STAMP_FILE), "w", encoding="utf-8") as f:
+        f.write(f'{{"n": {n}}}')
+    return path
+
+
+def test_promote_is_never_unavailable(tmp_path):
+    model_dir = str(tmp_path / "model")
+    make_checkpoint(model_dir, 0)   # plain directory from before the symlink layout
+    promote_checkpoint(make_checkpoint(str(tmp_path / "candidate"), 1), model_dir)
+    assert read_checkpoint_stamp(model_dir) == {"n": 1}
+
+    misses, done = [], threading.Event()
+
+    def watch():
+        while not done.is_set():
+            if not model_available(model_dir):
+                misses.append(1)
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    try:
+        for n in range(2, 40):
+            promote_checkpoint(make_checkpoint(str(tmp_path / "candidate"), n), model_dir)
+    finally:
+        done.set()
+        watcher.join()
+
+    assert not misses
+    assert read_checkpoint_stamp(model_dir) == {"n": 39}
+    assert os.path.islink(model_dir)
+    versions = [e for e in os.listdir(tmp_path) if e.startswith("model.v")]
+    assert len(versions) == 2   # current + the one it replaced
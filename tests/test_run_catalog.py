@@ -0,0 +1,45 @@
+"""run_catalog.sync picks up new run files and run files changed after indexing."""
+
+import json, os
+from src.utils import run_catalog
+
+
+def write_run(path, video, clips):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"timestamp": "2024-01-02_03-04-05", "video": video, "clips": clips}, f)
+
+
+def test_sync_reindexes_changed_runs(tmp_path):
+    runs_dir = tmp_path / "runs"
+    runs_dir.mkdir()
+    conn = run_catalog.connect(str(tmp_path / "catalog.sqlite"))
+    log_file = str(runs_dir / "2024-01-02_03-04-05.json")
+
+    write_run(log_file, "a.mp4", [{"score": 0.5, "file": "clip_1.mp4"}])
+    assert run_catalog.sync(str(runs_dir), conn=conn) == 1
+    assert run_catalog.sync(str(runs_dir), conn=conn) == 0
+
+    write_run(log_file, "b.mp4", [{"score": 0.9, "file": "clip_1.mp4"}, {"score": 0.1, "file": "clip_2.mp4"}])
+    st = os.stat(log_file)
+    os.utime(log_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert run_catalog.sync(str(runs_dir), conn=conn) == 1
+    run = run_catalog.latest_run(conn=conn)
+    assert run["video"] == "b.mp4" and len(run["clips"]) == 2
+
+
+def test_mark_processed_survives_sync(tmp_path):
+    runs_dir = tmp_path / "runs"
+    runs_dir.mkdir()
+    conn = run_catalog.connect(str(tmp_path / "catalog.sqlite"))
+    log_file = str(runs_dir / "2024-01-02_03-04-05.json")
+    write_run(log_file, "a.mp4", [{"score": 0.5, "file": "clips/clip_1.mp4"}])
+    run_catalog.sync(str(runs_dir), conn=conn)
+
+    # update_runs.py: rewrite the file, then flag the run
+    (run,) = run_catalog.unprocessed_runs(conn=conn)
+    clips = [{"score": 0.5, "file": "https://example.com/clip_1.mp4"}]
+    write_run(log_file, "a.mp4", clips)
+    run_catalog.mark_processed(run["id"], clips, conn=conn)
+
+    assert run_catalog.sync(str(runs_dir), conn=conn) == 0
+    assert run_catalog.unprocessed_runs(conn=conn) == []
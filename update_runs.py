@@ -1,11 +1,17 @@
-import json, glob
+import json
+from src.utils import run_catalog
 
 RUNS_DIR = "runs"
 
 # Base URL for your dataset repo
 DATASET_URL = "https://huggingface.co/datasets/bharathreddy202/reels-clips/tree/main/data/clips_compressed/"
 
-for file in glob.glob(f"{RUNS_DIR}/*.json"):
+# Only runs the catalog has not marked as rewritten are loaded and rewritten
+conn = run_catalog.connect()
+run_catalog.sync(RUNS_DIR, conn=conn)
+
+for run in run_catalog.unprocessed_runs("urls_rewritten", conn=conn):
+    file = run["log_file"]
     with open(file, "r") as f:
         data = json.load(f)
 
@@ -18,4 +24,7 @@ for file in glob.glob(f"{RUNS_DIR}/*.json"):
     with open(file, "w") as f:
         json.dump(data, f, indent=2)
 
+    run_catalog.mark_processed(run["id"], data.get("clips", []), "urls_rewritten", conn=conn)
     print(f"✅ Updated {file}")
+
+conn.close()